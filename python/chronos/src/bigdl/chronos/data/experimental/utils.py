@@ -27,3 +27,114 @@ def transform_to_dict(data):
     if data[1] is None:
         return {"x": data[0].astype(np.float32)}
     return {"x": data[0].astype(np.float32), "y": data[1].astype(np.float32)}
+
+
+def apply_per_id(df, id_col, func, *args, **kwargs):
+    '''
+    apply func to the sub dataframe of each id in a shard and concat the results.
+    '''
+    if len(df) == 0:
+        return df
+    res_df = df.groupby(id_col, group_keys=False, sort=False)\
+        .apply(lambda sub_df: func(sub_df, *args, **kwargs))
+    return res_df.reset_index(drop=True)
+
+
+def roll_per_id(df, id_col, roll_func, *args):
+    '''
+    roll the sub dataframe of each id in a shard and concat the rolling results.
+    '''
+    results = [roll_func(sub_df, *args) for _, sub_df in df.groupby(id_col, sort=False)]
+    if len(results) == 0:
+        return roll_func(df, *args)
+    if len(results) == 1:
+        return results[0]
+    x = np.concatenate([res[0] for res in results], axis=0)
+    y = None if results[0][1] is None else np.concatenate([res[1] for res in results], axis=0)
+    return x, y
+
+
+def get_min_interval(df, id_col, dt_col):
+    '''
+    return the minimal interval between adjacent timestamps of each id in a shard,
+    None if no id has more than one timestamp.
+    '''
+    intervals = df.groupby(id_col)[dt_col].apply(lambda dt: dt.diff().min()).dropna()
+    return intervals.min() if len(intervals) > 0 else None
+
+
+def get_column_stats(df, cols):
+    '''
+    return the count, mean, sum of squared deviations from the mean, min, max and max
+    absolute value of each column in a shard, ignoring N/A.
+    '''
+    data = df[cols].to_numpy(dtype=np.float64)
+    valid = ~np.isnan(data)
+    count = valid.sum(axis=0)
+    filled = np.where(valid, data, 0)
+    mean = filled.sum(axis=0) / np.maximum(count, 1)
+    m2 = (np.where(valid, data - mean, 0) ** 2).sum(axis=0)
+    col_min = np.where(valid, data, np.inf).min(axis=0, initial=np.inf)
+    col_max = np.where(valid, data, -np.inf).max(axis=0, initial=-np.inf)
+    return count, mean, m2, col_min, col_max
+
+
+def merge_column_stats(a, b):
+    '''
+    merge the column stats of two shards, the mean and m2 are merged in the parallel
+    algorithm of Chan et al.
+    '''
+    count_a, mean_a, m2_a, min_a, max_a = a
+    count_b, mean_b, m2_b, min_b, max_b = b
+    count = count_a + count_b
+    delta = mean_b - mean_a
+    ratio = count_b / np.maximum(count, 1)
+    mean = mean_a + delta * ratio
+    m2 = m2_a + m2_b + delta ** 2 * count_a * ratio
+    return count, mean, m2, np.minimum(min_a, min_b), np.maximum(max_a, max_b)
+
+
+def _handle_zeros_in_scale(scale):
+    scale = scale.copy()
+    scale[scale == 0.0] = 1.0
+    return scale
+
+
+def set_scaler_stats(scaler, stats):
+    '''
+    set the fitted attributes of a sklearn StandardScaler, MinMaxScaler or MaxAbsScaler
+    from the column stats merged across all the shards, as if it is fitted on all the data.
+    '''
+    from sklearn.preprocessing import StandardScaler, MaxAbsScaler, MinMaxScaler
+    count, mean, m2, col_min, col_max = stats
+    scaler.n_features_in_ = len(count)
+    scaler.n_samples_seen_ = count.astype(np.int64) if len(set(count)) > 1 \
+        else int(count[0])
+    if isinstance(scaler, StandardScaler):
+        var = m2 / np.maximum(count, 1)
+        scaler.mean_ = mean if scaler.with_mean or scaler.with_std else None
+        scaler.var_ = var if scaler.with_std else None
+        scaler.scale_ = _handle_zeros_in_scale(np.sqrt(var)) if scaler.with_std else None
+    elif isinstance(scaler, MinMaxScaler):
+        feature_min, feature_max = scaler.feature_range
+        scaler.data_min_ = col_min
+        scaler.data_max_ = col_max
+        scaler.data_range_ = col_max - col_min
+        scaler.scale_ = (feature_max - feature_min) / _handle_zeros_in_scale(scaler.data_range_)
+        scaler.min_ = feature_min - col_min * scaler.scale_
+    elif isinstance(scaler, MaxAbsScaler):
+        scaler.max_abs_ = np.maximum(np.abs(col_min), np.abs(col_max))
+        scaler.scale_ = _handle_zeros_in_scale(scaler.max_abs_)
+    else:
+        raise NotImplementedError("Only StandardScaler, MinMaxScaler and MaxAbsScaler can be "
+                                  f"fitted on XShardsTSDataset, but found {type(scaler)}.")
+    return scaler
+
+
+def scale_shard(df, scaler, cols, inverse=False):
+    if len(df) == 0:
+        return df
+    df = df.copy()
+    data = df[cols].to_numpy()
+    df[cols] = scaler.inverse_transform(data) if inverse else scaler.transform(data)
+    return df
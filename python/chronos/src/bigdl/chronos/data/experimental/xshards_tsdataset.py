@@ -15,11 +15,20 @@
 #
 
 
+import pandas as pd
+
 from bigdl.orca.data.shard import SparkXShards
 from bigdl.chronos.data.utils.utils import _to_list, _check_type
+from bigdl.chronos.data.utils.feature import generate_dt_features
+from bigdl.chronos.data.utils.impute import impute_timeseries_dataframe
+from bigdl.chronos.data.utils.deduplicate import deduplicate_timeseries_dataframe
+from bigdl.chronos.data.utils.resample import resample_timeseries_dataframe
 from bigdl.chronos.data.utils.roll import roll_timeseries_dataframe
+from bigdl.chronos.data.utils.scale import unscale_timeseries_numpy
 from bigdl.chronos.data.utils.split import split_timeseries_dataframe
-from bigdl.chronos.data.experimental.utils import add_row, transform_to_dict
+from bigdl.chronos.data.experimental.utils import add_row, transform_to_dict, apply_per_id, \
+    roll_per_id, get_min_interval, get_column_stats, merge_column_stats, set_scaler_stats, \
+    scale_shard
 
 _DEFAULT_ID_COL_NAME = "id"
 _DEFAULT_ID_PLACEHOLDER = "0"
@@ -40,8 +49,12 @@ class XShardsTSDataset:
         self.target_col = schema["target_col"].copy()
 
         self.numpy_shards = None
+        self.scaler = None
+        self.scaler_index = [i for i in range(len(self.target_col))]
 
         self._id_list = list(shards[self.id_col].unique())
+        self._freq = None
+        self._is_pd_datetime = None
 
     @staticmethod
     def from_xshards(shards,
@@ -130,6 +143,173 @@ class XShardsTSDataset:
                                 target_col=target_col,
                                 feature_col=feature_col)
 
+    def impute(self, mode="last", const_num=0):
+        '''
+        Impute the xshardtsdataset by imputing each univariate time series
+        distinguished by id_col and feature_col, on the partitions where they are.
+
+        :param mode: imputation mode, select from "last", "const" or "linear".
+
+            "last": impute by propagating the last non N/A number to its following N/A.
+            if there is no non N/A number ahead, 0 is filled instead.
+
+            "const": impute by a const value input by user.
+
+            "linear": impute by linear interpolation.
+        :param const_num:  indicates the const number to fill, which is only effective when mode
+            is set to "const".
+
+        :return: the xshardtsdataset instance.
+        '''
+        self.shards = self.shards.transform_shard(apply_per_id, self.id_col,
+                                                  impute_timeseries_dataframe,
+                                                  self.dt_col, mode, const_num)
+        return self
+
+    def deduplicate(self):
+        '''
+        Remove those duplicated records which has exactly the same values in each feature_col
+        for each multivariate timeseries distinguished by id_col.
+
+        :return: the xshardtsdataset instance.
+        '''
+        self.shards = self.shards.transform_shard(deduplicate_timeseries_dataframe,
+                                                  self.dt_col)
+        return self
+
+    def resample(self, interval, start_time=None, end_time=None, merge_mode="mean"):
+        '''
+        Resample on a new interval for each univariate time series distinguished
+        by id_col and feature_col, on the partitions where they are.
+
+        :param interval: pandas offset aliases, indicating time interval of the output dataframe.
+        :param start_time: start time of the output dataframe.
+        :param end_time: end time of the output dataframe.
+        :param merge_mode: if current interval is smaller than output interval,
+            we need to merge the values in a mode. "max", "min", "mean"
+            or "sum" are supported for now.
+
+        :return: the xshardtsdataset instance.
+        '''
+        self._check_pd_datetime()
+        self.shards = self.shards.transform_shard(apply_per_id, self.id_col,
+                                                  resample_timeseries_dataframe,
+                                                  self.dt_col, interval, start_time,
+                                                  end_time, self.id_col, merge_mode)
+        self._freq = pd.Timedelta(interval)
+        return self
+
+    def gen_dt_feature(self, features="auto", one_hot_features=None):
+        '''
+        Generate datetime feature(s) for each record. See TSDataset.gen_dt_feature for
+        the available features.
+
+        :param features: str or list, states which feature(s) will be generated. If the value
+               is set to be a str, it should be one of "auto" or "all". For "auto", a subset
+               of datetime features will be generated under the consideration of the sampling
+               frequency of your data, which is the minimal interval of all the ids, or the
+               whole set if no id has more than one record. For "all", the whole set of
+               datetime features will be generated. If the value is set to be a list, the list
+               should contain the features you want to generate. The value defaults to "auto".
+        :param one_hot_features: list, states which feature(s) will be generated as one-hot-encoded
+               feature. The value defaults to None, which means no features will be generated with
+               one-hot-encoded.
+
+        :return: the xshardtsdataset instance.
+        '''
+        self._check_pd_datetime()
+        if self._freq is None:
+            id_col, dt_col = self.id_col, self.dt_col
+            intervals = self.shards.rdd.map(lambda df: get_min_interval(df, id_col, dt_col))\
+                .filter(lambda interval: interval is not None).collect()
+            self._freq = min(intervals) if intervals else None
+        if self._freq is None and features == "auto":
+            features = "all"
+        # generate on an empty frame for the names of the generated features
+        features_generated = []
+        generate_dt_features(input_df=pd.DataFrame({self.dt_col: pd.to_datetime([])}),
+                             dt_col=self.dt_col,
+                             features=features,
+                             one_hot_features=one_hot_features,
+                             freq=self._freq,
+                             features_generated=features_generated)
+        self.shards = self.shards.transform_shard(generate_dt_features,
+                                                  self.dt_col, features, one_hot_features,
+                                                  self._freq, [])
+        self.feature_col += features_generated
+        return self
+
+    def _check_pd_datetime(self):
+        if self._is_pd_datetime is None:
+            dt_col = self.dt_col
+            self._is_pd_datetime = self.shards.rdd\
+                .map(lambda df: pd.api.types.is_datetime64_any_dtype(df[dt_col].dtypes))\
+                .fold(True, lambda x, y: x and y)
+        assert self._is_pd_datetime, "The time series data does not have a Pandas datetime format"\
+            "(you can use pandas.to_datetime to convert a string into a datetime format.)"
+
+    def scale(self, scaler, fit=True):
+        '''
+        Scale the xshardtsdataset's feature column and target column. The statistics of the
+        scaler are aggregated across all the partitions, so the scaler is the same as fitted
+        on all the data.
+
+        :param scaler: sklearn scaler instance, StandardScaler, MaxAbsScaler and
+               MinMaxScaler are supported.
+        :param fit: if we need to fit the scaler. Typically, the value should
+               be set to True for training set, while False for validation and
+               test set. The value is defaulted to True.
+
+        :return: the xshardtsdataset instance.
+        '''
+        cols = self.target_col + self.feature_col
+        if fit:
+            stats = self.shards.rdd.map(lambda df: get_column_stats(df, cols))\
+                .treeReduce(merge_column_stats)
+            set_scaler_stats(scaler, stats)
+        else:
+            from sklearn.utils.validation import check_is_fitted
+            try:
+                assert not check_is_fitted(scaler)
+            except Exception:
+                raise AssertionError("When calling scale for the first time, "
+                                     "you need to set fit=True.")
+        self.shards = self.shards.transform_shard(scale_shard, scaler, cols)
+        self.scaler = scaler
+        return self
+
+    def unscale(self):
+        '''
+        Unscale the xshardtsdataset's feature column and target column.
+
+        :return: the xshardtsdataset instance.
+        '''
+        self.shards = self.shards.transform_shard(scale_shard, self.scaler,
+                                                  self.target_col + self.feature_col,
+                                                  True)
+        return self
+
+    def unscale_xshards(self, data, key=None):
+        '''
+        Unscale the time series forecaster's prediction result/ground truth in xshards.
+
+        :param data: xshards of numpy ndarray with 3 dim whose shape should be exactly the
+               same with the "y" of to_xshards(), or xshards of dict of such ndarrays.
+        :param key: str, the key of the ndarray to unscale if each shard is a dict,
+               e.g. "y" or "prediction". Default to None, where each shard is a ndarray.
+
+        :return: the unscaled xshards.
+        '''
+        scaler, scaler_index = self.scaler, self.scaler_index
+
+        def unscale_shard(shard):
+            if key is None:
+                return unscale_timeseries_numpy(shard, scaler, scaler_index)
+            shard = shard.copy()
+            shard[key] = unscale_timeseries_numpy(shard[key], scaler, scaler_index)
+            return shard
+        return data.transform_shard(unscale_shard)
+
     def roll(self,
              lookback,
              horizon,
@@ -168,9 +348,11 @@ class XShardsTSDataset:
             else self.feature_col
         target_col = _to_list(target_col, "target_col") if target_col is not None \
             else self.target_col
-        self.numpy_shards = self.shards.transform_shard(roll_timeseries_dataframe,
+        self.numpy_shards = self.shards.transform_shard(roll_per_id, self.id_col,
+                                                        roll_timeseries_dataframe,
                                                         None, lookback, horizon,
                                                         feature_col, target_col)
+        self.scaler_index = [self.target_col.index(t) for t in target_col]
         return self
 
     def to_xshards(self):
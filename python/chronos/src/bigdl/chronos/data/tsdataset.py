@@ -21,7 +21,8 @@ import functools
 from bigdl.chronos.data.utils.feature import generate_dt_features, generate_global_features
 from bigdl.chronos.data.utils.impute import impute_timeseries_dataframe
 from bigdl.chronos.data.utils.deduplicate import deduplicate_timeseries_dataframe
-from bigdl.chronos.data.utils.roll import roll_timeseries_dataframe
+from bigdl.chronos.data.utils.roll import roll_timeseries_dataframe, \
+    roll_timeseries_dataframe_zero_copy, RollingWindows
 from bigdl.chronos.data.utils.scale import unscale_timeseries_numpy
 from bigdl.chronos.data.utils.resample import resample_timeseries_dataframe
 from bigdl.chronos.data.utils.split import split_timeseries_dataframe
@@ -486,7 +487,8 @@ class TSDataset:
              lookback='auto',
              feature_col=None,
              target_col=None,
-             id_sensitive=False):
+             id_sensitive=False,
+             zero_copy=False):
         '''
         Sampling by rolling for machine learning/deep learning models.
 
@@ -519,6 +521,14 @@ class TSDataset:
                where num_sample is the sample number of the wide dataframe,
                new_num_feature_col is the product of the number of id and the number of feature_col.
                new_num_target_col is the product of the number of id and the number of target_col.
+        :param zero_copy: bool, if `zero_copy` is True, the rolling result will be read-only
+               views over one contiguous copy of the data instead of a copy of each sample,
+               which takes about 1/lookback of the memory. to_numpy() will then return
+               ndarray views if all the windows of the data are samples (e.g. a single id without
+               n/a), otherwise array-likes that copy samples only when they are indexed, e.g.
+               one batch at a time. Call np.asarray on them to get the full ndarray.
+               zero_copy is ignored if id_sensitive is True and gen_rolling_feature is called.
+               Default to False.
 
         :return: the tsdataset instance.
 
@@ -572,37 +582,48 @@ class TSDataset:
 
         if lookback == 'auto':
             lookback = self.get_cycle_length('mode', top_k=3)
-        rolling_result = \
-            self.df.groupby([self.id_col]) \
-                .apply(lambda df: roll_timeseries_dataframe(df=df,
-                                                            roll_feature_df=roll_feature_df,
-                                                            lookback=lookback,
-                                                            horizon=horizon,
-                                                            feature_col=feature_col,
-                                                            target_col=target_col))
-
-        # concat the result on required axis
-        concat_axis = 2 if id_sensitive else 0
-        self.numpy_x = np.concatenate([rolling_result[i][0]
-                                       for i in self._id_list],
-                                      axis=concat_axis).astype(np.float32)
-        if horizon != 0:
-            self.numpy_y = np.concatenate([rolling_result[i][1]
-                                           for i in self._id_list],
-                                          axis=concat_axis).astype(np.float32)
+        if zero_copy and not (id_sensitive and roll_feature_df is not None):
+            self.numpy_x, self.numpy_y = \
+                roll_timeseries_dataframe_zero_copy(df=self.df,
+                                                    roll_feature_df=roll_feature_df,
+                                                    lookback=lookback,
+                                                    horizon=horizon,
+                                                    feature_col=feature_col,
+                                                    target_col=target_col,
+                                                    id_col=self.id_col,
+                                                    id_sensitive=id_sensitive)
         else:
-            self.numpy_y = None
-
-        # target first
-        if self.id_sensitive:
-            feature_start_idx = num_target_col * num_id
-            reindex_list = [list(range(i * num_target_col, (i + 1) * num_target_col)) +
-                            list(range(feature_start_idx + i * num_feature_col,
-                                       feature_start_idx + (i + 1) * num_feature_col))
-                            for i in range(num_id)]
-            reindex_list = functools.reduce(lambda a, b: a + b, reindex_list)
-            sorted_index = sorted(range(len(reindex_list)), key=reindex_list.__getitem__)
-            self.numpy_x = self.numpy_x[:, :, sorted_index]
+            rolling_result = \
+                self.df.groupby([self.id_col]) \
+                    .apply(lambda df: roll_timeseries_dataframe(df=df,
+                                                                roll_feature_df=roll_feature_df,
+                                                                lookback=lookback,
+                                                                horizon=horizon,
+                                                                feature_col=feature_col,
+                                                                target_col=target_col))
+
+            # concat the result on required axis
+            concat_axis = 2 if id_sensitive else 0
+            self.numpy_x = np.concatenate([rolling_result[i][0]
+                                           for i in self._id_list],
+                                          axis=concat_axis).astype(np.float32, copy=False)
+            if horizon != 0:
+                self.numpy_y = np.concatenate([rolling_result[i][1]
+                                               for i in self._id_list],
+                                              axis=concat_axis).astype(np.float32, copy=False)
+            else:
+                self.numpy_y = None
+
+            # target first
+            if self.id_sensitive:
+                feature_start_idx = num_target_col * num_id
+                reindex_list = [list(range(i * num_target_col, (i + 1) * num_target_col)) +
+                                list(range(feature_start_idx + i * num_feature_col,
+                                           feature_start_idx + (i + 1) * num_feature_col))
+                                for i in range(num_id)]
+                reindex_list = functools.reduce(lambda a, b: a + b, reindex_list)
+                sorted_index = sorted(range(len(reindex_list)), key=reindex_list.__getitem__)
+                self.numpy_x = self.numpy_x[:, :, sorted_index]
 
         # scaler index
         num_roll_target = len(self.roll_target)
@@ -619,7 +640,9 @@ class TSDataset:
                              lookback='auto',
                              horizon=None,
                              feature_col=None,
-                             target_col=None, ):
+                             target_col=None,
+                             shuffle=True,
+                             num_workers=0):
         """
         Convert TSDataset to a PyTorch DataLoader with or without rolling. We recommend to use
         to_torch_data_loader(roll=True) if you don't need to output the rolled numpy array. It is
@@ -643,8 +666,12 @@ class TSDataset:
         :param target_col: str or list, indicates the target col name. Default to None,
                where we will take all target in rolling. it should be a subset of target_col
                you used to initialize the tsdataset.
+        :param shuffle: Boolean. Whether to reshuffle the samples on every epoch. Default to True.
+        :param num_workers: int, the number of worker processes that prepare batches in the
+               background. Default to 0, where batches are prepared in the main process.
 
-        :return: A pytorch DataLoader instance.
+        :return: A pytorch DataLoader instance. If roll is True, each batch is gathered from the
+                 dataframe at once instead of being collated from single samples.
 
         to_torch_data_loader() can be called by:
 
@@ -692,25 +719,47 @@ class TSDataset:
                                         feature_col=feature_col,
                                         target_col=target_col,
                                         id_col=self.id_col)
-            return DataLoader(torch_dataset,
-                              batch_size=batch_size,
-                              shuffle=True)
+            return torch_dataset.to_data_loader(batch_size=batch_size,
+                                                shuffle=shuffle,
+                                                num_workers=num_workers)
         else:
             if self.numpy_x is None:
                 raise RuntimeError("Please call 'roll' method before transforming a TSDataset to "
                                    "torch DataLoader without rolling (default roll=False)!")
             x, y = self.to_numpy()
+            if isinstance(x, RollingWindows) or isinstance(y, RollingWindows) \
+                    or not x.flags.writeable:
+                # rolled with zero_copy, index a whole batch at a time so that
+                # only one batch of samples is copied at a time
+                from torch.utils.data import Dataset, BatchSampler, RandomSampler, \
+                    SequentialSampler
+
+                class _BatchDataset(Dataset):
+                    def __len__(self):
+                        return len(x)
+
+                    def __getitem__(self, idx):
+                        return torch.from_numpy(x[idx]).float(), torch.from_numpy(y[idx]).float()
+
+                sampler = RandomSampler(range(len(x))) if shuffle \
+                    else SequentialSampler(range(len(x)))
+                return DataLoader(_BatchDataset(),
+                                  batch_size=None,
+                                  sampler=BatchSampler(sampler, batch_size, drop_last=False),
+                                  num_workers=num_workers)
             return DataLoader(TensorDataset(torch.from_numpy(x).float(),
                                             torch.from_numpy(y).float()),
                               batch_size=batch_size,
-                              shuffle=True)
+                              shuffle=shuffle,
+                              num_workers=num_workers)
 
     def to_numpy(self):
         '''
         Export rolling result in form of a tuple of numpy ndarray (x, y).
 
         :return: a 2-dim tuple. each item is a 3d numpy ndarray. The ndarray
-                 is casted to float32.
+                 is casted to float32. If roll is called with zero_copy=True, each item
+                 is a read-only view or a RollingWindows, see roll() for details.
         '''
         if self.numpy_x is None:
             raise RuntimeError("Please call 'roll' method "
@@ -73,12 +73,12 @@ def _append_rolling_feature_df(rolling_result,
                                roll_feature_df):
     if roll_feature_df is None:
         return rolling_result
-    additional_rolling_result = np.zeros((rolling_result.shape[0],
-                                         rolling_result.shape[1],
-                                         len(roll_feature_df.columns)))
-    for idx in range(additional_rolling_result.shape[0]):
-        for col_idx in range(additional_rolling_result.shape[2]):
-            additional_rolling_result[idx, :, col_idx] = roll_feature_df.iloc[idx, col_idx]
+    # the i-th sample takes the i-th row of roll_feature_df on all its timestamps
+    additional_feature = roll_feature_df.iloc[:rolling_result.shape[0]].values
+    additional_rolling_result = np.broadcast_to(additional_feature[:, np.newaxis, :],
+                                                (rolling_result.shape[0],
+                                                 rolling_result.shape[1],
+                                                 additional_feature.shape[1]))
     rolling_result = np.concatenate([rolling_result, additional_rolling_result], axis=2)
     return rolling_result
 
@@ -132,6 +132,43 @@ def _shift(arr, num, fill_value=np.nan):
     return result
 
 
+def _window_index(window):
+    '''
+    return the window size and the index of the sampled positions in the window,
+    None if all the positions are sampled.
+    '''
+    if isinstance(window, int):
+        return window, None
+    return max(window), np.array(window) - 1
+
+
+def _sliding_window(data, window_size):
+    '''
+    return a read-only view of data in shape (num_window, window_size, num_feature),
+    the i-th window is data[i:i+window_size]. No data is copied.
+    '''
+    from numpy.lib.stride_tricks import as_strided
+    num_window = max(data.shape[0] - window_size + 1, 0)
+    return as_strided(data,
+                      shape=(num_window, window_size) + data.shape[1:],
+                      strides=(data.strides[0],) + data.strides,
+                      writeable=False)
+
+
+def _valid_window(nan_row, start, window_size, window_idx=None):
+    '''
+    return whether the windows starting from start have no nan at the sampled positions,
+    nan_row indicates whether each timestamp has a nan value.
+    '''
+    if window_idx is None:
+        nan_count = np.concatenate([[0], np.cumsum(nan_row)])
+        return nan_count[start + window_size] == nan_count[start]
+    valid = np.ones(len(start), dtype=bool)
+    for idx in window_idx:
+        valid &= ~nan_row[start + idx]
+    return valid
+
+
 def _roll_timeseries_ndarray(data, window):
     '''
     data should be a ndarray with num_dim = 2
@@ -139,20 +176,146 @@ def _roll_timeseries_ndarray(data, window):
     second dim is feature
     '''
     assert data.ndim == 2  # (num_timestep, num_feature)
-    data = np.expand_dims(data, axis=1)  # (num_timestep, 1, num_feature)
 
     # window index and capacity
-    window_size = window if isinstance(window, int) else max(window)
-    if isinstance(window, int):
-        window_idx = np.arange(window)
-    else:
-        window_idx = np.array(window) - 1
+    window_size, window_idx = _window_index(window)
 
-    roll_data = np.concatenate([_shift(data, i) for i in range(0, -window_size, -1)], axis=1)
-    if data.shape[0] >= window_size:
-        roll_data = roll_data[:data.shape[0]-window_size+1, window_idx, :]
-    else:
-        roll_data = roll_data[:0, window_idx, :]  # no sample will be sampled
-    mask = ~np.any(np.isnan(roll_data), axis=(1, 2))
+    roll_data = _sliding_window(data, window_size)
+    mask = _valid_window(np.isnan(data).any(axis=1), np.arange(roll_data.shape[0]),
+                         window_size, window_idx)
+    if window_idx is not None:
+        roll_data = roll_data[:, window_idx, :]
 
     return roll_data, mask
+
+
+class RollingWindows(object):
+    '''
+    A read-only rolling result, whose samples are windows of a strided view over one
+    contiguous array. A sample is only copied when it is indexed, so that the memory of
+    the rolling result is about the size of the data instead of lookback times of it.
+    Index it with a batch of sample indices to get the batch as a ndarray, or call
+    np.asarray on it to get all the samples.
+
+    :param windows: a ndarray view in shape (num_window, window_size, num_feature).
+    :param index: a ndarray of the window index of each sample.
+    :param window_idx: a ndarray of the sampled positions in each window.
+           Default to None, where all the positions are sampled.
+    :param extra: a ndarray in shape (num_sample, num_extra_feature) of the features to be
+           appended to each sample on all its timestamps. Default to None.
+    '''
+
+    def __init__(self, windows, index, window_idx=None, extra=None):
+        self.windows = windows
+        self.index = index
+        self.window_idx = window_idx
+        self.extra = extra
+        window_len = windows.shape[1] if window_idx is None else len(window_idx)
+        num_feature = windows.shape[2] + (0 if extra is None else extra.shape[1])
+        self.shape = (len(index), window_len, num_feature)
+        self.dtype = windows.dtype
+        self.ndim = 3
+
+    def __len__(self):
+        return self.shape[0]
+
+    def __getitem__(self, item):
+        rest = ()
+        if isinstance(item, tuple):
+            item, rest = item[0], item[1:]
+        result = self.windows[self.index[item]]
+        if self.window_idx is not None:
+            result = result[..., self.window_idx, :]
+        if self.extra is not None:
+            extra = self.extra[item]
+            extra = np.broadcast_to(extra[..., np.newaxis, :],
+                                    result.shape[:-1] + extra.shape[-1:])
+            result = np.concatenate([result, extra], axis=-1)
+        return result[rest] if rest else result
+
+    def __array__(self, dtype=None):
+        result = self[:]
+        return result if dtype is None else result.astype(dtype, copy=False)
+
+
+def _take_windows(windows, index, window_idx=None, extra=None):
+    if window_idx is None and extra is None and \
+            (len(index) == 0 or index[-1] - index[0] + 1 == len(index)):
+        # all the windows in a range are samples, return the view itself
+        start = index[0] if len(index) > 0 else 0
+        return windows[start:start + len(index)]
+    return RollingWindows(windows, index, window_idx, extra)
+
+
+def roll_timeseries_dataframe_zero_copy(df,
+                                        roll_feature_df,
+                                        lookback,
+                                        horizon,
+                                        feature_col,
+                                        target_col,
+                                        id_col,
+                                        id_sensitive=False):
+    '''
+    roll dataframe of all the ids into read-only views over one contiguous array, instead of
+    a copy of each sample.
+
+    :param df: a dataframe which has been resampled in uniform frequency.
+    :param roll_feature_df: an additional rolling feature dataframe that will
+           be append to final result. It is not supported if id_sensitive is True.
+    :param lookback: the length of the past sequence
+    :param horizon: int or list, same as roll_timeseries_dataframe.
+    :param feature_col: list, indicate the feature col name.
+    :param target_col: list, indicate the target col name.
+    :param id_col: the id col name.
+    :param id_sensitive: bool, same as TSDataset.roll. If True, the time series of all the ids
+           should be aligned.
+    :return: x, y
+        x: a ndarray view in format (no. of samples, lookback, feature_col length) if all the
+           windows of the data are samples, otherwise a RollingWindows of the same shape.
+        y: same as x in format (no. of samples, horizon, target_col length)
+    Note: Specially, if `horizon` is set to 0, then y will be None.
+    '''
+    assert not (id_sensitive and roll_feature_df is not None)
+    id_list = np.unique(df[id_col])
+    code = pd.Categorical(df[id_col], categories=id_list).codes
+    # the only copy of the data
+    data = df[target_col + feature_col].to_numpy(dtype=np.float32)
+    if not np.all(code[:-1] <= code[1:]):
+        order = np.argsort(code, kind="stable")
+        data, code = data[order], code[order]
+    length = np.bincount(code, minlength=len(id_list))
+    offset = np.concatenate([[0], np.cumsum(length)[:-1]])
+    num_target = len(target_col)
+
+    if id_sensitive:
+        # wide array of the targets of all the ids followed by the features of all the ids
+        num_id, num_timestep = len(id_list), length[0]
+        data = data.reshape(num_id, num_timestep, -1).transpose(1, 0, 2)
+        data = np.concatenate([data[:, :, :num_target].reshape(num_timestep, -1),
+                               data[:, :, num_target:].reshape(num_timestep, -1)], axis=1)
+        num_target *= num_id
+        length, offset = length[:1], offset[:1]
+
+    max_horizon, horizon_idx = _window_index(horizon)
+    num_window = np.maximum(length - lookback - max_horizon + 1, 0)
+    start = np.concatenate([np.arange(o, o + n) for o, n in zip(offset, num_window)]
+                           + [np.zeros(0, dtype=np.int64)]).astype(np.int64)
+    valid = _valid_window(np.isnan(data).any(axis=1), start, lookback)
+    if max_horizon > 0:
+        valid &= _valid_window(np.isnan(data[:, :num_target]).any(axis=1), start + lookback,
+                               max_horizon, horizon_idx)
+    index = start[valid]
+
+    extra = None
+    if roll_feature_df is not None:
+        # the i-th sample of each id takes the i-th row of roll_feature_df
+        sample_id = np.repeat(np.arange(len(num_window)), num_window)[valid]
+        position = np.arange(len(sample_id)) - np.searchsorted(sample_id, sample_id)
+        extra = roll_feature_df.to_numpy(dtype=np.float32)[position]
+
+    x = _take_windows(_sliding_window(data, lookback), index, extra=extra)
+    if max_horizon == 0:
+        return x, None
+    y = _take_windows(_sliding_window(data[:, :num_target], max_horizon), index + lookback,
+                      window_idx=horizon_idx)
+    return x, y
@@ -29,7 +29,7 @@ def get_roll_start_idx(df, id_col, window_size):
         id_start_idxes = df.index[df[id_col] != df[id_col].shift(1)].tolist() + [len(df.index)]
     roll_start_idx_iter = ((range(id_start_idxes[i], id_start_idxes[i+1] - window_size + 1))
                            for i in range(len(id_start_idxes) - 1))
-    roll_start_idxes = np.fromiter(itertools.chain.from_iterable(roll_start_idx_iter), np.int)
+    roll_start_idxes = np.fromiter(itertools.chain.from_iterable(roll_start_idx_iter), np.int64)
     return roll_start_idxes
 
 
@@ -60,7 +60,7 @@ class RollDataset(Dataset):
         _check_cols_no_na(df, col_names=target_col + feature_col)
         cols = target_col + feature_col
         cols = cols[0] if len(cols) == 1 else cols
-        self.arr = df.loc[:, cols].to_numpy()
+        self.arr = df.loc[:, cols].to_numpy().astype(np.float32)
         self.arr = np.expand_dims(self.arr, axis=1) if self.arr.ndim == 1 else self.arr
         max_horizon = horizon if isinstance(horizon, int) else max(horizon)
         window_size = lookback + max_horizon
@@ -68,24 +68,50 @@ class RollDataset(Dataset):
         self.lookback = lookback
         self.horizon = horizon
         self.target_num = len(target_col)
+        # offsets of the rows of x and y to the start of a window
+        self.x_offsets = np.arange(lookback)
+        if isinstance(horizon, int):
+            self.y_offsets = lookback + np.arange(horizon)
+        else:
+            self.y_offsets = lookback + np.array(horizon) - 1
 
     def __len__(self):
         return self.roll_start_idxes.size
 
     def __getitem__(self, idx):
+        """
+        :param idx: the index of a sample, or a list or 1-d ndarray of indices of a batch of
+               samples, which are gathered with one fancy indexing.
+        """
         start_idx = self.roll_start_idxes[idx]
-        x = self.arr[start_idx: start_idx + self.lookback]
-        x = torch.from_numpy(x).float()
+        if np.ndim(start_idx) == 0:
+            x = self.arr[start_idx: start_idx + self.lookback].copy()
+        else:
+            x = self.arr[start_idx[:, np.newaxis] + self.x_offsets]
+        x = torch.from_numpy(x)
         if self.horizon == 0:
             return x
 
         # cal y
-        arr_target_only = self.arr[:, :self.target_num]
-        if isinstance(self.horizon, int):
-            y = arr_target_only[start_idx + self.lookback: start_idx + self.lookback + self.horizon]
-        else:
-            # horizon is a list of int
-            horizons = np.array(self.horizon)
-            y = np.take(arr_target_only, horizons + start_idx + self.lookback - 1, axis=0)
-        y = torch.from_numpy(y).float()
+        y_idx = np.add.outer(start_idx, self.y_offsets)
+        y = torch.from_numpy(self.arr[y_idx, :self.target_num])
         return x, y
+
+    def to_data_loader(self, batch_size, shuffle=True, num_workers=0):
+        """
+        Create a DataLoader that generates whole batches, each with one gather over the
+        rolled windows instead of collating batch_size samples.
+
+        :param batch_size: the number of samples in each batch.
+        :param shuffle: whether to reshuffle the samples on every epoch. Default to True.
+        :param num_workers: the number of worker processes that prepare batches in the
+               background. Default to 0, where batches are prepared in the main process.
+
+        :return: A pytorch DataLoader instance.
+        """
+        from torch.utils.data import DataLoader, BatchSampler, RandomSampler, SequentialSampler
+        sampler = RandomSampler(self) if shuffle else SequentialSampler(self)
+        return DataLoader(self,
+                          batch_size=None,
+                          sampler=BatchSampler(sampler, batch_size, drop_last=False),
+                          num_workers=num_workers)
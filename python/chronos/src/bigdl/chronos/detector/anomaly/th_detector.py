@@ -37,6 +37,20 @@ class Distance(ABC):
         """
         pass
 
+    def batch_dist(self, x, y):
+        """
+        Calculate the distances between each sample of x and y. x and y should be in
+        same shape, with the first dim as the number of samples. Subclasses may override
+        this with an array level implementation, the default one calls abs_dist on each
+        sample.
+
+        :param x: the first tensor
+        :param y: the second tensor
+        :return: 1-D array of the absolute distances between each sample of x and y
+        """
+        return np.fromiter((self.abs_dist(m, n) for m, n in zip(x, y)),
+                           dtype=np.float64, count=len(x))
+
 
 class EuclideanDistance(Distance):
     """
@@ -49,12 +63,55 @@ class EuclideanDistance(Distance):
     def abs_dist(self, x, y):
         return np.linalg.norm(x - y)
 
+    def batch_dist(self, x, y):
+        diff = np.asarray(x, dtype=np.float64) - np.asarray(y, dtype=np.float64)
+        return np.linalg.norm(diff.reshape(len(diff), -1), axis=1)
+
+
+def _iter_chunks(num_samples, chunk_size=None):
+    chunk_size = chunk_size or num_samples
+    for start in range(0, num_samples, max(chunk_size, 1)):
+        yield start, min(start + chunk_size, num_samples)
+
+
+def compute_dist(y, yhat, dist_measure=EuclideanDistance(), chunk_size=None):
+    """
+    Calculate the distances between each sample of y and yhat chunk by chunk, so that
+    y and yhat can be out-of-core arrays (e.g. np.memmap or h5py datasets) which are
+    only read chunk_size samples at a time.
+
+    :param y: actual values
+    :param yhat: predicted values
+    :param dist_measure: measure of distance
+    :param chunk_size: the number of samples to calculate at a time. None for all samples
+        at once.
+    :return: 1-D array of the distances, in shape (num_samples,)
+    """
+    dist = np.empty(len(y), dtype=np.float64)
+    for start, end in _iter_chunks(len(y), chunk_size):
+        dist[start:end] = dist_measure.batch_dist(y[start:end], yhat[start:end])
+    return dist
+
+
+def _threshold_from_dist(diff, mode, ratio):
+    if mode == "default":
+        threshold = np.percentile(diff, (1 - ratio) * 100)
+        return threshold
+    elif mode == "gaussian":
+        from scipy.stats import norm
+        mu, sigma = norm.fit(diff)
+        t = norm.ppf(1 - ratio)
+        return t * sigma + mu
+    else:
+        raise ValueError("Does not support", mode)
+
 
 def estimate_th(y,
                 yhat,
                 mode="default",
                 ratio=0.01,
-                dist_measure=EuclideanDistance()):
+                dist_measure=EuclideanDistance(),
+                chunk_size=None):
     """
     Estimate the threshold based on y and yhat
 
@@ -65,30 +122,19 @@ def estimate_th(y,
         "gaussian": fit data to a gaussian distribution
     :param ratio: the ratio of anomaly to consider as anomaly.
     :param dist_measure: measure of distance
+    :param chunk_size: the number of samples to calculate distances at a time
     :return: the threshold
     """
     assert y.shape == yhat.shape
-    diff = [dist_measure.abs_dist(m, n) for m, n in zip(y, yhat)]
-    if mode == "default":
-        threshold = np.percentile(diff, (1 - ratio) * 100)
-        return threshold
-    elif mode == "gaussian":
-        from scipy.stats import norm
-        mu, sigma = norm.fit(diff)
-        t = norm.ppf(1 - ratio)
-        return t * sigma + mu
-    else:
-        raise ValueError("Does not support", mode)
+    diff = compute_dist(y, yhat, dist_measure, chunk_size)
+    return _threshold_from_dist(diff, mode, ratio)
 
 
-def detect_all(y, yhat, th, dist_measure):
-    anomaly_scores = np.zeros_like(y)
-    anomaly_indexes = []
-    for i, (y_i, yhat_i) in enumerate(zip(y, yhat)):
-        if dist_measure.abs_dist(y_i, yhat_i) > th:
-            anomaly_indexes.append(i)
-            anomaly_scores[i] = 1
-    return anomaly_indexes, anomaly_scores
+def detect_all(y, yhat, th, dist_measure, chunk_size=None):
+    anomaly_scores = np.zeros(y.shape, dtype=y.dtype)
+    is_anomaly = compute_dist(y, yhat, dist_measure, chunk_size) > th
+    anomaly_scores[is_anomaly] = 1
+    return np.flatnonzero(is_anomaly).tolist(), anomaly_scores
 
 
 def detect_range(y, th):
@@ -104,14 +150,15 @@ def detect_range_arr(y, th_arr):
     anomaly_indexes = np.logical_or(min_diff < 0, max_diff > 0)
     anomaly_scores = np.zeros_like(y)
     anomaly_scores[anomaly_indexes] = 1
-    # anomaly_index.update(np.where(max_diff > 0)[0])
-    return list(set(np.where(anomaly_scores > 0)[0])), anomaly_scores
+    is_anomaly = anomaly_indexes.reshape(len(y), -1).any(axis=1)
+    return np.flatnonzero(is_anomaly).tolist(), anomaly_scores
 
 
 def detect_anomaly(y,
                    yhat=None,
                    th=math.inf,
-                   dist_measure=EuclideanDistance()):
+                   dist_measure=EuclideanDistance(),
+                   chunk_size=None):
     """
     Detect anomalies. Each sample can have 1 or more dimensions.
 
@@ -126,13 +173,14 @@ def detect_anomaly(y,
         2. a tuple (min, max) - min and max are either int/float or tensors in same shape as y,
         yhat is ignored in this case
     :param dist_measure: measure of distance
+    :param chunk_size: the number of samples to calculate distances at a time
     :return: the anomaly values indexes in the samples, i.e. num_samples dimension.
     """
     if isinstance(th, int) or isinstance(th, float):
         if yhat is None:
             raise ValueError("Please specify a threshold range (min,max) "
                              "if forecast values are not available")
-        return detect_all(y, yhat, th, dist_measure)
+        return detect_all(y, yhat, th, dist_measure, chunk_size)
     elif isinstance(th, tuple) and len(th) == 2:
         # min max values are scalars
         if (isinstance(th[0], int) or isinstance(th[0], float)) \
@@ -167,6 +215,10 @@ class ThresholdDetector(AnomalyDetector):
             >>> td.fit(y_test, y_pred)
             >>> anomaly_scores = td.score()
             >>> anomaly_indexes = td.anomaly_indexes()
+            >>> # detect on a stream, the threshold is updated as new points arrive
+            >>> td = ThresholdDetector()
+            >>> for y_batch, y_pred_batch in stream:
+            >>>     batch_scores = td.partial_fit(y_batch, y_pred_batch)
     """
 
     def __init__(self):
@@ -177,14 +229,27 @@ class ThresholdDetector(AnomalyDetector):
         self.ratio = 0.01
         self.dist_measure = EuclideanDistance()
         self.mode = "default"
+        self.chunk_size = None
+        self.reservoir_size = 100000
         self.anomaly_indexes_ = None
         self.anomaly_scores_ = None
+        self._reset_online_state(math.inf)
+
+    def _reset_online_state(self, threshold):
+        # the threshold is estimated from the data if it is not specified by users
+        self._estimate_th = not isinstance(threshold, tuple) and threshold == math.inf
+        self._num_seen = 0
+        self._dist_mean = 0.0
+        self._dist_m2 = 0.0
+        self._reservoir = None
 
     def set_params(self,
                    mode="default",
                    ratio=0.01,
                    threshold=math.inf,
-                   dist_measure=EuclideanDistance()):
+                   dist_measure=EuclideanDistance(),
+                   chunk_size=None,
+                   reservoir_size=100000):
         """
         Set parameters for ThresholdDetector
 
@@ -199,11 +264,20 @@ class ThresholdDetector(AnomalyDetector):
             2. a tuple (min, max) - min and max are either int/float or tensors in same shape as y,
             yhat is ignored in this case
         :param dist_measure: measure of distance
+        :param chunk_size: the number of samples to calculate distances at a time, which
+            bounds the memory of intermediate results for large or out-of-core inputs.
+            Default to None, which calculates all samples at once.
+        :param reservoir_size: the number of distances sampled to estimate the threshold
+            in "default" mode of partial_fit. The estimation is exact until more than
+            reservoir_size samples are seen.
         """
         self.ratio = ratio
         self.dist_measure = dist_measure
         self.mode = mode
         self.th = threshold
+        self.chunk_size = chunk_size
+        self.reservoir_size = reservoir_size
+        self._reset_online_state(threshold)
 
     def fit(self, y, y_pred=None):
         """
@@ -219,11 +293,85 @@ class ThresholdDetector(AnomalyDetector):
                                   y_pred,
                                   mode=self.mode,
                                   ratio=self.ratio,
-                                  dist_measure=self.dist_measure)
+                                  dist_measure=self.dist_measure,
+                                  chunk_size=self.chunk_size)
         # calculate anomalies in advance in case score does not specify input
-        anomalies = detect_anomaly(y, y_pred, self.th, self.dist_measure)
+        anomalies = detect_anomaly(y, y_pred, self.th, self.dist_measure, self.chunk_size)
         self.anomaly_indexes_ = anomalies[0]
         self.anomaly_scores_ = anomalies[1]
+        # partial_fit keeps the threshold of fit until set_params is called and continues
+        # the indexes after the samples of fit
+        self._reset_online_state(self.th)
+        self._num_seen = len(y)
+
+    def partial_fit(self, y, y_pred=None):
+        """
+        Fit the model incrementally on a new batch of a stream. If the threshold is neither
+        specified nor estimated by fit, the statistics of the distances are updated with the
+        batch and the threshold is re-estimated from all the samples seen so far before
+        detecting the batch. In "default" mode the percentile is estimated on a reservoir
+        sample of the distances, in "gaussian" mode the mean and std are updated exactly.
+        A threshold estimated by fit is kept until a new one is set by set_params, and the
+        indexes of the anomalies continue after the samples of fit.
+
+        :param y: a new batch of the values to detect. shape could be 1-D (num_samples,)
+            or 2-D array (num_samples, features)
+        :param y_pred: the estimated values of the batch, a tensor with same shape as y
+            could be None when threshold is a tuple
+
+        :return: anomaly score for each sample of the batch. anomaly_indexes() returns the
+            indexes of all the anomalies seen so far, counted from the first batch.
+        """
+        if self._estimate_th and y_pred is not None:
+            dist = compute_dist(y, y_pred, self.dist_measure, self.chunk_size)
+            self._update_dist_stats(dist)
+            if self.mode == "gaussian":
+                from scipy.stats import norm
+                sigma = math.sqrt(self._dist_m2 / self._num_seen)
+                self.th = norm.ppf(1 - self.ratio) * sigma + self._dist_mean
+            else:
+                self.th = _threshold_from_dist(self._reservoir[:min(self._num_seen,
+                                                                    self.reservoir_size)],
+                                               self.mode, self.ratio)
+            is_anomaly = dist > self.th
+            anomaly_scores = np.zeros(y.shape, dtype=y.dtype)
+            anomaly_scores[is_anomaly] = 1
+            anomalies = (np.flatnonzero(is_anomaly).tolist(), anomaly_scores)
+            offset = self._num_seen - len(y)
+        else:
+            anomalies = detect_anomaly(y, y_pred, self.th, self.dist_measure, self.chunk_size)
+            offset = self._num_seen
+            self._num_seen += len(y)
+        if self.anomaly_indexes_ is None:
+            self.anomaly_indexes_ = []
+        self.anomaly_indexes_ += [offset + i for i in anomalies[0]]
+        self.anomaly_scores_ = anomalies[1]
+        return self.anomaly_scores_
+
+    def _update_dist_stats(self, dist):
+        if self.mode not in ("default", "gaussian"):
+            raise ValueError("Does not support", self.mode)
+        n = len(dist)
+        if n == 0:
+            return
+        # merge the mean and sum of squared deviations of the batch (Chan et al.)
+        batch_mean = dist.mean()
+        batch_m2 = ((dist - batch_mean) ** 2).sum()
+        total = self._num_seen + n
+        delta = batch_mean - self._dist_mean
+        self._dist_mean += delta * n / total
+        self._dist_m2 += batch_m2 + delta ** 2 * self._num_seen * n / total
+        # reservoir sampling (algorithm R) of the distances
+        if self._reservoir is None:
+            self._reservoir = np.empty(self.reservoir_size, dtype=np.float64)
+        positions = np.arange(self._num_seen, total)
+        fill = positions < self.reservoir_size
+        self._reservoir[positions[fill]] = dist[fill]
+        if not fill.all():
+            slots = np.random.randint(0, positions[~fill] + 1)
+            keep = slots < self.reservoir_size
+            self._reservoir[slots[keep]] = dist[~fill][keep]
+        self._num_seen = total
 
     def score(self, y=None, y_pred=None):
         """
@@ -16,13 +16,14 @@
 
 from bigdl.chronos.forecaster.abstract import Forecaster
 from bigdl.chronos.forecaster.utils import\
-    np_to_creator, set_pytorch_seed, check_data, xshard_to_np, np_to_xshard, loader_to_creator
+    np_to_creator, set_pytorch_seed, check_data, xshard_to_np, np_to_xshard, loader_to_creator, \
+    is_xshards, iter_batches, write_batch
 from bigdl.chronos.metric.forecast_metrics import Evaluator
 
 import numpy as np
+import time
 import warnings
 import torch
-from functools import partial
 from torch.utils.data import TensorDataset, DataLoader
 
 
@@ -58,6 +59,7 @@ class BasePytorchForecaster(Forecaster):
 
             # Model preparation
             self.fitted = False
+            self.inference_stats = None
             model = self.model_creator({**self.model_config, **self.data_config})
             loss = self.loss_creator(self.loss_config)
             optimizer = self.optimizer_creator(model, self.optim_config)
@@ -87,6 +89,10 @@ class BasePytorchForecaster(Forecaster):
                | should be the same as past_seq_len and input_feature_num.
                | y's shape is (num_samples, horizon, target_dim), where horizon and target_dim
                | should be the same as future_seq_len and output_feature_num.
+               |
+               | 4. a bigdl.chronos.data.experimental.XShardsTSDataset which has been rolled:
+               | it is converted by to_xshards() without being collected to the driver if the
+               | forecaster is distributed.
 
         :param epochs: Number of epochs you want to train. The value defaults to 1.
         :param batch_size: Number of batch size you want to train. The value defaults to 32.
@@ -97,6 +103,12 @@ class BasePytorchForecaster(Forecaster):
         :return: Evaluation results on data.
         """
         # input transform
+        try:
+            from bigdl.chronos.data.experimental import XShardsTSDataset
+            if isinstance(data, XShardsTSDataset):
+                data = data.to_xshards()
+        except ImportError:
+            pass
         if isinstance(data, DataLoader) and self.distributed:
             data = loader_to_creator(data)
         if isinstance(data, tuple) and self.distributed:
@@ -164,21 +176,33 @@ class BasePytorchForecaster(Forecaster):
                | 2. a xshard item:
                | each partition can be a dictionary of {'x': x}, where x's shape
                | should follow the shape stated before.
+               | 3. an iterable (e.g. a generator) of numpy ndarray:
+               | each item can be a single window x in shape (lookback, feature_dim) or
+               | a batch of windows in shape stated before. This is only supported by a
+               | non-distributed forecaster.
 
         :param batch_size: predict batch size. The value will not affect predict
-               result but will affect resources cost(e.g. memory and time).
+               result but will affect resources cost(e.g. memory and time). For a
+               non-distributed forecaster, the data is predicted batch by batch into a
+               preallocated output, so that the memory cost is bounded by batch_size.
         :param quantize: if use the quantized model to predict.
 
         :return: A numpy array with shape (num_samples, horizon, target_dim)
-                 if data is a numpy ndarray. A xshard item with format {‘prediction’: result},
-                 where result is a numpy array with shape (num_samples, horizon, target_dim)
-                 if data is a xshard item.
+                 if data is a numpy ndarray or an iterable. A xshard item with format
+                 {‘prediction’: result}, where result is a numpy array with shape
+                 (num_samples, horizon, target_dim) if data is a xshard item.
+                 For a non-distributed forecaster, the number of samples, the time cost
+                 and the throughput are recorded in `inference_stats`.
         """
         # data transform
         is_local_data = isinstance(data, np.ndarray)
+        is_xshards_data = is_xshards(data)
+        if self.distributed and not (is_local_data or is_xshards_data):
+            raise ValueError("Only numpy ndarray and xshards are supported by a distributed "
+                             f"forecaster, but found {type(data)}.")
         if is_local_data and self.distributed:
             data = np_to_xshard(data)
-        if not is_local_data and not self.distributed:
+        if is_xshards_data and not self.distributed:
             data = xshard_to_np(data, mode="predict")
 
         if self.distributed:
@@ -194,10 +218,11 @@ class BasePytorchForecaster(Forecaster):
         else:
             if not self.fitted:
                 raise RuntimeError("You must call fit or restore first before calling predict!")
-            yhat = self.internal.inference(torch.from_numpy(data),
-                                           backend=None,
-                                           quantize=quantize).numpy()
-            if not is_local_data:
+            num_samples = len(data) if isinstance(data, np.ndarray) else None
+            yhat, _ = self._inference_stream(iter_batches(data, batch_size),
+                                             quantize=quantize,
+                                             num_samples=num_samples)
+            if is_xshards_data:
                 yhat = np_to_xshard(yhat, prefix="prediction")
             return yhat
 
@@ -257,9 +282,14 @@ class BasePytorchForecaster(Forecaster):
                | 2. a xshard item:
                | each partition can be a dictionary of {'x': x, 'y': y}, where x and y's shape
                | should follow the shape stated before.
+               | 3. an iterable (e.g. a generator) of numpy ndarray tuple (x, y):
+               | each item can be a single window or a batch of windows. This is only
+               | supported by a non-distributed forecaster.
 
         :param batch_size: evaluate batch size. The value will not affect evaluate
-               result but will affect resources cost(e.g. memory and time).
+               result but will affect resources cost(e.g. memory and time). For a
+               non-distributed forecaster, the data is predicted batch by batch into a
+               preallocated output, so that the memory cost is bounded by batch_size.
         :param multioutput: Defines aggregating of multiple output values.
                String in ['raw_values', 'uniform_average']. The value defaults to
                'raw_values'.The param is only effective when the forecaster is a
@@ -270,8 +300,13 @@ class BasePytorchForecaster(Forecaster):
         """
         # data transform
         is_local_data = isinstance(data, tuple)
-        if not is_local_data and not self.distributed:
+        is_xshards_data = is_xshards(data)
+        if self.distributed and not (is_local_data or is_xshards_data):
+            raise ValueError("Only numpy ndarray tuple and xshards are supported by a "
+                             f"distributed forecaster, but found {type(data)}.")
+        if is_xshards_data and not self.distributed:
             data = xshard_to_np(data, mode="fit")
+            is_local_data = True
         if self.distributed:
             if is_local_data:
                 return self.internal.evaluate(data=np_to_creator(data),
@@ -282,13 +317,44 @@ class BasePytorchForecaster(Forecaster):
         else:
             if not self.fitted:
                 raise RuntimeError("You must call fit or restore first before calling evaluate!")
-            yhat_torch = self.internal.inference(torch.from_numpy(data[0]),
-                                                 backend=None,
-                                                 quantize=quantize)
+            if is_local_data:
+                yhat, _ = self._inference_stream(iter_batches(data, batch_size),
+                                                 quantize=quantize,
+                                                 num_samples=len(data[0]))
+                y = data[1]
+            else:
+                yhat, y = self._inference_stream(iter_batches(data, batch_size),
+                                                 quantize=quantize,
+                                                 with_target=True)
 
             aggregate = 'mean' if multioutput == 'uniform_average' else None
-            return Evaluator.evaluate(self.metrics, data[1],
-                                      yhat_torch.numpy(), aggregate=aggregate)
+            return Evaluator.evaluate(self.metrics, y, yhat, aggregate=aggregate)
+
+    def _inference_stream(self, batches, quantize=False, num_samples=None, with_target=False):
+        """
+        Predict the batches generated by iter_batches with the pytorch model and write the
+        results into a preallocated array, so that only one batch of activations is alive
+        at a time. The throughput is recorded in self.inference_stats.
+
+        :return: A tuple of the prediction and the target (None if with_target is False).
+        """
+        self.internal.eval(quantize=quantize)
+        yhat, y, pos = None, None, 0
+        start = time.perf_counter()
+        with torch.no_grad():
+            for batch in batches:
+                batch_yhat = self.internal(torch.from_numpy(batch[0])).numpy()
+                yhat = write_batch(yhat, pos, batch_yhat, num_samples)
+                if with_target:
+                    y = write_batch(y, pos, batch[1], num_samples)
+                pos += len(batch_yhat)
+        elapsed = time.perf_counter() - start
+        if yhat is None:
+            raise ValueError("There is no sample in the input data.")
+        self.inference_stats = {"num_samples": pos,
+                                "time_sec": elapsed,
+                                "samples_per_sec": pos / elapsed if elapsed > 0 else float("inf")}
+        return yhat[:pos], y[:pos] if with_target else None
 
     def evaluate_with_onnx(self, data,
                            batch_size=32,
@@ -89,3 +89,71 @@ def check_data(x, y, data_config):
         "The y shape should be (batch_size, future_seq_len, output_feature_num), "\
         "Got output_feature_num of {} in config while y input shape of {}."\
         .format(data_config["output_feature_num"], y.shape[-1])
+
+
+def _as_batch(item, sample_ndim):
+    item = tuple(np.asarray(i) for i in (item if isinstance(item, (tuple, list)) else (item,)))
+    if item[0].ndim == sample_ndim:
+        # a single sample
+        item = tuple(i[np.newaxis] for i in item)
+    return item
+
+
+def iter_batches(data, batch_size, sample_ndim=2):
+    '''
+    yield tuples of numpy ndarrays with at most batch_size samples.
+
+    :param data: a numpy ndarray, a tuple of numpy ndarrays such as (x, y), or an iterable
+           (e.g. a generator) of them, where each item is a single sample or a batch of samples.
+    :param batch_size: the maximum number of samples in each batch.
+    :param sample_ndim: the ndim of a single sample of the first array, which is used to tell
+           a single sample from a batch of samples.
+    '''
+    if isinstance(data, np.ndarray) or \
+            (isinstance(data, tuple) and isinstance(data[0], np.ndarray)):
+        data = _as_batch(data, sample_ndim)
+        for start in range(0, len(data[0]), batch_size):
+            yield tuple(d[start:start + batch_size] for d in data)
+        return
+
+    pieces, num_buffered = [], 0
+    for item in data:
+        pieces.append(_as_batch(item, sample_ndim))
+        num_buffered += len(pieces[-1][0])
+        if num_buffered < batch_size:
+            continue
+        merged = tuple(np.concatenate(arrays, axis=0) if len(pieces) > 1 else arrays[0]
+                       for arrays in zip(*pieces))
+        start = 0
+        while num_buffered - start >= batch_size:
+            yield tuple(m[start:start + batch_size] for m in merged)
+            start += batch_size
+        pieces = [tuple(m[start:] for m in merged)] if start < num_buffered else []
+        num_buffered -= start
+    if num_buffered > 0:
+        yield tuple(np.concatenate(arrays, axis=0) if len(pieces) > 1 else arrays[0]
+                    for arrays in zip(*pieces))
+
+
+def write_batch(out, pos, batch, num_samples=None):
+    '''
+    write batch into out[pos:] and return out, a new array with doubled capacity if out is
+    full. out is allocated with num_samples rows (or the size of batch) if it is None.
+    '''
+    if out is None:
+        out = np.empty((max(num_samples or 0, len(batch)),) + batch.shape[1:], dtype=batch.dtype)
+    elif pos + len(batch) > len(out):
+        grown = np.empty((max(2 * len(out), pos + len(batch)),) + out.shape[1:],
+                         dtype=out.dtype)
+        grown[:pos] = out[:pos]
+        out = grown
+    out[pos:pos + len(batch)] = batch
+    return out
+
+
+def is_xshards(data):
+    try:
+        from bigdl.orca.data.shard import SparkXShards
+        return isinstance(data, SparkXShards)
+    except ImportError:
+        return False
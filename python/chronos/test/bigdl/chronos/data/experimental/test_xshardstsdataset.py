@@ -181,3 +181,138 @@ class TestXShardsTSDataset(TestCase):
         collected_numpy = shards_numpy.collect()  # collect and valid
         x = np.concatenate([collected_numpy[i]['x'] for i in range(len(collected_numpy))], axis=0)
         assert x.shape == ((50-lookback-horizon+1)*2, lookback, 2)
+
+    def test_xshardstsdataset_scale_unscale(self):
+        from sklearn.preprocessing import StandardScaler, MaxAbsScaler, MinMaxScaler
+        scalers = [StandardScaler(), MaxAbsScaler(), MinMaxScaler()]
+        df = pd.read_csv(os.path.join(self.resource_path, "multiple.csv"))
+        for scaler in scalers:
+            shards_multiple = read_csv(os.path.join(self.resource_path, "multiple.csv"))
+            tsdata = XShardsTSDataset.from_xshards(shards_multiple, dt_col="datetime",
+                                                   target_col="value",
+                                                   extra_feature_col=["extra feature"],
+                                                   id_col="id")
+            tsdata_local = TSDataset.from_pandas(df, dt_col="datetime", target_col="value",
+                                                 extra_feature_col=["extra feature"],
+                                                 id_col="id")
+            # the statistics are merged from all the partitions
+            tsdata.scale(scaler)
+            tsdata_local.scale(type(scaler)())
+            collected_df = pd.concat(tsdata.shards.collect(), axis=0)
+            assert_array_almost_equal(collected_df[["value", "extra feature"]].values,
+                                      tsdata_local.to_pandas()[["value", "extra feature"]]
+                                      .values)
+
+            tsdata.roll(lookback=5, horizon=2)
+            unscaled = tsdata.unscale_xshards(tsdata.to_xshards(), key="y")
+            y = np.concatenate([shard["y"] for shard in unscaled.collect()], axis=0)
+            tsdata.unscale()
+            collected_df = pd.concat(tsdata.shards.collect(), axis=0)
+            assert_array_almost_equal(collected_df["value"].values, df["value"].values)
+            assert y.shape == ((50-5-2+1)*2, 2, 1)
+
+    def test_xshardstsdataset_impute(self):
+        def set_nan(shard):
+            shard = shard.copy()
+            shard.loc[shard.index[3:5], "value"] = np.nan
+            return shard
+        shards_multiple = read_csv(os.path.join(self.resource_path, "multiple.csv"))
+        shards_multiple = shards_multiple.transform_shard(set_nan)
+        num_nan = sum(shard["value"].isna().sum() for shard in shards_multiple.collect())
+        tsdata = XShardsTSDataset.from_xshards(shards_multiple, dt_col="datetime",
+                                               target_col="value",
+                                               extra_feature_col=["extra feature"], id_col="id")
+        tsdata.impute(mode="const", const_num=-1)
+        collected_df = pd.concat(tsdata.shards.collect(), axis=0)
+        assert num_nan > 0
+        assert collected_df["value"].isna().sum() == 0
+        assert (collected_df["value"] == -1).sum() == num_nan
+        assert len(collected_df) == 100
+
+    def test_xshardstsdataset_deduplicate(self):
+        def to_datetime_with_duplicates(df):
+            df = pd.concat([df, df.iloc[:5]], axis=0)
+            return df.assign(datetime=pd.to_datetime(df["datetime"]))
+        df = to_datetime_with_duplicates(pd.read_csv(os.path.join(self.resource_path,
+                                                                  "multiple.csv")))
+        shards_multiple = read_csv(os.path.join(self.resource_path, "multiple.csv"))
+        shards_multiple = shards_multiple.transform_shard(to_datetime_with_duplicates)
+        tsdata = XShardsTSDataset.from_xshards(shards_multiple, dt_col="datetime",
+                                               target_col="value",
+                                               extra_feature_col=["extra feature"], id_col="id")
+        tsdata_local = TSDataset.from_pandas(df, dt_col="datetime", target_col="value",
+                                             extra_feature_col=["extra feature"], id_col="id")
+        tsdata.deduplicate()
+        tsdata_local.deduplicate()
+        self._assert_same_as_local(tsdata, tsdata_local)
+        assert len(pd.concat(tsdata.shards.collect(), axis=0)) == 100
+
+    def test_xshardstsdataset_resample(self):
+        df = self._read_multiple_datetime()
+        for merge_mode in ["mean", "max"]:
+            tsdata = XShardsTSDataset.from_xshards(self._read_multiple_datetime_shards(),
+                                                   dt_col="datetime", target_col="value",
+                                                   extra_feature_col=["extra feature"],
+                                                   id_col="id")
+            tsdata_local = TSDataset.from_pandas(df, dt_col="datetime", target_col="value",
+                                                 extra_feature_col=["extra feature"],
+                                                 id_col="id")
+            tsdata.resample("2D", merge_mode=merge_mode)
+            tsdata_local.resample("2D", merge_mode=merge_mode)
+            self._assert_same_as_local(tsdata, tsdata_local)
+
+    def test_xshardstsdataset_gen_dt_feature(self):
+        df = self._read_multiple_datetime()
+        for features, one_hot_features in [("auto", None), ("all", ["WEEKDAY", "MONTH"]),
+                                           (["DAY", "IS_WEEKEND"], ["DAY"])]:
+            tsdata = XShardsTSDataset.from_xshards(self._read_multiple_datetime_shards(),
+                                                   dt_col="datetime", target_col="value",
+                                                   extra_feature_col=["extra feature"],
+                                                   id_col="id")
+            tsdata_local = TSDataset.from_pandas(df, dt_col="datetime", target_col="value",
+                                                 extra_feature_col=["extra feature"],
+                                                 id_col="id")
+            tsdata.gen_dt_feature(features, one_hot_features)
+            tsdata_local.gen_dt_feature(features, one_hot_features)
+            assert tsdata.feature_col == tsdata_local.feature_col
+            self._assert_same_as_local(tsdata, tsdata_local)
+
+        # string datetime
+        shards_multiple = read_csv(os.path.join(self.resource_path, "multiple.csv"))
+        tsdata = XShardsTSDataset.from_xshards(shards_multiple, dt_col="datetime",
+                                               target_col="value",
+                                               extra_feature_col=["extra feature"], id_col="id")
+        with pytest.raises(AssertionError):
+            tsdata.gen_dt_feature()
+
+        # a single record of each id
+        shards_single_record = self._read_multiple_datetime_shards()\
+            .transform_shard(lambda df: df.groupby("id").head(1))
+        tsdata = XShardsTSDataset.from_xshards(shards_single_record, dt_col="datetime",
+                                               target_col="value",
+                                               extra_feature_col=["extra feature"], id_col="id")
+        tsdata.gen_dt_feature("auto")
+        tsdata_all = XShardsTSDataset.from_xshards(shards_single_record, dt_col="datetime",
+                                                   target_col="value",
+                                                   extra_feature_col=["extra feature"],
+                                                   id_col="id")
+        tsdata_all.gen_dt_feature("all")
+        assert tsdata.feature_col == tsdata_all.feature_col
+
+    def _read_multiple_datetime(self):
+        df = pd.read_csv(os.path.join(self.resource_path, "multiple.csv"))
+        return df.assign(datetime=pd.to_datetime(df["datetime"]))
+
+    def _read_multiple_datetime_shards(self):
+        shards = read_csv(os.path.join(self.resource_path, "multiple.csv"))
+        return shards.transform_shard(
+            lambda df: df.assign(datetime=pd.to_datetime(df["datetime"])))
+
+    @staticmethod
+    def _assert_same_as_local(tsdata, tsdata_local):
+        columns = ["id", "datetime"] + tsdata.target_col + tsdata.feature_col
+        collected_df = pd.concat(tsdata.shards.collect(), axis=0)[columns]\
+            .sort_values(["id", "datetime"]).reset_index(drop=True)
+        local_df = tsdata_local.to_pandas()[columns]\
+            .sort_values(["id", "datetime"]).reset_index(drop=True)
+        assert_frame_equal(collected_df, local_df, check_dtype=False)
@@ -320,6 +320,39 @@ class TestTSDataset(ZooTestCase):
 
         tsdata._check_basic_invariants()
 
+    def test_tsdataset_roll_zero_copy(self):
+        df = get_multi_id_ts_df()
+        nan_df = df.copy()
+        nan_df.loc[10, "extra feature"] = np.nan
+        lookback = random.randint(1, 20)
+        for horizon in [0, random.randint(1, 10), [1, 3, 5]]:
+            # samples with n/a are dropped, which is only supported if id_sensitive is False
+            for data, id_sensitive in [(nan_df, False), (df, False), (df, True)]:
+                tsdata = TSDataset.from_pandas(data, dt_col="datetime", target_col="value",
+                                               extra_feature_col=["extra feature"], id_col="id")
+                tsdata.roll(lookback=lookback, horizon=horizon, id_sensitive=id_sensitive)
+                x, y = tsdata.to_numpy()
+                tsdata.roll(lookback=lookback, horizon=horizon, id_sensitive=id_sensitive,
+                            zero_copy=True)
+                view_x, view_y = tsdata.to_numpy()
+                assert view_x.shape == x.shape
+                np.testing.assert_array_equal(np.asarray(view_x), x)
+                np.testing.assert_array_equal(view_x[[0, 2]], x[[0, 2]])
+                if horizon == 0:
+                    assert view_y is None
+                else:
+                    assert view_y.shape == y.shape
+                    np.testing.assert_array_equal(np.asarray(view_y), y)
+
+        # a single id without n/a is rolled into views
+        tsdata = TSDataset.from_pandas(get_ts_df(), dt_col="datetime", target_col="value",
+                                       extra_feature_col=["extra feature"], id_col="id")
+        tsdata.roll(lookback=lookback, horizon=2, zero_copy=True)
+        x, y = tsdata.to_numpy()
+        assert isinstance(x, np.ndarray) and not x.flags.writeable
+        for x_batch, y_batch in tsdata.to_torch_data_loader(batch_size=32):
+            assert x_batch.shape[1:] == (lookback, 2) and y_batch.shape[1:] == (2, 1)
+
     def test_tsdataset_roll_order(self):
         df = pd.DataFrame({"datetime": np.array(['1/1/2019', '1/1/2019', '1/2/2019', '1/2/2019']),
                            "value": np.array([1.9, 2.3, 2.4, 2.6]),
@@ -964,7 +997,7 @@ class TestTSDataset(ZooTestCase):
             tsdata.get_cycle_length(top_k='3')
         with pytest.raises(AssertionError):
             tsdata.get_cycle_length(top_k=24)
-        
+
         df = pd.DataFrame({"datetime": pd.date_range('1/1/2019', periods=100),
                            "value": np.sin(np.array((0, 30, 45, 60, 90)*20)*np.pi/180),
                            "id": np.array(['00']*100),
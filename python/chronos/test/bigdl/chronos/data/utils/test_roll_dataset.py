@@ -105,6 +105,34 @@ class TestRollDataset:
         df = get_multi_id_ts_df()
         TestRollDataset.combination_tests_for_df(df)
 
+    def test_batch_getitem(self):
+        df = get_multi_id_ts_df()
+        for horizon in [random.randint(1, 10), [1, 4, 16], 0]:
+            roll_dataset = RollDataset(df=df,
+                                       lookback=random.randint(1, 20),
+                                       horizon=horizon,
+                                       feature_col=["extra feature"],
+                                       target_col=["value"],
+                                       id_col="id")
+            idx = np.random.permutation(len(roll_dataset))[:10]
+            batch = roll_dataset[idx]
+            samples = [roll_dataset[i] for i in idx]
+            if horizon == 0:
+                np.testing.assert_array_equal(batch.numpy(),
+                                              np.stack([x.numpy() for x in samples]))
+            else:
+                np.testing.assert_array_equal(batch[0].numpy(),
+                                              np.stack([x.numpy() for x, _ in samples]))
+                np.testing.assert_array_equal(batch[1].numpy(),
+                                              np.stack([y.numpy() for _, y in samples]))
+
+            num_samples = 0
+            for batch in roll_dataset.to_data_loader(batch_size=16, shuffle=False):
+                x = batch if horizon == 0 else batch[0]
+                assert x.shape[0] <= 16
+                num_samples += x.shape[0]
+            assert num_samples == len(roll_dataset)
+
     def test_df_nan(self):
         df = get_ts_df()
         df["value"][0] = np.nan
@@ -152,6 +152,73 @@ class TestThresholdDetector(TestCase):
         from scipy.stats import norm
         assert abs(td.th - (norm.ppf(1 - ratio) * sigma + mu)) < 0.04
 
+    def test_batch_dist(self):
+        from bigdl.chronos.detector.anomaly.th_detector import EuclideanDistance, Distance, \
+            compute_dist
+
+        class ManhattanDistance(Distance):
+            def abs_dist(self, x, y):
+                return np.abs(x - y).sum()
+
+        y = np.random.randn(100, 3)
+        y_pred = np.random.randn(100, 3)
+        for dist_measure in [EuclideanDistance(), ManhattanDistance()]:
+            expected = [dist_measure.abs_dist(m, n) for m, n in zip(y, y_pred)]
+            np.testing.assert_allclose(compute_dist(y, y_pred, dist_measure), expected)
+            np.testing.assert_allclose(compute_dist(y, y_pred, dist_measure, chunk_size=7),
+                                       expected)
+
+        td = ThresholdDetector()
+        td.set_params(ratio=0.1, chunk_size=16)
+        td.fit(y, y_pred)
+        expected = np.array(compute_dist(y, y_pred)) > td.th
+        assert td.anomaly_indexes() == list(np.where(expected)[0])
+
+    def test_partial_fit(self):
+        y = np.random.randn(1000)
+        y_pred = y + np.random.randn(1000)
+
+        for mode in ["default", "gaussian"]:
+            td = ThresholdDetector()
+            td.set_params(mode=mode, ratio=0.05)
+            td.fit(y, y_pred)
+            td_online = ThresholdDetector()
+            td_online.set_params(mode=mode, ratio=0.05)
+            for i in range(0, 1000, 300):
+                scores = td_online.partial_fit(y[i:i+300], y_pred[i:i+300])
+                assert scores.shape == y[i:i+300].shape
+            # the reservoir is larger than the stream, so the threshold is exact
+            assert abs(td.th - td_online.th) < 1e-6
+            last = np.where(np.abs(y - y_pred)[900:] > td.th)[0] + 900
+            assert [i for i in td_online.anomaly_indexes() if i >= 900] == list(last)
+
+        # a specified threshold is not updated
+        td = ThresholdDetector()
+        td.set_params(threshold=3)
+        td.partial_fit(y[:500], y_pred[:500])
+        td.partial_fit(y[500:], y_pred[500:])
+        assert td.th == 3
+        assert td.anomaly_indexes() == list(np.where(np.abs(y - y_pred) > 3)[0])
+
+        # the threshold estimated by fit is kept
+        td = ThresholdDetector()
+        td.set_params(ratio=0.05)
+        td.fit(y[:500], y_pred[:500])
+        th = td.th
+        td.partial_fit(y[500:], y_pred[500:] * 10)
+        assert td.th == th
+
+        # the indexes of partial_fit continue after the samples of fit
+        td = ThresholdDetector()
+        td.set_params(threshold=3)
+        td.fit(y[:500], y_pred[:500])
+        td.partial_fit(y[500:], y_pred[500:])
+        assert td.anomaly_indexes() == list(np.where(np.abs(y - y_pred) > 3)[0])
+        # fit after partial_fit starts counting from its own samples
+        td.fit(y[:500], y_pred[:500])
+        td.partial_fit(y[500:], y_pred[500:])
+        assert td.anomaly_indexes() == list(np.where(np.abs(y - y_pred) > 3)[0])
+
     def test_corner_cases(self):
         td = ThresholdDetector()
         with pytest.raises(RuntimeError):
@@ -180,5 +247,6 @@ class TestThresholdDetector(TestCase):
         with pytest.raises(ValueError):
             td.fit(y)
 
+
 if __name__ == "__main__":
     pytest.main([__file__])
@@ -80,6 +80,36 @@ class TestChronosModelTCNForecaster(TestCase):
         test_mse = forecaster.evaluate(test_data)
         assert test_mse[0].shape == test_data[1].shape[1:]
 
+    def test_tcn_forecaster_predict_stream(self):
+        train_data, val_data, test_data = create_data()
+        forecaster = TCNForecaster(past_seq_len=24,
+                                   future_seq_len=5,
+                                   input_feature_num=1,
+                                   output_feature_num=1,
+                                   kernel_size=4,
+                                   num_channels=[16, 16],
+                                   loss="mae",
+                                   lr=0.01)
+        forecaster.fit(train_data, epochs=1)
+        test_pred = forecaster.predict(test_data[0], batch_size=400)
+        test_pred_batch = forecaster.predict(test_data[0], batch_size=7)
+        np.testing.assert_allclose(test_pred, test_pred_batch, rtol=1e-5, atol=1e-6)
+        assert forecaster.inference_stats["num_samples"] == 400
+
+        # generator of single windows and batches of windows
+        def gen_windows():
+            for i in range(100):
+                yield test_data[0][i]
+            for i in range(100, 400, 50):
+                yield test_data[0][i:i+50]
+        test_pred_gen = forecaster.predict(gen_windows(), batch_size=32)
+        np.testing.assert_allclose(test_pred, test_pred_gen, rtol=1e-5, atol=1e-6)
+
+        test_mse = forecaster.evaluate(test_data, batch_size=400)
+        test_mse_gen = forecaster.evaluate(((test_data[0][i:i+30], test_data[1][i:i+30])
+                                            for i in range(0, 400, 30)), batch_size=64)
+        np.testing.assert_allclose(test_mse[0], test_mse_gen[0], rtol=1e-5, atol=1e-6)
+
     def test_tcn_forecaster_fit_loader(self):
         train_loader, _, _ = create_data(loader=True)
         forecaster = TCNForecaster(past_seq_len=24,
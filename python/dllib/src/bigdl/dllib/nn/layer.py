@@ -29,6 +29,8 @@ from bigdl.dllib.utils.common import get_spark_context
 from bigdl.dllib.utils.common import to_list
 from bigdl.dllib.utils.common import INTMAX, INTMIN, DOUBLEMAX
 from bigdl.dllib.utils.common import get_activation_by_name
+from bigdl.dllib.utils.common import use_bulk_tensors, bulk_tensor_files, bulk_tensor_threshold
+from bigdl.dllib.utils.common import write_bulk_tensors, read_bulk_tensors
 from bigdl.dllib.optim.optimizer import L1Regularizer, L2Regularizer, L1L2Regularizer
 from py4j.java_gateway import JavaObject
 from pyspark.rdd import RDD
@@ -377,6 +379,20 @@ class Layer(JavaValue, SharedStaticUtils):
         :param batch_size: total batch size of prediction.
         :return: a ndarray as the prediction result.
         """
+        X = to_list(X)
+        if isinstance(X[0], np.ndarray) and use_bulk_tensors(X):
+            # large inputs and outputs are exchanged with the JVM in bulk, and the outputs
+            # come back as one contiguous batch
+            with bulk_tensor_files(2) as (input_path, output_path):
+                shapes = write_bulk_tensors(input_path, X, self.bigdl_type)
+                output_shape = callBigDlFunc(self.bigdl_type,
+                                             "predictLocalToFile",
+                                             self.value,
+                                             input_path,
+                                             shapes,
+                                             batch_size,
+                                             output_path)
+                return read_bulk_tensors(output_path, [output_shape], self.bigdl_type)[0]
 
         jresults = callBigDlFunc(self.bigdl_type,
                                  "predictLocal",
@@ -508,7 +524,13 @@ class Layer(JavaValue, SharedStaticUtils):
         >>> (cAdd.get_weights()[0] == np.ones([4, 1])).all()
         True
         """
-        tensors = [JTensor.from_ndarray(param, self.bigdl_type) for param in to_list(weights)]
+        weights = to_list(weights)
+        if use_bulk_tensors(weights):
+            with bulk_tensor_files() as (path,):
+                shapes = write_bulk_tensors(path, weights, self.bigdl_type)
+                callBigDlFunc(self.bigdl_type, "setWeightsFromFile", self.value, path, shapes)
+            return
+        tensors = [JTensor.from_ndarray(param, self.bigdl_type) for param in weights]
         callBigDlFunc(self.bigdl_type, "setWeights", self.value, tensors)
 
     def get_weights(self):
@@ -517,10 +539,25 @@ class Layer(JavaValue, SharedStaticUtils):
 
         :return: list of numpy arrays which represent weight and bias
         """
-        tensorWeights = callBigDlFunc(self.bigdl_type,
-                                      "getWeights", self.value)
-        if tensorWeights is not None:
-            return [tensor.to_ndarray() for tensor in tensorWeights]
+        if use_bulk_tensors():
+            with bulk_tensor_files() as (path,):
+                # the JVM only writes the weights to the file if they reach the threshold,
+                # or returns them as JTensors otherwise
+                results = callBigDlFunc(self.bigdl_type, "getWeightsToFile", self.value,
+                                        path, bulk_tensor_threshold())
+                if results is None:
+                    weights = None
+                elif results and isinstance(results[0], JTensor):
+                    weights = [tensor.to_ndarray() for tensor in results]
+                else:
+                    weights = read_bulk_tensors(path, results, self.bigdl_type)
+        else:
+            tensorWeights = callBigDlFunc(self.bigdl_type,
+                                          "getWeights", self.value)
+            weights = None if tensorWeights is None else \
+                [tensor.to_ndarray() for tensor in tensorWeights]
+        if weights is not None:
+            return weights
         else:
             print("The layer does not have weight/bias")
             return None
@@ -32,12 +32,18 @@ import numpy as np
 import threading
 import tempfile
 import traceback
+from contextlib import contextmanager
 from bigdl.dllib.utils.engine import get_bigdl_classpath, is_spark_below_2_2
 
 INTMAX = 2147483647
 INTMIN = -2147483648
 DOUBLEMAX = 1.7976931348623157E308
 
+# ndarrays of at least this many bytes in total are exchanged with the JVM through a file in
+# shared memory, which the JVM reads and copies in bulk, instead of pickling them as JTensors.
+# Set it to None to always pickle.
+BULK_TENSOR_THRESHOLD = 1 << 20
+
 if sys.version >= '3':
     long = int
     unicode = str
@@ -292,10 +298,10 @@ class JTensor(object):
 
     def __reduce__(self):
         if self.indices is None:
-            return JTensor, (self.storage.tostring(), self.shape.tostring(), self.bigdl_type)
+            return JTensor, (self.storage.tobytes(), self.shape.tobytes(), self.bigdl_type)
         else:
-            return JTensor, (self.storage.tostring(), self.shape.tostring(), self.bigdl_type,
-                             self.indices.tostring())
+            return JTensor, (self.storage.tobytes(), self.shape.tobytes(), self.bigdl_type,
+                             self.indices.tobytes())
 
     def __str__(self):
         return self.__repr__()
@@ -723,6 +729,74 @@ def create_tmp_path():
     return tmp_file.name
 
 
+def use_bulk_tensors(arrays=None):
+    """
+    Whether to exchange the ndarrays with the JVM by bulk_tensor_files, or whether bulk
+    transfer is enabled if arrays is None.
+    """
+    if BULK_TENSOR_THRESHOLD is None:
+        return False
+    return arrays is None or sum(np.asarray(a).nbytes for a in arrays) >= BULK_TENSOR_THRESHOLD
+
+
+def bulk_tensor_threshold():
+    """
+    The minimum number of bytes of the tensors exchanged with the JVM by bulk_tensor_files.
+    """
+    return BULK_TENSOR_THRESHOLD
+
+
+@contextmanager
+def bulk_tensor_files(num_files=1):
+    """
+    Create files to exchange tensors with the JVM in bulk, which are in /dev/shm if it exists
+    so that the tensors never reach the disk, and remove them on exit.
+    """
+    shm_dir = "/dev/shm" if os.path.isdir("/dev/shm") else None
+    paths = []
+    try:
+        for _ in range(num_files):
+            fd, path = tempfile.mkstemp(prefix="bigdl_tensor_", dir=shm_dir)
+            os.close(fd)
+            paths.append(path)
+        yield paths
+    finally:
+        for path in paths:
+            os.remove(path)
+
+
+def write_bulk_tensors(path, arrays, bigdl_type="float"):
+    """
+    Write ndarrays one after another to the file at path as the little-endian values of
+    bigdl_type, which the JVM reads by readTensorsFromFile.
+
+    :return: the shapes of the ndarrays.
+    """
+    dtype = np.dtype(get_dtype(bigdl_type)).newbyteorder("<")
+    shapes = []
+    with open(path, "wb") as f:
+        for array in arrays:
+            array = np.ascontiguousarray(array, dtype=dtype)
+            f.write(array.data)
+            shapes.append(list(array.shape) if array.shape else [array.size])
+    return shapes
+
+
+def read_bulk_tensors(path, shapes, bigdl_type="float"):
+    """
+    Read the tensors of shapes, which the JVM writes by writeTensorsToFile, from the file at
+    path. Each tensor is read into one contiguous ndarray.
+    """
+    dtype = np.dtype(get_dtype(bigdl_type)).newbyteorder("<")
+    arrays = []
+    with open(path, "rb") as f:
+        for shape in shapes:
+            count = int(np.prod(shape))
+            arrays.append(np.fromfile(f, dtype=dtype, count=count)
+                          .astype(get_dtype(bigdl_type), copy=False).reshape(shape))
+    return arrays
+
+
 def text_from_path(path):
     sc = get_spark_context()
     return sc.textFile(path).collect()[0]
@@ -63,5 +63,47 @@ class TestPickler():
         assert isinstance(back.value[0], list)
         assert isinstance(back.value[0][0], JTensor)
 
+    def test_bulk_tensors(self):
+        import bigdl.dllib.utils.common as common
+        linear = Linear(512, 1024)
+        weights = [np.random.random([1024, 512]), np.random.random([1024])]
+        data = np.random.random([600, 512]).astype("float32")
+        linear.set_weights(weights)
+        bulk_weights = linear.get_weights()
+        bulk_result = linear.predict_local(data)
+        threshold = common.BULK_TENSOR_THRESHOLD
+        common.BULK_TENSOR_THRESHOLD = None
+        try:
+            pickled_weights = linear.get_weights()
+            pickled_result = linear.predict_local(data)
+        finally:
+            common.BULK_TENSOR_THRESHOLD = threshold
+        for w, bulk_w, pickled_w in zip(weights, bulk_weights, pickled_weights):
+            assert_allclose(bulk_w, w, rtol=1e-6)
+            assert_array_equal(bulk_w, pickled_w)
+        assert bulk_result.shape == (600, 1024)
+        assert_array_equal(bulk_result, pickled_result)
+
+    def test_bulk_tensors_small_weights(self):
+        from bigdl.dllib.utils.common import use_bulk_tensors
+        linear = Linear(4, 2)
+        weights = [np.random.random([2, 4]), np.random.random([2])]
+        linear.set_weights(weights)
+        assert use_bulk_tensors() and not use_bulk_tensors(weights)
+        for w, got in zip(weights, linear.get_weights()):
+            assert_allclose(got, w, rtol=1e-6)
+
+    def test_jtensor_copies_ndarray(self):
+        from bigdl.dllib.utils.common import JTensor, Sample
+        buffer = np.zeros([2, 3], dtype="float32")
+        samples = []
+        for i in range(2):
+            buffer[:] = i
+            samples.append(Sample.from_ndarray(buffer, np.array([i])))
+        assert [s.features[0].to_ndarray()[0, 0] for s in samples] == [0, 1]
+        tensor = JTensor.from_ndarray(buffer)
+        buffer[:] = 5
+        assert tensor.to_ndarray()[0, 0] == 1
+
 if __name__ == "__main__":
     pytest.main([__file__])
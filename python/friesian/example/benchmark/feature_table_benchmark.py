@@ -0,0 +1,340 @@
+#
+# Copyright 2016 The BigDL Authors.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import threading
+import urllib.request
+from argparse import ArgumentParser
+from time import time
+
+import psutil
+from pyspark.sql import functions as F
+
+from bigdl.orca import init_orca_context, stop_orca_context, OrcaContext
+from bigdl.friesian.feature import FeatureTable
+
+CAT_COLS = ["cat1", "cat2", "cat3"]
+NUM_COLS = ["price", "dwell"]
+
+
+def _parse_args():
+    parser = ArgumentParser(description="Benchmark the operators of Friesian FeatureTable "
+                                        "on a synthetic click log.")
+    parser.add_argument('--rows', type=int, default=1000000,
+                        help='The number of rows of the synthetic click log.')
+    parser.add_argument('--num_users', type=int, default=100000,
+                        help='The number of distinct users.')
+    parser.add_argument('--num_items', type=int, default=50000,
+                        help='The number of distinct items.')
+    parser.add_argument('--cardinality', type=int, default=10000,
+                        help='The number of distinct values of each categorical column.')
+    parser.add_argument('--skew', type=float, default=2.0,
+                        help='The skew of users, items and categories. 1.0 is uniform and '
+                             'larger values concentrate the rows on fewer keys.')
+    parser.add_argument('--partitions', type=int, default=None,
+                        help='The number of partitions of the synthetic click log. '
+                             'Default is the default parallelism.')
+    parser.add_argument('--operators', type=str, default=",".join(OPERATORS),
+                        help='Comma separated operators to run, chosen from {}.'
+                        .format(", ".join(OPERATORS)))
+    parser.add_argument('--repeats', type=int, default=3,
+                        help='The number of timed runs of each operator.')
+    parser.add_argument('--warmup', type=int, default=1,
+                        help='The number of untimed runs of each operator.')
+    parser.add_argument('--seed', type=int, default=42,
+                        help='The random seed of the synthetic click log.')
+    parser.add_argument('--cores', type=int, default=4,
+                        help='The number of cores of the local Spark session.')
+    parser.add_argument('--memory', type=str, default="4g",
+                        help='The memory of the local Spark session.')
+    parser.add_argument('--output', type=str, default=None,
+                        help='The path of the json file to write the results to.')
+    parser.add_argument('--baseline', type=str, default=None,
+                        help='The json file of a previous run to compare the timings with.')
+    return parser.parse_args()
+
+
+def _skewed_key(seed, cardinality, skew):
+    # rand ** skew concentrates the keys towards 0, which gives a power law like popularity.
+    return F.floor(F.pow(F.rand(seed), F.lit(skew)) * cardinality).cast("int")
+
+
+def generate_click_log(rows, num_users, num_items, cardinality, skew, partitions=None, seed=42):
+    """
+    Generate a synthetic click log with columns user, item, time, label, string categorical
+    columns cat1 to cat3 and numerical columns price and dwell.
+    """
+    spark = OrcaContext.get_spark_session()
+    partitions = partitions or OrcaContext.get_spark_context().defaultParallelism
+    df = spark.range(0, rows, numPartitions=partitions)
+    df = df.select(
+        _skewed_key(seed, num_users, skew).alias("user"),
+        (_skewed_key(seed + 1, num_items - 1, skew) + 1).alias("item"),
+        (F.lit(1600000000) + F.col("id")).cast("long").alias("time"),
+        (F.rand(seed + 2) < 0.2).cast("int").alias("label"),
+        *[F.concat(F.lit(c + "_"), _skewed_key(seed + 3 + i, cardinality, skew).cast("string"))
+          .alias(c) for i, c in enumerate(CAT_COLS)],
+        (F.rand(seed + 10) * 100).alias("price"),
+        (F.randn(seed + 11) * 30 + 60).alias("dwell"))
+    return FeatureTable(df)
+
+
+def _run_gen_string_idx(tbl, args):
+    return tbl.gen_string_idx(CAT_COLS)
+
+
+def _run_encode_string(tbl, args):
+    return tbl.encode_string(CAT_COLS, args.string_idx)
+
+
+def _run_category_encode(tbl, args):
+    return tbl.category_encode(CAT_COLS)[0]
+
+
+def _run_target_encode(tbl, args):
+    return tbl.target_encode(["cat1", ["cat2", "cat3"]], ["label"])[0]
+
+
+def _run_add_hist_seq(tbl, args):
+    return tbl.add_hist_seq(["item"], user_col="user", sort_col="time", max_len=50)
+
+
+def _run_add_negative_samples(tbl, args):
+    return tbl.add_negative_samples(args.num_items, item_col="item", label_col="label")
+
+
+def _run_cross_columns(tbl, args):
+    return tbl.cross_columns([["cat1", "cat2"], ["cat2", "cat3"]], [10000, 10000])
+
+
+def _run_min_max_scale(tbl, args):
+    return tbl.min_max_scale(NUM_COLS)[0]
+
+
+def _run_group_by(tbl, args):
+    return tbl.group_by("user", agg={"price": ["avg", "max"], "item": "count"})
+
+
+OPERATORS = {
+    "gen_string_idx": _run_gen_string_idx,
+    "encode_string": _run_encode_string,
+    "category_encode": _run_category_encode,
+    "target_encode": _run_target_encode,
+    "add_hist_seq": _run_add_hist_seq,
+    "add_negative_samples": _run_add_negative_samples,
+    "cross_columns": _run_cross_columns,
+    "min_max_scale": _run_min_max_scale,
+    "group_by": _run_group_by,
+}
+
+
+def _materialize(result):
+    if isinstance(result, (list, tuple)):
+        for r in result:
+            _materialize(r)
+    else:
+        result.compute()
+
+
+def _get_json(url):
+    try:
+        with urllib.request.urlopen(url, timeout=10) as response:
+            return json.loads(response.read().decode("utf-8"))
+    except Exception:
+        return None
+
+
+def _stage_metrics(sc, job_group):
+    """Sum the shuffle and spill metrics of the stages of the jobs in job_group
+    from the Spark REST API, or return None if the Spark UI is disabled."""
+    if not sc.uiWebUrl:
+        return None
+    api = "{}/api/v1/applications/{}".format(sc.uiWebUrl, sc.applicationId)
+    jobs = _get_json(api + "/jobs")
+    if jobs is None:
+        return None
+    metrics = {"shuffle_read_bytes": 0, "shuffle_write_bytes": 0, "spill_bytes": 0,
+               "input_bytes": 0, "num_stages": 0, "num_tasks": 0}
+    stage_ids = set()
+    for job in jobs:
+        if job.get("jobGroup") == job_group:
+            stage_ids.update(job["stageIds"])
+    for stage_id in stage_ids:
+        for stage in _get_json("{}/stages/{}".format(api, stage_id)) or []:
+            if stage.get("status") != "COMPLETE":
+                continue
+            metrics["shuffle_read_bytes"] += stage.get("shuffleReadBytes", 0)
+            metrics["shuffle_write_bytes"] += stage.get("shuffleWriteBytes", 0)
+            metrics["spill_bytes"] += stage.get("memoryBytesSpilled", 0) + \
+                stage.get("diskBytesSpilled", 0)
+            metrics["input_bytes"] += stage.get("inputBytes", 0)
+            metrics["num_stages"] += 1
+            metrics["num_tasks"] += stage.get("numCompleteTasks", 0)
+    return metrics
+
+
+def _reset_jvm_peak(sc):
+    for pool in sc._jvm.java.lang.management.ManagementFactory.getMemoryPoolMXBeans():
+        pool.resetPeakUsage()
+
+
+def _jvm_peak_heap(sc):
+    # In local mode the executors run in the driver JVM, so this covers the whole job.
+    management = sc._jvm.java.lang.management
+    peak = 0
+    for pool in management.ManagementFactory.getMemoryPoolMXBeans():
+        if pool.getType() == management.MemoryType.HEAP:
+            peak += pool.getPeakUsage().getUsed()
+    return peak
+
+
+def _python_tree_rss():
+    # The Python workers are started by the JVM, which is a child of the driver process.
+    # The JVM is measured separately, so only the Python processes are counted.
+    driver = psutil.Process(os.getpid())
+    rss = driver.memory_info().rss
+    for proc in driver.children(recursive=True):
+        try:
+            if "python" in proc.name().lower():
+                rss += proc.memory_info().rss
+        except (psutil.NoSuchProcess, psutil.AccessDenied):
+            pass
+    return rss
+
+
+class PythonRssSampler(object):
+    """
+    Samples the total RSS of the driver Python process and its Python workers in a
+    background thread and records the peak while it is entered.
+    """
+    def __init__(self, interval=0.05):
+        self.interval = interval
+        self.peak = 0
+        self._stop = threading.Event()
+        self._thread = None
+
+    def _run(self):
+        while True:
+            self.peak = max(self.peak, _python_tree_rss())
+            if self._stop.wait(self.interval):
+                return
+
+    def __enter__(self):
+        self.peak = _python_tree_rss()
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+        self.peak = max(self.peak, _python_tree_rss())
+
+
+def run_operator(name, tbl, args):
+    sc = OrcaContext.get_spark_context()
+    func = OPERATORS[name]
+    for _ in range(args.warmup):
+        _materialize(func(tbl, args))
+    times = []
+    _reset_jvm_peak(sc)
+    job_group = "friesian_benchmark_{}".format(name)
+    sc.setJobGroup(job_group, name)
+    try:
+        with PythonRssSampler() as rss_sampler:
+            for _ in range(args.repeats):
+                start = time()
+                _materialize(func(tbl, args))
+                times.append(time() - start)
+    finally:
+        sc.setLocalProperty("spark.jobGroup.id", None)
+    result = {"operator": name,
+              "times_sec": times,
+              "median_sec": statistics.median(times),
+              "min_sec": min(times),
+              "rows_per_sec": args.rows / statistics.median(times),
+              "jvm_peak_heap_bytes": _jvm_peak_heap(sc),
+              "python_peak_rss_bytes": rss_sampler.peak}
+    metrics = _stage_metrics(sc, job_group)
+    if metrics is not None:
+        # per timed run
+        result.update({k: v // args.repeats for k, v in metrics.items()})
+    return result
+
+
+def _git_commit():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "HEAD"],
+                                       stderr=subprocess.DEVNULL).decode("utf-8").strip()
+    except Exception:
+        return None
+
+
+def compare(results, baseline_path):
+    with open(baseline_path) as f:
+        baseline = {r["operator"]: r for r in json.load(f)["results"]}
+    print("{:<24}{:>14}{:>14}{:>10}".format("operator", "baseline(s)", "current(s)", "ratio"))
+    for r in results:
+        if r["operator"] in baseline:
+            base = baseline[r["operator"]]["median_sec"]
+            print("{:<24}{:>14.3f}{:>14.3f}{:>10.2f}".format(
+                r["operator"], base, r["median_sec"], r["median_sec"] / base))
+
+
+if __name__ == '__main__':
+    args = _parse_args()
+    operators = [op.strip() for op in args.operators.split(",") if op.strip()]
+    for op in operators:
+        if op not in OPERATORS:
+            raise ValueError("operator should be one of {}, but got {}"
+                             .format(", ".join(OPERATORS), op))
+
+    sc = init_orca_context("local", cores=args.cores, memory=args.memory)
+    tbl = generate_click_log(args.rows, args.num_users, args.num_items, args.cardinality,
+                             args.skew, args.partitions, args.seed)
+    tbl = tbl.cache()
+    tbl.compute()
+    if "encode_string" in operators:
+        args.string_idx = tbl.gen_string_idx(CAT_COLS)
+        for idx in args.string_idx:
+            idx.cache()
+
+    results = []
+    for op in operators:
+        result = run_operator(op, tbl, args)
+        print("{}: median {:.3f}s, min {:.3f}s".format(op, result["median_sec"],
+                                                       result["min_sec"]))
+        results.append(result)
+
+    report = {"commit": _git_commit(),
+              "spark_version": sc.version,
+              "python_version": platform.python_version(),
+              "config": {k: v for k, v in vars(args).items() if k != "string_idx"},
+              "results": results}
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+    else:
+        print(json.dumps(report, indent=2))
+    if args.baseline:
+        compare(results, args.baseline)
+    stop_orca_context()
@@ -24,6 +24,7 @@ import numpy as np
 import pyspark.sql.functions as F
 from bigdl.friesian.feature.utils import *
 from bigdl.orca import OrcaContext
+from bigdl.orca.data.utils import spark_df_to_pandas
 from py4j.protocol import Py4JError
 from pyspark.ml import Pipeline
 from pyspark.ml.feature import MinMaxScaler, VectorAssembler, Bucketizer
@@ -705,7 +706,12 @@ class Table:
     order_by = sort
 
     def to_pandas(self):
-        return self.df.toPandas()
+        """
+        Convert the Table to a pandas DataFrame through Arrow.
+
+        :return: A pandas DataFrame.
+        """
+        return spark_df_to_pandas(self.df)
 
     def cache(self):
         """
@@ -811,7 +817,8 @@ class FeatureTable(Table):
         return FeatureTable(sparkDF)
 
     def encode_string(self, columns, indices, broadcast=True, do_split=False,
-                      sep=',', sort_for_array=False, keep_most_frequent=False):
+                      sep=',', sort_for_array=False, keep_most_frequent=False,
+                      max_map_size=1000000):
         """
         Encode columns with provided list of StringIndex. Unknown string will be
         None after the encoding and you may need to fillna with 0.
@@ -832,6 +839,11 @@ class FeatureTable(Table):
         :param sort_for_array: bool, whether need to sort array columns. Default is False.
         :param keep_most_frequent: bool, whether need to keep most frequent value as the
                column value. Default is False.
+        :param max_map_size: int, the maximum number of entries of a StringIndex to be
+               broadcast as a dict. When broadcast is True, all the StringIndexes within this
+               size are shipped to executors together and the corresponding columns are encoded
+               in a single pass over the data, while larger StringIndexes are encoded by joins.
+               Set it to 0 to always encode by joins. Default is 1000000.
 
         :return: A new FeatureTable which transforms categorical features into unique integer
                  values with provided StringIndexes.
@@ -841,11 +853,28 @@ class FeatureTable(Table):
         if not isinstance(indices, list):
             indices = [indices]
         assert len(columns) == len(indices)
+        mappings = [None] * len(columns)
         if isinstance(indices[0], dict):
+            if broadcast:
+                mappings = [index if len(index) <= max_map_size else None
+                            for index in indices]
             indices = list(map(lambda x: StringIndex.from_dict(x[1], columns[x[0]]),
                                enumerate(indices)))
+        elif broadcast:
+            mappings = [collect_small_index(index_tbl.df, index_tbl.col_name, max_map_size)
+                        for index_tbl in indices]
+
+        map_cols = [columns[i] for i in range(len(columns)) if mappings[i] is not None]
         data_df = self.df
+        if map_cols:
+            data_df = encode_with_mappings(data_df, map_cols,
+                                           [m for m in mappings if m is not None],
+                                           do_split=do_split, sep=sep,
+                                           sort_for_array=sort_for_array,
+                                           keep_most_frequent=keep_most_frequent)
         for i in range(len(columns)):
+            if mappings[i] is not None:
+                continue
             index_tbl = indices[i]
             col_name = columns[i]
             if broadcast:
@@ -873,6 +902,11 @@ class FeatureTable(Table):
                 data_df = data_df.join(tmp_df, 'row_id', 'left') \
                     .drop('row_id').drop(col_name).withColumnRenamed("id", col_name)
 
+        # the joins move the encoded columns to the end, which the columns encoded with the
+        # mappings follow as well
+        encoded_cols = list(dict.fromkeys(columns))
+        data_df = data_df.select(*[c for c in self.df.columns if c not in encoded_cols],
+                                 *encoded_cols)
         return FeatureTable(data_df)
 
     def filter_by_frequency(self, columns, min_freq=2):
@@ -1069,10 +1103,11 @@ class FeatureTable(Table):
         return FeatureTable(data_df)
 
     def gen_string_idx(self, columns, freq_limit=None, order_by_freq=False,
-                       do_split=False, sep=','):
+                       do_split=False, sep=',', approx=False):
         """
         Generate unique index value of categorical features. The resulting index would
         start from 1 with 0 reserved for unknown features.
+        All the target columns are indexed from a single scan of the FeatureTable.
 
         :param columns: str, dict or a list of str, dict, target column(s) to generate StringIndex.
          dict is a mapping of source column names -> target column name if needs to combine multiple
@@ -1089,6 +1124,12 @@ class FeatureTable(Table):
         Default is False.
         :param sep: str, a string representing a regular expression to split a column value.
          Default is ','.
+        :param approx: bool, whether to drop the categories below freq_limit with a count-min
+         sketch before counting the categories exactly. The sketch is sized by the approximate
+         number of distinct categories and costs extra passes over the values, so this only pays
+         off for columns with very high cardinality where most categories are below freq_limit.
+         The result is the same since the sketch never underestimates the frequency.
+         Only takes effect when freq_limit is not None. Default is False.
 
         :return: A StringIndex or a list of StringIndex.
         """
@@ -1106,17 +1147,17 @@ class FeatureTable(Table):
             else:
                 src_columns.append(c)
         check_col_exists(self.df, src_columns)
+        default_limit = None
+        freq_limit_dict = {}
         if freq_limit:
             if isinstance(freq_limit, int):
-                freq_limit = str(freq_limit)
+                default_limit = freq_limit
             elif isinstance(freq_limit, dict):
-                freq_limit = ",".join(str(k) + ":" + str(v) for k, v in freq_limit.items())
+                freq_limit_dict = freq_limit
             else:
                 raise ValueError("freq_limit only supports int, dict or None, but get " +
                                  freq_limit.__class__.__name__)
-        out_columns = []
-        simple_columns = []
-        df_id_list = []
+        groups = []
         for c in columns:
             # union column
             if isinstance(c, dict):
@@ -1128,40 +1169,16 @@ class FeatureTable(Table):
                     col_name = c['col_name']
                 else:
                     col_name = src_cols[0] + '_union'
-                # process simple columns
-                if simple_columns:
-                    simple_df_id_list = generate_string_idx(self.df, simple_columns,
-                                                            freq_limit, order_by_freq)
-                    df_id_list.extend(simple_df_id_list)
-                    simple_columns = []
-                # process union columns
-                for i, src_c in enumerate(src_cols):
-                    if i == 0:
-                        dict_df = self.df.select(F.col(src_c).alias(col_name))
-                    else:
-                        dict_df = dict_df.union(self.df.select(F.col(src_c).alias(col_name)))
-                union_id_list = generate_string_idx(dict_df, [col_name],
-                                                    freq_limit, order_by_freq)
-                df_id_list.extend(union_id_list)
-                out_columns.append(col_name)
+                groups.append((col_name, src_cols, False))
             # single column
             else:
-                if do_split:
-                    dict_df = self.df.select(F.col(c))
-                    dict_df = dict_df.withColumn(c, F.explode(F.split(c, sep)))
-                    split_id_list = generate_string_idx(dict_df, [c], freq_limit, order_by_freq)
-                    df_id_list.extend(split_id_list)
-                    out_columns.append(c)
-                else:
-                    simple_columns.append(c)
-                    out_columns.append(c)
-        if simple_columns:
-            simple_df_id_list = generate_string_idx(self.df, simple_columns,
-                                                    freq_limit, order_by_freq)
-            df_id_list.extend(simple_df_id_list)
+                groups.append((c, [c], do_split))
+        freq_limits = [freq_limit_dict.get(group[0], default_limit) for group in groups]
+        df_id_list = generate_string_idx_one_scan(self.df, groups, freq_limits, order_by_freq,
+                                                  sep=sep, approx=approx)
 
-        string_idx_list = list(map(lambda x: StringIndex(x[0], x[1]),
-                                   zip(df_id_list, out_columns)))
+        string_idx_list = list(map(lambda x: StringIndex(x[0], x[1][0]),
+                                   zip(df_id_list, groups)))
 
         # If input is a single column (not a list), then the output would be a single StringIndex.
         if len(string_idx_list) == 1 and is_single_column:
@@ -1211,7 +1228,6 @@ class FeatureTable(Table):
         vector_cols = [columns[i] for i in range(len(columns)) if types[i] == "vector"]
 
         min_max_dict = {}
-        tolist = udf(lambda x: x.toArray().tolist(), ArrayType(DoubleType()))
 
         if scalar_cols:
             assembler = VectorAssembler(inputCols=scalar_cols, outputCol="vect")
@@ -1225,7 +1241,7 @@ class FeatureTable(Table):
             # Fitting pipeline on DataFrame
             model = pipeline.fit(df)
             df = model.transform(df) \
-                .withColumn("scaled_list", tolist(pyspark_col("scaled"))) \
+                .withColumn("scaled_list", vector_to_array_col(pyspark_col("scaled"))) \
                 .drop("vect").drop("scaled")
             for i in range(len(scalar_cols)):
                 df = df.withColumn(scalar_cols[i], pyspark_col("scaled_list")[i])
@@ -1241,13 +1257,12 @@ class FeatureTable(Table):
             for i, min_max in enumerate(zip(min_list, max_list)):
                 min_max_dict[scalar_cols[i]] = min_max
 
-        from pyspark.ml.linalg import Vectors, VectorUDT
         for c in array_cols:
-            list_to_vector_udf = udf(lambda l: Vectors.dense(l), VectorUDT())
-            df = df.withColumn(c, list_to_vector_udf(pyspark_col(c)))
+            df = df.withColumn(c, array_to_vector_col(pyspark_col(c).cast("array<double>")))
             scaler = MinMaxScaler(min=min, max=max, inputCol=c, outputCol="scaled")
             model = scaler.fit(df)
-            df = model.transform(df).drop(c).withColumn(c, tolist("scaled")).drop("scaled")
+            df = model.transform(df).drop(c) \
+                .withColumn(c, vector_to_array_col(pyspark_col("scaled"))).drop("scaled")
             min_max_dict[c] = (model.originalMin.toArray().tolist(),
                                model.originalMax.toArray().tolist())
 
@@ -1281,40 +1296,34 @@ class FeatureTable(Table):
                       or types[i] == "array<float>" or types[i] == "array<double>"]
         vector_cols = [columns[i] for i in range(len(columns)) if types[i] == "vector"]
 
-        tbl = self
-
-        def normalize_array(c_min, c_max):
-
-            def normalize(x):
-                np_x = np.array(x)
-                np_min = np.array(c_min)
-                np_max = np.array(c_max)
-                normalized = (np_x - np_min) / (np_max - np_min)
-                return normalized.tolist()
-
-            return normalize
-
-        def normalize_scalar_vector(c_min, c_max):
-            def normalize(x):
-                return (x - c_min) / (c_max - c_min)
-
-            return normalize
-
+        df = self.df
         for column in scalar_cols:
             if column in min_max_dict:
                 col_min, col_max = min_max_dict[column]
-                tbl = tbl.apply(column, column, normalize_scalar_vector(col_min, col_max), "float")
+                df = df.withColumn(column, ((pyspark_col(column) - lit(col_min)) /
+                                            lit(col_max - col_min)).cast("float"))
 
         for column in array_cols:
             if column in min_max_dict:
                 col_min, col_max = min_max_dict[column]
-                tbl = tbl.apply(column, column, normalize_array(col_min, col_max), "array<float>")
+                normalized = [(pyspark_col(column)[i] - lit(c_min)) / lit(c_max - c_min)
+                              for i, (c_min, c_max) in enumerate(zip(col_min, col_max))]
+                df = df.withColumn(column, array(*normalized).cast("array<float>"))
+
+        tbl = FeatureTable(df)
 
+        def normalize_vector(c_min, c_max):
+            def normalize(x):
+                return (x - c_min) / (c_max - c_min)
+
+            return normalize
+
+        # VectorUDT is not supported by Arrow, vector columns still go through a Python udf.
         for column in vector_cols:
             if column in min_max_dict:
                 col_min, col_max = min_max_dict[column]
                 tbl = tbl.apply(column, column,
-                                normalize_scalar_vector(col_min, col_max), "vector")
+                                normalize_vector(col_min, col_max), "vector")
 
         return tbl
 
@@ -1399,7 +1408,7 @@ class FeatureTable(Table):
         df = pad(self.df, cols, seq_len, mask_cols)
         return FeatureTable(df)
 
-    def apply(self, in_col, out_col, func, dtype="string"):
+    def apply(self, in_col, out_col, func, dtype="string", vectorized=False):
         """
         Transform a FeatureTable using a user-defined Python function.
 
@@ -1409,18 +1418,31 @@ class FeatureTable(Table):
                When in_col is a list of str, func should take a list as input,
                and in this case you are generating out_col given multiple
                input columns.
+               If vectorized is True, func is applied on batches of rows instead. It should
+               take a pandas Series for each column of in_col as the positional arguments,
+               and return a pandas Series of the same length.
         :param dtype: str, the data type of out_col. Default is string type.
+        :param vectorized: boolean, whether to apply func on Arrow record batches through a
+               pandas_udf instead of row by row. Default is False.
 
         :return: A new FeatureTable after column transformation.
         """
-        udf_func = udf(func, dtype)
         assert isinstance(out_col, str), "out_col must be a single column"
+        if vectorized:
+            from pyspark.sql.functions import pandas_udf
+            udf_func = pandas_udf(func, dtype)
+        else:
+            udf_func = udf(func, dtype)
         if isinstance(in_col, str):
             df = self.df.withColumn(out_col, udf_func(pyspark_col(in_col)))
         else:
             assert isinstance(in_col, list), \
                 "in_col must be a single column of a list of columns"
-            df = self.df.withColumn(out_col, udf_func(array(in_col)))
+            if vectorized:
+                # a pandas_udf takes a Series for each column, struct input needs Spark 3
+                df = self.df.withColumn(out_col, udf_func(*[pyspark_col(c) for c in in_col]))
+            else:
+                df = self.df.withColumn(out_col, udf_func(array(in_col)))
         return FeatureTable(df)
 
     def join(self, table, on=None, how=None, lsuffix=None, rsuffix=None):
@@ -1744,13 +1766,12 @@ class FeatureTable(Table):
             all_df = org_all_df
             for target_col, out_col in zip(target_cols, out_col_list):
                 global_target_mean = target_mean_dict[target_col]
-                all_func = udf(
-                    lambda cat_sum, cat_count:
-                    (cat_sum + global_target_mean * smooth) / (cat_count + smooth),
-                    DoubleType())
-                all_df = all_df.withColumn(out_col,
-                                           all_func(cat_col_name + "_all_sum_" + target_col,
-                                                    cat_col_name + "_all_count")) \
+                cat_sum = pyspark_col(cat_col_name + "_all_sum_" + target_col)
+                cat_count = pyspark_col(cat_col_name + "_all_count")
+                all_df = all_df.withColumn(
+                    out_col,
+                    ((cat_sum + lit(global_target_mean * smooth)) /
+                     (cat_count + lit(smooth))).cast(DoubleType())) \
                     .drop(cat_col_name + "_all_sum_" + target_col)
             # keep count in the target code
             all_df = all_df.withColumnRenamed(cat_col_name + "_all_count", "target_encode_count")
@@ -1768,17 +1789,15 @@ class FeatureTable(Table):
                 fold_df = fold_df.join(org_all_df, cat_col, how="left")
                 for target_col, out_col in zip(target_cols, out_col_list):
                     global_target_mean = target_mean_dict[target_col]
-                    target_func = udf(
-                        lambda s_all, s, c_all, c:
-                        None if c_all == c else
-                        ((s_all - s) + global_target_mean * smooth) / ((c_all - c) + smooth),
-                        DoubleType())
+                    s_all = pyspark_col(cat_col_name + "_all_sum_" + target_col)
+                    s = pyspark_col(cat_col_name + "_sum_" + target_col)
+                    c_all = pyspark_col(cat_col_name + "_all_count")
+                    c = pyspark_col(cat_col_name + "_count")
                     fold_df = fold_df.withColumn(
                         out_col,
-                        target_func(cat_col_name + "_all_sum_" + target_col,
-                                    cat_col_name + "_sum_" + target_col,
-                                    cat_col_name + "_all_count",
-                                    cat_col_name + "_count")
+                        F.when(c_all == c, lit(None).cast(DoubleType())).otherwise(
+                            (((s_all - s) + lit(global_target_mean * smooth)) /
+                             ((c_all - c) + lit(smooth))).cast(DoubleType()))
                     )
                     fold_df = fold_df.drop(cat_col_name + "_sum_" + target_col,
                                            cat_col_name + "_all_sum_" + target_col)
@@ -1908,11 +1927,11 @@ class FeatureTable(Table):
         else:
             partition_window = Window.partitionBy(*partition_cols).orderBy(*sort_cols)
         for column, outs in zip(columns, out_cols):
-            diff_func = udf(lambda a, b: a - b if a is not None and b is not None else None,
-                            self.df.schema[column].dataType)
+            data_type = self.df.schema[column].dataType
             for shift, out in zip(shifts, outs):
                 result_df = result_df.withColumn(out, F.lag(column, shift).over(partition_window))
-                result_df = result_df.withColumn(out, diff_func(column, out))
+                result_df = result_df.withColumn(
+                    out, (pyspark_col(column) - pyspark_col(out)).cast(data_type))
 
         return FeatureTable(result_df)
 
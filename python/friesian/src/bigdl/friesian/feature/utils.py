@@ -14,10 +14,15 @@
 # limitations under the License.
 #
 
+import re
+
 from bigdl.dllib.utils.file_utils import callZooFunc
+from bigdl.orca import OrcaContext
 from pyspark.sql.types import IntegerType, ShortType, LongType, FloatType, DecimalType, \
-    DoubleType, BooleanType
-from pyspark.sql.functions import broadcast, udf
+    DoubleType, BooleanType, ArrayType
+from pyspark.sql.functions import broadcast, udf, col as pyspark_col
+import pyspark.sql.functions as F
+from pyspark.storagelevel import StorageLevel
 
 
 def compute(df):
@@ -28,8 +33,124 @@ def log_with_clip(df, columns, clip=True):
     return callZooFunc("float", "log", df, columns, clip)
 
 
-def generate_string_idx(df, columns, freq_limit, order_by_freq):
-    return callZooFunc("float", "generateStringIdx", df, columns, freq_limit, order_by_freq)
+def generate_string_idx_one_scan(df, groups, freq_limits, order_by_freq, sep=',',
+                                 approx=False, sketch_error=0.1, sketch_fpr=0.01):
+    # groups is a list of (col_name, src_cols, do_split), one StringIndex for each group.
+    # All the values are stacked as (group_id, value) pairs in one projection, so that the
+    # input is only scanned once and the counts of all groups come from one aggregation.
+    from pyspark.sql import Window
+    values = []
+    for group_id, (_, src_cols, do_split) in enumerate(groups):
+        for src_col in src_cols:
+            value = F.split(pyspark_col(src_col), sep) if do_split \
+                else F.array(pyspark_col(src_col).cast("string"))
+            values.append(F.struct(F.lit(group_id).alias("group_id"), value.alias("values")))
+    stacked_df = df.select(F.explode(F.array(*values)).alias("stacked")) \
+        .select(pyspark_col("stacked.group_id").alias("group_id"),
+                F.explode(pyspark_col("stacked.values")).alias("value")) \
+        .filter(pyspark_col("value").isNotNull())
+
+    limit_col = None
+    for group_id, limit in enumerate(freq_limits):
+        if limit is not None:
+            condition = pyspark_col("group_id") == group_id
+            limit_col = F.when(condition, limit) if limit_col is None \
+                else limit_col.when(condition, limit)
+    persisted = []
+    if limit_col is not None:
+        limit_col = limit_col.otherwise(0)
+        if approx:
+            # the sketch and the exact counts of the frequent values both read the stacked
+            # values, which are persisted so that the input is only scanned once
+            stacked_df = stacked_df.persist(StorageLevel.MEMORY_AND_DISK)
+            persisted.append(stacked_df)
+            stacked_df = filter_by_count_min_sketch(stacked_df, ["group_id", "value"], limit_col,
+                                                    sketch_error, sketch_fpr)
+
+    counts_df = stacked_df.groupBy("group_id", "value").count()
+    if limit_col is not None:
+        counts_df = counts_df.filter(pyspark_col("count") >= limit_col)
+    if order_by_freq:
+        counts_df = counts_df.orderBy("group_id", F.desc("count"))
+    counts_df = counts_df.withColumn("part_id", F.spark_partition_id()).cache()
+    persisted.append(counts_df)
+
+    # Prior partitions are given smaller indices within each group.
+    part_sizes = counts_df.groupBy("group_id", "part_id").count().collect()
+    bases = []
+    running_sums = {}
+    for row in sorted(part_sizes, key=lambda r: (r["group_id"], r["part_id"])):
+        running_sum = running_sums.get(row["group_id"], 0)
+        bases.append((row["group_id"], row["part_id"], running_sum))
+        running_sums[row["group_id"]] = running_sum + row["count"]
+    base_df = OrcaContext.get_spark_session().createDataFrame(
+        bases, schema="group_id int, part_id int, base int")
+
+    window = Window.partitionBy("group_id", "part_id").orderBy(F.desc("count"))
+    index_df = counts_df.join(broadcast(base_df), ["group_id", "part_id"]) \
+        .withColumn("id", (F.row_number().over(window) + pyspark_col("base")).cast("int")) \
+        .drop("part_id", "base", "count").cache()
+    # materialize the indices, which must not be recomputed from a different partitioning of
+    # the counts, before the intermediate data is released
+    index_df.count()
+    for persisted_df in persisted:
+        persisted_df.unpersist()
+
+    df_types = dict(df.dtypes)
+    index_dfs = []
+    for group_id, (col_name, src_cols, do_split) in enumerate(groups):
+        dtype = "string" if do_split else df_types[src_cols[0]]
+        index_dfs.append(index_df.filter(pyspark_col("group_id") == group_id)
+                         .select(pyspark_col("value").cast(dtype).alias(col_name), "id"))
+    return index_dfs
+
+
+def count_min_sketch_size(num_keys, error, fpr, max_width=1 << 22, max_depth=8):
+    # A key below the limit is only kept by a row of the sketch if another key falls into its
+    # bucket, which happens with probability num_keys / width. The width is sized so that this
+    # probability is error and the depth so that the fraction of such keys kept by all the
+    # rows is fpr. Returns None if the sketch cannot get below fpr within the size limits.
+    import math
+    width = min(max(int(math.ceil(num_keys / error)), 1), max_width)
+    collision = num_keys / width
+    if collision >= 1:
+        return None
+    depth = max(int(math.ceil(math.log(fpr) / math.log(collision))), 1) if collision > 0 else 1
+    if depth > max_depth:
+        return None
+    return depth, width
+
+
+def filter_by_count_min_sketch(df, key_cols, limit_col, error=0.1, fpr=0.01):
+    # A count-min sketch never underestimates the count of a key. Dropping the rows whose
+    # estimated count is below the limit keeps all the frequent keys while the long tail of
+    # rare keys is removed before the exact aggregation. The sketch is sized by the approximate
+    # number of distinct keys and df is returned as is if it would be too large to prune.
+    import numpy as np
+    import pandas as pd
+    from pyspark.sql.functions import pandas_udf
+    num_keys = df.select(F.approx_count_distinct(F.struct(*key_cols))).first()[0]
+    size = count_min_sketch_size(num_keys, error, fpr)
+    if size is None:
+        return df
+    depth, width = size
+    bucket_cols = ["__bucket_{}__".format(i) for i in range(depth)]
+    for i, bucket_col in enumerate(bucket_cols):
+        df = df.withColumn(bucket_col,
+                           ((F.hash(F.lit(i), *key_cols) % width) + width) % width)
+    bucket_counts = df.select(F.posexplode(F.array(*bucket_cols)).alias("row", "bucket")) \
+        .groupBy("row", "bucket").count().toPandas()
+    sketch = np.zeros((depth, width), dtype=np.int64)
+    sketch[bucket_counts["row"].values, bucket_counts["bucket"].values] = \
+        bucket_counts["count"].values
+    br_sketch = OrcaContext.get_spark_context().broadcast(sketch)
+
+    def estimate(*buckets):
+        sketch = br_sketch.value
+        return pd.Series(np.min([sketch[i][b.values] for i, b in enumerate(buckets)], axis=0))
+
+    estimate_udf = pandas_udf(estimate, LongType())
+    return df.filter(estimate_udf(*bucket_cols) >= limit_col).drop(*bucket_cols)
 
 
 def fill_na(df, fill_val, columns):
@@ -207,6 +328,79 @@ def encode_target_(tbl, targets, target_cols=None, drop_cat=True, drop_fold=True
     return tbl
 
 
+def collect_small_index(index_df, col_name, max_size):
+    # Return the index as a dict if it has no more than max_size entries, otherwise None.
+    if max_size <= 0:
+        return None
+    rows = index_df.select(col_name, "id").limit(max_size + 1).collect()
+    if len(rows) > max_size:
+        return None
+    return {row[0]: row[1] for row in rows}
+
+
+def encode_with_mappings(df, columns, mappings, do_split=False, sep=',', sort_for_array=False,
+                         keep_most_frequent=False):
+    # Ship all the mappings to executors in one broadcast and encode every column in a single
+    # Arrow-based projection, so that no join or shuffle is needed. The broadcast is referenced
+    # by the plan of the encoded df and is cleaned by Spark once the df is no longer used.
+    from pyspark.sql.functions import pandas_udf
+    br_mappings = OrcaContext.get_spark_context().broadcast(dict(zip(columns, mappings)))
+
+    def gen_encode_udf(col_name):
+        if not do_split:
+            def encode(values):
+                return values.map(br_mappings.value[col_name])
+
+            return pandas_udf(encode, IntegerType())
+
+        def encode_value(value, mapping, pattern):
+            if value is None:
+                return None
+            ids = [mapping[v] for v in pattern.split(value) if v in mapping]
+            if not ids:
+                return None
+            if keep_most_frequent:
+                return min(ids)
+            if sort_for_array:
+                ids.sort()
+            return ids
+
+        def encode_split(values):
+            mapping = br_mappings.value[col_name]
+            pattern = re.compile(sep)
+            return values.map(lambda v: encode_value(v, mapping, pattern))
+
+        return_type = IntegerType() if keep_most_frequent else ArrayType(IntegerType())
+        return pandas_udf(encode_split, return_type)
+
+    for col_name in columns:
+        df = df.withColumn(col_name, gen_encode_udf(col_name)(pyspark_col(col_name)))
+    return df
+
+
+def vector_to_array_col(column):
+    # vector_to_array is a native (JVM) expression since Spark 3.0, fall back to a Python udf
+    # for earlier versions.
+    try:
+        from pyspark.ml.functions import vector_to_array
+        return vector_to_array(column)
+    except ImportError:
+        tolist = udf(lambda x: x.toArray().tolist(), ArrayType(DoubleType()))
+        return tolist(column)
+
+
+def array_to_vector_col(column):
+    # array_to_vector is a native (JVM) expression since Spark 3.1, fall back to a Python udf
+    # for earlier versions.
+    try:
+        from pyspark.ml.functions import array_to_vector
+        return array_to_vector(column)
+    except ImportError:
+        from pyspark.ml.linalg import Vectors, VectorUDT
+        to_vector = udf(lambda l: Vectors.dense(l), VectorUDT())
+        return to_vector(column)
+
+
 def str_to_list(arg, arg_name):
     if isinstance(arg, str):
         return [arg]
@@ -53,6 +53,22 @@ class TestTable(TestCase):
         out_values = feature_tbl.select("out").df.rdd.flatMap(lambda x: x).collect()
         assert out_values == ["xxxx"] * len(out_values)
 
+    def test_apply_vectorized(self):
+        file_path = os.path.join(self.resource_path, "parquet/data1.parquet")
+        feature_tbl = FeatureTable.read_parquet(file_path)
+        feature_tbl = feature_tbl.fillna(0, ["col_1", "col_2", "col_3"])
+        # pandas_udf on single column
+        feature_tbl = feature_tbl.apply("col_1", "new_col_1", lambda s: s + 1, dtype="int",
+                                        vectorized=True)
+        rows = feature_tbl.select("col_1", "new_col_1").df.collect()
+        assert [r[0] + 1 for r in rows] == [r[1] for r in rows]
+        # pandas_udf on multi columns
+        feature_tbl = feature_tbl.apply(["col_2", "col_3"], "out",
+                                        lambda s2, s3: s2 + s3, dtype="int",
+                                        vectorized=True)
+        rows = feature_tbl.select("col_2", "col_3", "out").df.collect()
+        assert [r[0] + r[1] for r in rows] == [r[2] for r in rows]
+
     def test_apply_with_data(self):
         file_path = os.path.join(self.resource_path, "parquet/data1.parquet")
         feature_tbl = FeatureTable.read_parquet(file_path)
@@ -230,6 +246,37 @@ class TestTable(TestCase):
         assert string_idx_list[0].size() == 3, "col_4 should have 3 indices"
         assert string_idx_list[1].size() == 1, "col_5 should have 1 indices"
 
+    def test_gen_string_idx_approx(self):
+        file_path = os.path.join(self.resource_path, "parquet/data1.parquet")
+        feature_tbl = FeatureTable.read_parquet(file_path)
+        string_idx_list = feature_tbl.gen_string_idx(
+            ["col_4", {"src_cols": ["col_4", "col_5"], "col_name": "col_5"}],
+            freq_limit={"col_4": 1, "col_5": 3}, approx=True)
+        exact_idx_list = feature_tbl.gen_string_idx(
+            ["col_4", {"src_cols": ["col_4", "col_5"], "col_name": "col_5"}],
+            freq_limit={"col_4": 1, "col_5": 3})
+        for string_idx, exact_idx in zip(string_idx_list, exact_idx_list):
+            assert string_idx.size() == exact_idx.size(), \
+                "approx should get the same number of indices"
+            assert sorted(string_idx.to_dict().keys()) == sorted(exact_idx.to_dict().keys())
+
+    def test_filter_by_count_min_sketch(self):
+        from bigdl.friesian.feature.utils import filter_by_count_min_sketch, \
+            count_min_sketch_size
+        spark = OrcaContext.get_spark_session()
+        rare = [("rare_" + str(i),) for i in range(2000)]
+        frequent = [("frequent_" + str(i),) for i in range(10)] * 5
+        df = spark.createDataFrame(rare + frequent, ["value"])
+        depth, width = count_min_sketch_size(2010, 0.1, 0.01)
+        assert width >= 20100 and 0.1 ** depth <= 0.01
+        assert count_min_sketch_size(1 << 30, 0.1, 0.01) is None
+        filtered = filter_by_count_min_sketch(df, ["value"], lit(3))
+        values = [row["value"] for row in filtered.collect()]
+        assert sorted(v for v in values if v.startswith("frequent")) == sorted(
+            v for v, in frequent), "all the frequent values should be kept"
+        num_rare = len([v for v in values if v.startswith("rare")])
+        assert num_rare < 100, "most of the rare values should be pruned"
+
     def test_gen_string_idx_none(self):
         file_path = os.path.join(self.resource_path, "parquet/data1.parquet")
         feature_tbl = FeatureTable.read_parquet(file_path)
@@ -714,6 +761,57 @@ class TestTable(TestCase):
         assert tbl.df.where(tbl.df.height == 10).select("num").collect()[0]["num"] == 2, \
             "the third row of num should be 2"
 
+    def test_encode_string_by_join(self):
+        file_path = os.path.join(self.resource_path, "parquet/data1.parquet")
+        feature_tbl = FeatureTable.read_parquet(file_path)
+        string_idx_list = feature_tbl.gen_string_idx(["col_4", "col_5"], freq_limit=1)
+        map_tbl = feature_tbl.encode_string(["col_4", "col_5"], string_idx_list)
+        join_tbl = feature_tbl.encode_string(["col_4", "col_5"], string_idx_list,
+                                             max_map_size=0)
+        map_rows = map_tbl.df.select("col_1", "col_4", "col_5").collect()
+        join_rows = join_tbl.df.select("col_1", "col_4", "col_5").collect()
+        assert sorted(map(tuple, map_rows), key=str) == sorted(map(tuple, join_rows), key=str), \
+            "encoding with broadcast dict and with join should get the same result"
+        # the encoded columns are moved to the end as the joins do
+        expected_columns = [c for c in feature_tbl.df.columns if c not in ["col_4", "col_5"]] \
+            + ["col_4", "col_5"]
+        assert map_tbl.df.columns == expected_columns
+        assert join_tbl.df.columns == expected_columns
+
+    def test_encode_string_split_by_join(self):
+        file_path = os.path.join(self.resource_path, "parquet/data1.parquet")
+        feature_tbl = FeatureTable.read_parquet(file_path)
+        to_list_str = udf(lambda arr: ','.join(arr))
+        df = feature_tbl.dropna(['col_4', 'col_5']).df.withColumn("list1", array('col_4', 'col_5'))\
+            .withColumn("list1", to_list_str(col("list1")))
+        tbl = FeatureTable(df)
+        string_idx = tbl.gen_string_idx("list1", do_split=True, sep=",", freq_limit=1)
+        expected_columns = [c for c in tbl.df.columns if c != "list1"] + ["list1"]
+        for kwargs in [{}, {"sort_for_array": True}, {"keep_most_frequent": True}]:
+            map_tbl = tbl.encode_string("list1", string_idx, do_split=True, sep=",", **kwargs)
+            join_tbl = tbl.encode_string("list1", string_idx, do_split=True, sep=",",
+                                         max_map_size=0, **kwargs)
+            map_rows = map_tbl.df.select("col_1", "list1").collect()
+            join_rows = join_tbl.df.select("col_1", "list1").collect()
+            assert sorted(map(tuple, map_rows), key=str) == \
+                sorted(map(tuple, join_rows), key=str), \
+                "encoding with broadcast dict and with join should get the same result"
+            assert map_tbl.df.columns == expected_columns
+            assert join_tbl.df.columns == expected_columns
+
+    def test_encode_string_chained(self):
+        import gc
+        file_path = os.path.join(self.resource_path, "parquet/data1.parquet")
+        feature_tbl = FeatureTable.read_parquet(file_path)
+        string_idx_list = feature_tbl.gen_string_idx(["col_4", "col_5"], freq_limit=1)
+        # the intermediate encoded table is collected before the result is computed
+        df = feature_tbl.encode_string(["col_4", "col_5"], string_idx_list).df
+        gc.collect()
+        rows = df.select("col_4", "col_5").collect()
+        assert len(rows) == feature_tbl.size()
+        assert feature_tbl.encode_string(["col_4", "col_5"], string_idx_list) \
+            .fillna(0, ["col_4", "col_5"]).size() == feature_tbl.size()
+
     def test_write_csv(self):
         spark = OrcaContext.get_spark_session()
         data = [("jack", 14, 8),
@@ -0,0 +1,178 @@
+#
+# Copyright 2016 The BigDL Authors.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+import json
+import statistics
+from argparse import ArgumentParser
+from time import time
+
+import torch
+from torch import nn
+
+from bigdl.nano.pytorch.layers import Embedding
+from bigdl.nano.pytorch.optim import SparseAdam
+
+
+def _parse_args():
+    parser = ArgumentParser(description="Compare the training step time of a DLRM-style model "
+                                        "with dense torch.nn.Embedding and sparse "
+                                        "bigdl.nano.pytorch.layers.Embedding.")
+    parser.add_argument('--num_tables', type=int, default=8,
+                        help='The number of embedding tables.')
+    parser.add_argument('--num_rows', type=int, default=1000000,
+                        help='The number of ids of each embedding table.')
+    parser.add_argument('--embedding_dim', type=int, default=64,
+                        help='The dimension of the embedding vectors.')
+    parser.add_argument('--num_dense', type=int, default=13,
+                        help='The number of dense features.')
+    parser.add_argument('--hash_size', type=int, default=None,
+                        help='Hash the ids of each table into hash_size rows in the sparse '
+                             'model. Default to no hashing.')
+    parser.add_argument('--num_hot', type=int, default=0,
+                        help='The number of most frequent ids of each table which keep their '
+                             'own rows when hash_size is specified.')
+    parser.add_argument('--skew', type=float, default=2.0,
+                        help='The skew of the ids. 1.0 is uniform and larger values '
+                             'concentrate the ids on fewer rows.')
+    parser.add_argument('--weight_decay', type=float, default=0.0,
+                        help='The weight decay of the optimizers.')
+    parser.add_argument('--batch_size', type=int, default=2048,
+                        help='The batch size.')
+    parser.add_argument('--steps', type=int, default=20,
+                        help='The number of timed training steps.')
+    parser.add_argument('--warmup', type=int, default=3,
+                        help='The number of untimed training steps.')
+    parser.add_argument('--modes', type=str, default="dense,sparse",
+                        help='Comma separated modes to run, chosen from dense and sparse.')
+    parser.add_argument('--output', type=str, default=None,
+                        help='The path of the json file to write the results to.')
+    return parser.parse_args()
+
+
+def _mlp(sizes):
+    layers = []
+    for i in range(len(sizes) - 1):
+        layers.append(nn.Linear(sizes[i], sizes[i + 1]))
+        layers.append(nn.ReLU())
+    return nn.Sequential(*layers[:-1])
+
+
+class DLRM(nn.Module):
+    '''
+    A DLRM-style model: a bottom MLP on the dense features, one embedding table for each
+    categorical feature, the pairwise dot interaction of the features and a top MLP.
+    '''
+
+    def __init__(self, embeddings, num_dense, embedding_dim):
+        super().__init__()
+        self.embeddings = nn.ModuleList(embeddings)
+        self.bottom_mlp = _mlp([num_dense, 256, 128, embedding_dim])
+        num_features = len(embeddings) + 1
+        num_interactions = num_features * (num_features - 1) // 2
+        self.top_mlp = _mlp([embedding_dim + num_interactions, 512, 256, 1])
+        self.register_buffer("triu", torch.triu_indices(num_features, num_features, 1))
+
+    def forward(self, dense, sparse):
+        x = self.bottom_mlp(dense)
+        features = torch.stack([x] + [emb(sparse[:, i]) for i, emb in
+                                      enumerate(self.embeddings)], dim=1)
+        interactions = torch.bmm(features, features.transpose(1, 2))
+        interactions = interactions[:, self.triu[0], self.triu[1]]
+        return self.top_mlp(torch.cat([x, interactions], dim=1)).squeeze(1)
+
+
+def build(mode, args):
+    if mode == "dense":
+        embeddings = [nn.Embedding(args.num_rows, args.embedding_dim)
+                      for _ in range(args.num_tables)]
+    else:
+        hot_ids = list(range(args.num_hot)) if args.hash_size and args.num_hot else None
+        embeddings = [Embedding(args.num_rows, args.embedding_dim,
+                                hash_size=args.hash_size, hot_ids=hot_ids)
+                      for _ in range(args.num_tables)]
+    model = DLRM(embeddings, args.num_dense, args.embedding_dim)
+    if mode == "dense":
+        optimizer = torch.optim.AdamW(model.parameters(), weight_decay=args.weight_decay)
+    else:
+        optimizer = SparseAdam(model.parameters(), weight_decay=args.weight_decay)
+    return model, optimizer
+
+
+def generate_batch(args):
+    dense = torch.rand(args.batch_size, args.num_dense)
+    # rand ** skew concentrates the ids towards 0, which gives a power law like popularity,
+    # so that the hot ids of the sparse model are the smallest ids
+    sparse = (torch.rand(args.batch_size, args.num_tables) ** args.skew
+              * args.num_rows).long()
+    labels = (torch.rand(args.batch_size) < 0.2).float()
+    return dense, sparse, labels
+
+
+def run(mode, args):
+    torch.manual_seed(0)
+    model, optimizer = build(mode, args)
+    loss_fn = nn.BCEWithLogitsLoss()
+    batches = [generate_batch(args) for _ in range(8)]
+    times = {"forward": [], "backward": [], "optimizer": [], "step": []}
+    model.train()
+    for i in range(args.warmup + args.steps):
+        dense, sparse, labels = batches[i % len(batches)]
+        start = time()
+        optimizer.zero_grad()
+        loss = loss_fn(model(dense, sparse), labels)
+        forward_end = time()
+        loss.backward()
+        backward_end = time()
+        optimizer.step()
+        end = time()
+        if i >= args.warmup:
+            times["forward"].append(forward_end - start)
+            times["backward"].append(backward_end - forward_end)
+            times["optimizer"].append(end - backward_end)
+            times["step"].append(end - start)
+    num_params = sum(p.numel() for p in model.parameters())
+    result = {"mode": mode, "num_params": num_params}
+    for k, v in times.items():
+        result[f"{k}_median_sec"] = statistics.median(v)
+    result["samples_per_sec"] = args.batch_size / result["step_median_sec"]
+    return result
+
+
+if __name__ == '__main__':
+    args = _parse_args()
+    modes = [m.strip() for m in args.modes.split(",") if m.strip()]
+    for mode in modes:
+        if mode not in ("dense", "sparse"):
+            raise ValueError(f"mode should be dense or sparse, but got {mode}")
+
+    results = []
+    for mode in modes:
+        result = run(mode, args)
+        print("{}: step {:.4f}s (forward {:.4f}s, backward {:.4f}s, optimizer {:.4f}s), "
+              "{:.0f} samples/s".format(mode, result["step_median_sec"],
+                                        result["forward_median_sec"],
+                                        result["backward_median_sec"],
+                                        result["optimizer_median_sec"],
+                                        result["samples_per_sec"]))
+        results.append(result)
+
+    report = {"torch_version": torch.__version__,
+              "num_threads": torch.get_num_threads(),
+              "config": vars(args),
+              "results": results}
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
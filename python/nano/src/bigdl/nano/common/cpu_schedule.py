@@ -83,7 +83,8 @@ def get_cpu_info():
 
 
 def schedule_workers(num_workers: int,
-                     cores_per_worker: Optional[int] = None):
+                     cores_per_worker: Optional[int] = None,
+                     numa_aware: bool = False):
 
     cpuset = get_cgroup_cpuset()
     cpuset = sorted(cpuset)
@@ -105,6 +106,31 @@ def schedule_workers(num_workers: int,
           " equal than the physical cores available"
     assert cores_per_worker * num_workers <= len(p_cores), msg
 
+    if numa_aware:
+        # order the physical cores by socket, and skip the cores at the end of a socket
+        # that can not hold a whole worker if possible, so that no worker spans two sockets
+        socket_cores = {}
+        for core in p_cores:
+            socket_cores.setdefault(l_core_to_socket[p2l[core]], []).append(core)
+        aligned = []
+        for cores in socket_cores.values():
+            aligned.extend(cores[:len(cores) // cores_per_worker * cores_per_worker])
+        if len(aligned) >= cores_per_worker * num_workers:
+            # spread the workers evenly among the sockets
+            groups = [aligned[i:i + cores_per_worker]
+                      for i in range(0, len(aligned), cores_per_worker)]
+            by_socket = {}
+            for group in groups:
+                by_socket.setdefault(l_core_to_socket[p2l[group[0]]], []).append(group)
+            interleaved = []
+            while len(interleaved) < num_workers:
+                for socket_groups in by_socket.values():
+                    if socket_groups:
+                        interleaved.append(socket_groups.pop(0))
+            p_cores = [core for group in interleaved for core in group]
+        else:
+            p_cores = [core for cores in socket_cores.values() for core in cores]
+
     schedule = []
     for i in range(num_workers):
         schedule.append([p2l[core] for core in
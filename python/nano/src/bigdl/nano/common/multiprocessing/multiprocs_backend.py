@@ -14,20 +14,63 @@
 # limitations under the License.
 #
 
+import atexit
 import os
 from tempfile import TemporaryDirectory
 from typing import Any
 
 from bigdl.nano.common.multiprocessing.backend import Backend
 
+# the live worker pools, keyed by the number of processes and their environment variables
+_WORKER_POOLS = {}
+
+
+def _get_worker_pool(nprocs, envs):
+    from bigdl.nano.common.multiprocessing.worker_pool import WorkerPool
+    key = (nprocs, None if envs is None else tuple(frozenset(env.items()) for env in envs))
+    pool = _WORKER_POOLS.get(key)
+    if pool is not None and not pool.is_alive():
+        pool.close()
+        pool = None
+    if pool is None:
+        # only keep the workers of the latest setting, so that the cores are not oversubscribed
+        shutdown_worker_pools()
+        pool = WorkerPool(nprocs, envs)
+        _WORKER_POOLS[key] = pool
+    return pool
+
+
+def shutdown_worker_pools():
+    '''
+    Stop all the persistent workers started by MultiprocessingBackend.
+    '''
+    while _WORKER_POOLS:
+        _, pool = _WORKER_POOLS.popitem()
+        pool.close()
+
+
+atexit.register(shutdown_worker_pools)
+
 
 class MultiprocessingBackend(Backend):
+    '''
+    Run the target in nprocs python processes.
+
+    :param persistent: whether to keep the processes alive after run and reuse them for the
+           next run with the same nprocs and envs, which saves the start time of python and
+           the imports of each run. The target and args are sent to the processes through
+           shared memory instead of temporary files. Default to True.
+    '''
+
+    def __init__(self, persistent=True):
+        self.persistent = persistent
 
     def setup(self) -> None:
         pass
 
     def shutdown(self) -> None:
-        pass
+        if self.persistent:
+            shutdown_worker_pools()
 
     def run(self, target, args=..., nprocs=1, envs=None) -> Any:
         if envs is not None:
@@ -38,6 +81,14 @@ class MultiprocessingBackend(Backend):
             else:
                 raise ValueError("envs must be a dict or a list of dict")
 
+        if self.persistent:
+            pool = _get_worker_pool(nprocs, envs)
+            try:
+                return pool.run(target, args)
+            except RuntimeError:
+                # the workers may be left in a bad state, start new ones for the next run
+                shutdown_worker_pools()
+                raise
         return self.run_subprocess(target, args=args, nprocs=nprocs, envs=envs)
 
     def run_subprocess(self, target, args=..., nprocs=1, envs=None) -> Any:
@@ -0,0 +1,51 @@
+#
+# Copyright 2016 The BigDL Authors.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+import sys
+import traceback
+from multiprocessing.connection import Client
+
+
+if __name__ == '__main__':
+    host, port = sys.argv[1].rsplit(":", 1)
+    rank = int(sys.argv[2])
+    authkey = bytes.fromhex(sys.stdin.read().strip())
+
+    from bigdl.nano.common.multiprocessing.worker_pool import load_payload, release_shm
+
+    conn = Client((host, int(port)), authkey=authkey)
+    conn.send(rank)
+    while True:
+        try:
+            message = conn.recv()
+        except EOFError:
+            break
+        if message is None:
+            break
+        shm = None
+        try:
+            (target, args), shm = load_payload(message)
+            result = ("ok", target(*args))
+            del target, args
+        except Exception:
+            result = ("error", traceback.format_exc())
+        try:
+            conn.send(result)
+        except Exception:
+            conn.send(("error", traceback.format_exc()))
+        del result
+        release_shm(shm)
+    conn.close()
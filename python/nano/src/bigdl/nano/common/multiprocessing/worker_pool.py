@@ -0,0 +1,165 @@
+#
+# Copyright 2016 The BigDL Authors.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+import os
+import pickle
+import subprocess
+import sys
+from multiprocessing.connection import Listener
+
+try:
+    from multiprocessing import shared_memory
+except ImportError:
+    # python < 3.8
+    shared_memory = None
+
+_USE_SHM = shared_memory is not None and pickle.HIGHEST_PROTOCOL >= 5
+
+
+def dump_payload(obj):
+    '''
+    Serialize obj for the workers. With python >= 3.8, the large buffers of obj (e.g. numpy
+    arrays and bytes of model states) are pickled out-of-band into one shared memory segment,
+    which all the workers map instead of each receiving a copy.
+
+    :return: the message to send to the workers and the shared memory to release after
+             the workers finish, or None.
+    '''
+    import cloudpickle
+    if not _USE_SHM:
+        return (cloudpickle.dumps(obj), None, None), None
+    buffers = []
+    data = cloudpickle.dumps(obj, protocol=5, buffer_callback=buffers.append)
+    raws = [buffer.raw() for buffer in buffers]
+    size = sum(raw.nbytes for raw in raws)
+    if size == 0:
+        return (data, None, None), None
+    shm = shared_memory.SharedMemory(create=True, size=size)
+    offsets = []
+    pos = 0
+    for raw in raws:
+        shm.buf[pos:pos + raw.nbytes] = raw
+        offsets.append((pos, raw.nbytes))
+        pos += raw.nbytes
+    return (data, shm.name, offsets), shm
+
+
+def load_payload(message):
+    '''
+    Deserialize the message of dump_payload. The out-of-band buffers are views of the shared
+    memory, which is returned to be closed after the objects are no longer used.
+    '''
+    data, shm_name, offsets = message
+    if shm_name is None:
+        return pickle.loads(data), None
+    shm = shared_memory.SharedMemory(name=shm_name)
+    try:
+        # the segment is owned and unlinked by the pool, not by this process
+        from multiprocessing import resource_tracker
+        resource_tracker.unregister(shm._name, "shared_memory")
+    except Exception:
+        pass
+    buffers = [shm.buf[pos:pos + size] for pos, size in offsets]
+    return pickle.loads(data, buffers=buffers), shm
+
+
+def release_shm(shm, unlink=False):
+    if shm is None:
+        return
+    try:
+        shm.close()
+    except BufferError:
+        # some objects still refer to the buffers, the mapping is released with them
+        pass
+    if unlink:
+        shm.unlink()
+
+
+class WorkerPool:
+    '''
+    A pool of long-lived python processes, which run targets in all the processes at a time
+    and stay alive between calls, so that the interpreter start, the imports and anything
+    the targets cache in the processes are paid only once.
+
+    :param nprocs: the number of processes.
+    :param envs: a list of dict, the environment variables of each process in addition to
+           the ones of the current process.
+    '''
+
+    def __init__(self, nprocs, envs=None):
+        self.nprocs = nprocs
+        authkey = os.urandom(32)
+        self._listener = Listener(("localhost", 0), authkey=authkey)
+        host, port = self._listener.address
+        cwd_path = os.path.split(os.path.realpath(__file__))[0]
+        self._processes = []
+        for i in range(nprocs):
+            env = dict(os.environ)
+            if envs is not None:
+                env.update(envs[i])
+            process = subprocess.Popen([sys.executable, f"{cwd_path}/persistent_worker.py",
+                                        f"{host}:{port}", str(i)],
+                                       env=env, stdin=subprocess.PIPE)
+            # pass the authkey through stdin instead of the command line
+            process.stdin.write(authkey.hex().encode())
+            process.stdin.close()
+            self._processes.append(process)
+        self._conns = [None] * nprocs
+        for _ in range(nprocs):
+            conn = self._listener.accept()
+            self._conns[conn.recv()] = conn
+
+    def is_alive(self):
+        return all(p.poll() is None for p in self._processes)
+
+    def run(self, target, args=()):
+        '''
+        Run target(*args) in all the processes and return the results in the order of the
+        processes.
+        '''
+        message, shm = dump_payload((target, args))
+        try:
+            for conn in self._conns:
+                conn.send(message)
+            results = []
+            errors = []
+            for i, conn in enumerate(self._conns):
+                try:
+                    status, result = conn.recv()
+                except EOFError:
+                    status, result = "error", f"worker {i} exited unexpectedly"
+                if status == "error":
+                    errors.append(f"[worker {i}]: {result}")
+                results.append(result)
+        finally:
+            release_shm(shm, unlink=True)
+        if errors:
+            raise RuntimeError("\n".join(errors))
+        return results
+
+    def close(self):
+        for conn in self._conns:
+            try:
+                conn.send(None)
+                conn.close()
+            except (OSError, EOFError):
+                pass
+        for p in self._processes:
+            try:
+                p.wait(timeout=30)
+            except subprocess.TimeoutExpired:
+                p.kill()
+        self._listener.close()
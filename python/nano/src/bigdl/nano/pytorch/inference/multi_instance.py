@@ -0,0 +1,406 @@
+#
+# Copyright 2016 The BigDL Authors.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+import os
+import math
+import queue
+import time
+import threading
+import itertools
+import traceback
+from concurrent.futures import Future
+from typing import Any, Callable, List, Optional, Sequence
+
+import numpy as np
+import torch
+import torch.multiprocessing as mp
+
+import logging
+log = logging.getLogger(__name__)
+
+_READY = "ready"
+# the interval in seconds to check if the replicas are alive while waiting for results
+_WATCH_INTERVAL = 1
+
+
+def _to_numpy(x):
+    if isinstance(x, torch.Tensor):
+        return x.detach().cpu().numpy()
+    return np.asarray(x)
+
+
+def _instance_worker(index, cores, num_threads, model, model_creator, task_queue, result_queue):
+    if cores and hasattr(os, "sched_setaffinity"):
+        os.sched_setaffinity(0, cores)
+    torch.set_num_threads(num_threads)
+    try:
+        if model_creator is not None:
+            model = model_creator()
+        if isinstance(model, torch.nn.Module):
+            model.eval()
+    except Exception:
+        result_queue.put((_READY, index, traceback.format_exc()))
+        return
+    result_queue.put((_READY, index, None))
+
+    with torch.no_grad():
+        while True:
+            task = task_queue.get()
+            if task is None:
+                break
+            task_id, inputs = task
+            try:
+                outputs = model(*[torch.from_numpy(x) if isinstance(x, np.ndarray) else x
+                                  for x in inputs])
+                if isinstance(outputs, (tuple, list)):
+                    outputs = tuple(_to_numpy(o) for o in outputs)
+                else:
+                    outputs = _to_numpy(outputs)
+                result_queue.put((task_id, outputs, None))
+            except Exception:
+                result_queue.put((task_id, None, traceback.format_exc()))
+
+
+class MultiInstanceRunner:
+    '''
+    Run num_instances replicas of a model in processes pinned to disjoint groups of
+    physical cores, to make use of all the cores when a single instance can not, e.g. with
+    small batch sizes. Requests are dispatched to idle replicas through a shared queue.
+    If a replica dies, the outstanding requests fail and the runner can not be used anymore.
+
+    >>> with MultiInstanceRunner(model, num_instances=4) as runner:
+    >>>     future = runner.submit(x)          # a single request
+    >>>     y = future.result()
+    >>>     y = runner.predict(x, batch_size=8)  # split, dispatch and gather
+
+    :param model: a torch.nn.Module or any picklable callable, which is called with the
+           inputs as torch tensors and returns a tensor or a tuple of tensors.
+    :param model_creator: a function without argument that creates the model in each
+           replica, for models that can not be pickled, e.g. an onnxruntime session.
+           Either model or model_creator should be specified.
+    :param num_instances: the number of replicas. Default to 1.
+    :param cores_per_instance: the number of physical cores of each replica. Default to
+           None, which divides the physical cores evenly among the replicas. A ValueError
+           is raised if there are not enough physical cores for the replicas.
+    :param num_threads: the number of intra-op threads of each replica. Default to None,
+           which is the number of cores of the replica.
+    :param numa_aware: whether to keep each replica within a socket, so that its memory
+           is allocated on the local NUMA node. Default to True.
+    :param cpu_procs: a list of logical cores of each replica, which overrides the
+           schedule of cores_per_instance and numa_aware.
+    '''
+
+    def __init__(self,
+                 model: Optional[Callable] = None,
+                 model_creator: Optional[Callable] = None,
+                 num_instances: int = 1,
+                 cores_per_instance: Optional[int] = None,
+                 num_threads: Optional[int] = None,
+                 numa_aware: bool = True,
+                 cpu_procs: Optional[List[List[int]]] = None):
+        assert (model is None) != (model_creator is None), \
+            "Either model or model_creator should be specified."
+        if cpu_procs is None:
+            cpu_procs = _schedule(num_instances, cores_per_instance, numa_aware)
+        assert len(cpu_procs) == num_instances, \
+            "cpu_procs must have the same length with num_instances"
+        self.num_instances = num_instances
+        self.cpu_procs = cpu_procs
+
+        ctx = mp.get_context("spawn")
+        self._task_queue = ctx.Queue()
+        self._result_queue = ctx.Queue()
+        self._processes = []
+        self._closed = False
+        init_envs = {key: os.environ.get(key) for key in ["KMP_AFFINITY", "OMP_NUM_THREADS"]}
+        try:
+            for i, cores in enumerate(cpu_procs):
+                threads = num_threads or max(len(cores), 1)
+                # the OpenMP runtime reads these at start, they are inherited by the process
+                if cores:
+                    os.environ["KMP_AFFINITY"] = f"granularity=fine,proclist" \
+                                                 f"=[{','.join(str(c) for c in cores)}],explicit"
+                os.environ["OMP_NUM_THREADS"] = str(threads)
+                log.debug(f"[Instance {i}]: using cores {cores} with {threads} threads")
+                process = ctx.Process(target=_instance_worker,
+                                      args=(i, cores, threads, model, model_creator,
+                                            self._task_queue, self._result_queue),
+                                      daemon=True)
+                process.start()
+                self._processes.append(process)
+        finally:
+            for key, value in init_envs.items():
+                if value is None:
+                    os.environ.pop(key, None)
+                else:
+                    os.environ[key] = value
+
+        errors = []
+        failed = []
+        for _ in range(num_instances):
+            try:
+                # the replicas that failed to create the model exit after reporting it
+                _, index, error = self._get_result(exited=failed)
+            except RuntimeError as e:
+                errors.append(str(e))
+                break
+            if error is not None:
+                failed.append(index)
+                errors.append(f"[Instance {index}]: {error}")
+        if errors:
+            self._stop_processes()
+            raise RuntimeError("Failed to create the model replicas:\n" + "\n".join(errors))
+
+        self._futures = {}
+        self._lock = threading.Lock()
+        self._task_ids = itertools.count()
+        self._failure = None
+        self._collector = threading.Thread(target=self._collect, daemon=True)
+        self._collector.start()
+
+    def _get_result(self, exited=()):
+        # wait for a result while watching the replicas, a dead replica never replies
+        while True:
+            try:
+                return self._result_queue.get(timeout=_WATCH_INTERVAL)
+            except queue.Empty:
+                dead = [i for i, process in enumerate(self._processes)
+                        if i not in exited and not process.is_alive()]
+                if dead and not self._closed:
+                    raise RuntimeError(f"The model replicas {dead} exited unexpectedly with "
+                                       f"exit codes "
+                                       f"{[self._processes[i].exitcode for i in dead]}.")
+
+    def _collect(self):
+        while True:
+            try:
+                task_id, outputs, error = self._get_result()
+            except RuntimeError as e:
+                # the requests taken by the dead replica are lost, fail all the outstanding
+                # requests and stop the other replicas
+                with self._lock:
+                    self._failure = e
+                    futures = list(self._futures.values())
+                    self._futures.clear()
+                for future in futures:
+                    future.set_exception(e)
+                self._stop_processes()
+                break
+            if task_id is None:
+                break
+            with self._lock:
+                future = self._futures.pop(task_id)
+            if error is None:
+                future.set_result(outputs)
+            else:
+                future.set_exception(RuntimeError(error))
+
+    def submit(self, *inputs) -> Future:
+        '''
+        Submit one request to the idle replicas.
+
+        :param inputs: numpy ndarrays or torch tensors as the model inputs.
+        :return: a Future of the model output as a numpy ndarray (or a tuple of ndarrays).
+        '''
+        if self._closed:
+            raise RuntimeError("The runner has been closed.")
+        future = Future()
+        task_id = next(self._task_ids)
+        with self._lock:
+            if self._failure is not None:
+                raise RuntimeError("The runner has failed.") from self._failure
+            self._futures[task_id] = future
+        self._task_queue.put((task_id, tuple(_to_numpy(x) for x in inputs)))
+        return future
+
+    def predict(self, *inputs, batch_size: Optional[int] = None):
+        '''
+        Split inputs into batches along the first dim, run them on all the replicas and
+        gather the outputs in order.
+
+        :param inputs: numpy ndarrays or torch tensors as the model inputs.
+        :param batch_size: the number of samples of each request. Default to None, which
+               splits the inputs evenly among the replicas.
+        :return: the model output as a numpy ndarray (or a tuple of ndarrays).
+        '''
+        inputs = [_to_numpy(x) for x in inputs]
+        num_samples = len(inputs[0])
+        if batch_size is None:
+            batch_size = max(math.ceil(num_samples / self.num_instances), 1)
+        starts = range(0, num_samples, batch_size)
+        futures = [self.submit(*[x[start:start + batch_size] for x in inputs])
+                   for start in starts]
+        outputs = None
+        for start, future in zip(starts, futures):
+            result = future.result()
+            is_tuple = isinstance(result, tuple)
+            result = result if is_tuple else (result,)
+            if outputs is None:
+                outputs = [np.empty((num_samples,) + r.shape[1:], dtype=r.dtype) for r in result]
+            for out, r in zip(outputs, result):
+                out[start:start + len(r)] = r
+        if outputs is None:
+            return None
+        return tuple(outputs) if is_tuple else outputs[0]
+
+    def _stop_processes(self):
+        for _ in self._processes:
+            self._task_queue.put(None)
+        for process in self._processes:
+            process.join(timeout=10)
+            if process.is_alive():
+                process.terminate()
+
+    def close(self):
+        if self._closed:
+            return
+        self._closed = True
+        self._stop_processes()
+        self._result_queue.put((None, None, None))
+        self._collector.join()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+
+def _schedule(num_instances, cores_per_instance=None, numa_aware=True):
+    num_cores = _physical_core_num()
+    required = num_instances * (cores_per_instance or 1)
+    if num_instances < 1 or required > num_cores:
+        raise ValueError(f"{num_instances} instances with {cores_per_instance or 1} cores "
+                         f"each require {required} physical cores, but {num_cores} are "
+                         f"available.")
+    try:
+        from bigdl.nano.common.cpu_schedule import schedule_workers
+        return schedule_workers(num_instances, cores_per_instance, numa_aware=numa_aware)
+    except (OSError, FileNotFoundError, KeyError):
+        # cpuset or lscpu is not available, run without pinning
+        log.warning("Failed to get the cpu topology, the instances will not be pinned.")
+        return [[] for _ in range(num_instances)]
+
+
+def _make_batch(input_sample, batch_size):
+    input_sample = input_sample if isinstance(input_sample, (tuple, list)) else (input_sample,)
+    batch = []
+    for x in input_sample:
+        x = _to_numpy(x)
+        repeats = math.ceil(batch_size / len(x))
+        batch.append(np.concatenate([x] * repeats, axis=0)[:batch_size])
+    return batch
+
+
+def _physical_core_num():
+    try:
+        from bigdl.nano.common.cpu_schedule import schedule_workers
+        return len(schedule_workers(1)[0])
+    except (OSError, FileNotFoundError, KeyError):
+        return os.cpu_count() or 1
+
+
+def benchmark_multi_instance(model: Optional[Callable] = None,
+                             input_sample: Any = None,
+                             model_creator: Optional[Callable] = None,
+                             num_instances: Optional[Sequence[int]] = None,
+                             batch_sizes: Sequence[int] = (1, 8, 32),
+                             num_threads: Optional[Sequence[Optional[int]]] = None,
+                             num_requests: int = 200,
+                             warmup_requests: int = 20,
+                             latency_budget: Optional[float] = None,
+                             numa_aware: bool = True):
+    '''
+    Measure the throughput and latency of MultiInstanceRunner for each combination of the
+    number of instances, the batch size and the threads per instance, and pick the one with
+    the highest throughput whose p99 latency is within latency_budget.
+
+    :param model: same as the param of MultiInstanceRunner.
+    :param input_sample: a torch tensor, a numpy ndarray or a tuple of them with the batch
+           dim, whose samples are repeated to build the requests of each batch size.
+    :param model_creator: same as the param of MultiInstanceRunner.
+    :param num_instances: the candidates of the number of instances. Default to None, which
+           is the powers of 2 up to the number of physical cores.
+    :param batch_sizes: the candidates of the batch size of each request.
+    :param num_threads: the candidates of the threads per instance. Default to None,
+           which uses one thread per core of each instance.
+    :param num_requests: the number of requests of each measurement.
+    :param warmup_requests: the number of requests to run before each measurement.
+    :param latency_budget: the maximum p99 latency in seconds of a request. Default to None,
+           which means no limit.
+    :param numa_aware: same as the param of MultiInstanceRunner.
+
+    :return: a dict of the best "num_instances", "batch_size", "num_threads" and its
+             "throughput" (samples per second), "latency_p50" and "latency_p99" (seconds),
+             with the measurements of all the candidates in "results".
+    '''
+    assert input_sample is not None, "input_sample is needed to build the requests."
+    if num_instances is None:
+        cores = _physical_core_num()
+        num_instances = [2 ** i for i in range(int(math.log2(cores)) + 1)]
+    num_threads = num_threads or [None]
+
+    results = []
+    for instances in num_instances:
+        cpu_procs = _schedule(instances, None, numa_aware)
+        for threads in num_threads:
+            with MultiInstanceRunner(model=model, model_creator=model_creator,
+                                     num_instances=instances, num_threads=threads,
+                                     cpu_procs=cpu_procs) as runner:
+                for batch_size in batch_sizes:
+                    batch = _make_batch(input_sample, batch_size)
+                    for future in [runner.submit(*batch) for _ in range(warmup_requests)]:
+                        future.result()
+
+                    # keep two requests in flight per instance, so that the instances are
+                    # busy while the latency does not include a long queueing time
+                    latencies = []
+                    in_flight = threading.Semaphore(2 * instances)
+
+                    def on_done(submit_time):
+                        def callback(_):
+                            latencies.append(time.perf_counter() - submit_time)
+                            in_flight.release()
+                        return callback
+                    futures = []
+                    start = time.perf_counter()
+                    for _ in range(num_requests):
+                        in_flight.acquire()
+                        submit_time = time.perf_counter()
+                        future = runner.submit(*batch)
+                        future.add_done_callback(on_done(submit_time))
+                        futures.append(future)
+                    for future in futures:
+                        future.result()
+                    elapsed = time.perf_counter() - start
+                    result = {"num_instances": instances,
+                              "batch_size": batch_size,
+                              "num_threads": threads or len(cpu_procs[0]) or None,
+                              "throughput": num_requests * batch_size / elapsed,
+                              "latency_p50": float(np.percentile(latencies, 50)),
+                              "latency_p99": float(np.percentile(latencies, 99))}
+                    log.info(f"multi-instance benchmark: {result}")
+                    results.append(result)
+
+    candidates = [r for r in results
+                  if latency_budget is None or r["latency_p99"] <= latency_budget]
+    if not candidates:
+        raise RuntimeError(f"No configuration meets the latency budget {latency_budget}s, "
+                           f"the lowest p99 latency is "
+                           f"{min(r['latency_p99'] for r in results)}s.")
+    best = dict(max(candidates, key=lambda r: r["throughput"]))
+    best["results"] = results
+    return best
@@ -0,0 +1,104 @@
+#
+# Copyright 2016 The BigDL Authors.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+import torch
+from torch import nn
+
+# the multiplier of the fibonacci hashing, which spreads consecutive ids over the buckets
+_HASH_MULTIPLIER = 0x9E3779B97F4A7C15 - (1 << 64)
+
+
+def _hash(input):
+    hashed = input * _HASH_MULTIPLIER
+    return hashed ^ (hashed >> 32)
+
+
+class Embedding(nn.Embedding):
+
+    def __init__(self,
+                 num_embeddings,
+                 embedding_dim,
+                 sparse=True,
+                 hash_size=None,
+                 hot_ids=None,
+                 **kwargs):
+        '''
+        This is a version of torch.nn.Embedding for large embedding tables, whose
+        gradient to the weight is sparse by default, so that only the rows in a batch
+        are touched in the backward pass and by optimizers such as
+        bigdl.nano.pytorch.optim.SparseAdam. It can also store a large id space in a
+        smaller table by hashing the ids, where the frequent ids can keep their own rows.
+
+        :param num_embeddings: Integer. The size of the id space, i.e. maximum id + 1.
+        :param embedding_dim: Integer. The dimension of the embedding vectors.
+        :param sparse: Whether the gradient to the weight is a sparse tensor. Default to
+               True. A dense gradient has the size of the whole table, which dominates
+               the step time of large tables.
+        :param hash_size: Integer. The number of rows that the ids are hashed into.
+               Default to None, where each id has its own row and the table has
+               num_embeddings rows. Different ids may share a row after hashing.
+        :param hot_ids: A list or a 1-D tensor of ids which have their own rows besides
+               the hash_size hashed rows, usually the most frequent ids. This is only
+               valid when hash_size is specified.
+        :param **kwargs: Other arguments of torch.nn.Embedding, e.g. padding_idx and
+               max_norm.
+        '''
+        if hot_ids is not None and hash_size is None:
+            raise ValueError("hot_ids is only valid when hash_size is specified")
+        if hash_size is not None:
+            if hash_size <= 0:
+                raise ValueError(f"hash_size should be positive, but got {hash_size}")
+            if kwargs.get("padding_idx") is not None:
+                raise ValueError("padding_idx is not supported with hash_size")
+            if hot_ids is not None:
+                hot_ids = torch.unique(torch.as_tensor(hot_ids, dtype=torch.long))
+            num_hot = 0 if hot_ids is None else len(hot_ids)
+            num_rows = num_hot + hash_size
+        else:
+            num_rows = num_embeddings
+        super().__init__(num_rows, embedding_dim, sparse=sparse, **kwargs)
+        self.num_ids = num_embeddings
+        self.hash_size = hash_size
+        # sorted, to look up the rows of the hot ids with binary search
+        self.register_buffer("hot_ids", hot_ids)
+
+    def get_rows(self, input):
+        '''
+        Map the ids to the rows of the embedding table.
+
+        :param input: A LongTensor of ids.
+        :return: A LongTensor of row indices with the same shape as input.
+        '''
+        if self.hash_size is None:
+            return input
+        rows = torch.remainder(_hash(input), self.hash_size)
+        if self.hot_ids is not None and len(self.hot_ids) > 0:
+            pos = torch.searchsorted(self.hot_ids, input.contiguous())
+            pos.clamp_(max=len(self.hot_ids) - 1)
+            is_hot = self.hot_ids[pos] == input
+            rows = torch.where(is_hot, pos, rows + len(self.hot_ids))
+        return rows
+
+    def forward(self, input):
+        return super().forward(self.get_rows(input))
+
+    def extra_repr(self):
+        s = super().extra_repr()
+        if self.hash_size is not None:
+            s += f", num_ids={self.num_ids}, hash_size={self.hash_size}"
+            if self.hot_ids is not None:
+                s += f", num_hot={len(self.hot_ids)}"
+        return s
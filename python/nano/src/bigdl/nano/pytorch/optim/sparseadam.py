@@ -58,9 +58,15 @@ class SparseAdam(Optimizer):
     applications. However, it provides slightly different semantics than the
     original Adam algorithm, and may lead to different empirical results.
 
+    For the row-sparse gradients of embeddings, the accumulators and the weights
+    are gathered and updated only for the rows in the current batch, so the cost
+    of a step does not grow with the number of rows of the embedding table.
+    Weight decay is applied lazily in the same way: a row is decayed for all the
+    steps it missed when it appears again.
+
     """
 
-    def __init__(self, params, lr=1e-3, betas=(0.9, 0.999), eps=1e-8):
+    def __init__(self, params, lr=1e-3, betas=(0.9, 0.999), eps=1e-8, weight_decay=0):
         """Constructs a new SparseAdam optimizer.
         Args:
           lr: A `Tensor` or a floating point value. or a schedule
@@ -75,6 +81,9 @@ class SparseAdam(Optimizer):
             [Adam: A Method for Stochastic Optimization. Kingma et al., 2014]
             (http://arxiv.org/abs/1412.6980) (in the formula just
             before Section 2.1), not the epsilon in Algorithm 1 of the paper.
+          weight_decay: A `float` value. The decoupled weight decay as in AdamW,
+            which scales the weights by (1 - lr * weight_decay) each step.
+            Default to 0.
         """
         if not 0.0 < lr:
             raise ValueError("Invalid learning rate: {}".format(lr))
@@ -84,8 +93,10 @@ class SparseAdam(Optimizer):
             raise ValueError("Invalid beta parameter at index 0: {}".format(betas[0]))
         if not 0.0 <= betas[1] < 1.0:
             raise ValueError("Invalid beta parameter at index 1: {}".format(betas[1]))
+        if not 0.0 <= weight_decay:
+            raise ValueError("Invalid weight_decay value: {}".format(weight_decay))
 
-        defaults = dict(lr=lr, betas=betas, eps=eps)
+        defaults = dict(lr=lr, betas=betas, eps=eps, weight_decay=weight_decay)
         super(SparseAdam, self).__init__(params, defaults)
 
     def step(self, closure=None):
@@ -108,12 +119,62 @@ class SparseAdam(Optimizer):
                 grad = p.grad.data
 
                 if grad.is_sparse:
-                    self.sparse_step(group, p, grad)
+                    grad = grad.coalesce()
+                    if grad.sparse_dim() == 1 and grad.dense_dim() > 0:
+                        # the gradient of embedding weights, which is sparse in rows
+                        self.row_sparse_step(group, p, grad)
+                    else:
+                        self.sparse_step(group, p, grad)
                 else:
                     self.dense_step(group, p, grad)
 
         return loss
 
+    def row_sparse_step(self, group, param, grad):
+        state = self.state[param]
+
+        # State initialization
+        if len(state) == 0:
+            state['step'] = 0
+            # Exponential moving average of gradient values
+            state['exp_avg'] = torch.zeros_like(param.data)
+            # Exponential moving average of squared gradient values
+            state['exp_avg_sq'] = torch.zeros_like(param.data)
+        if group['weight_decay'] != 0 and 'last_step' not in state:
+            # The last step each row is updated, to catch up with the weight decay
+            state['last_step'] = torch.zeros(param.size(0), dtype=torch.long,
+                                             device=param.device)
+
+        state['step'] += 1
+
+        rows = grad._indices()[0]
+        grad_values = grad._values()
+        exp_avg, exp_avg_sq = state['exp_avg'], state['exp_avg_sq']
+        beta1, beta2 = group['betas']
+
+        exp_avg_rows = exp_avg.index_select(0, rows)
+        exp_avg_rows.mul_(beta1).add_(grad_values, alpha=1 - beta1)
+        exp_avg.index_copy_(0, rows, exp_avg_rows)
+        exp_avg_sq_rows = exp_avg_sq.index_select(0, rows)
+        exp_avg_sq_rows.mul_(beta2).addcmul_(grad_values, grad_values, value=1 - beta2)
+        exp_avg_sq.index_copy_(0, rows, exp_avg_sq_rows)
+
+        param_rows = param.data.index_select(0, rows)
+        if group['weight_decay'] != 0:
+            last_step = state['last_step']
+            missed = (state['step'] - last_step.index_select(0, rows)).to(param_rows.dtype)
+            decay = torch.pow(1 - group['lr'] * group['weight_decay'], missed)
+            param_rows.mul_(decay.view(-1, *([1] * (param_rows.dim() - 1))))
+            last_step.index_fill_(0, rows, state['step'])
+
+        bias_correction1 = 1 - beta1 ** state['step']
+        bias_correction2 = 1 - beta2 ** state['step']
+        step_size = group['lr'] * math.sqrt(bias_correction2) / bias_correction1
+
+        denom = exp_avg_sq_rows.sqrt_().add_(group['eps'])
+        param_rows.addcdiv_(exp_avg_rows, denom, value=-step_size)
+        param.data.index_copy_(0, rows, param_rows)
+
     def sparse_step(self, group, param, grad):
         state = self.state[param]
 
@@ -128,6 +189,8 @@ class SparseAdam(Optimizer):
         state['step'] += 1
 
         grad = grad.coalesce()  # the update is non-linear so indices must be unique
+        if group['weight_decay'] != 0:
+            param.data.mul_(1 - group['lr'] * group['weight_decay'])
         grad_indices = grad._indices()
         grad_values = grad._values()
         size = grad.size()
@@ -181,6 +244,9 @@ class SparseAdam(Optimizer):
         bias_correction1 = 1 - beta1 ** state['step']
         bias_correction2 = 1 - beta2 ** state['step']
 
+        if group['weight_decay'] != 0:
+            param.data.mul_(1 - group['lr'] * group['weight_decay'])
+
         # Decay the first and second moment running average coefficient
         exp_avg.mul_(beta1).add_(1 - beta1, grad)
         exp_avg_sq.mul_(beta2).addcmul_(1 - beta2, grad, grad)
@@ -20,7 +20,6 @@ import onnxruntime as ort
 from functools import partial
 import warnings
 import math
-import numpy as np
 
 BASE_BINDED_COMPONENTS = ['_train_old',
                           '_torch_forward',
@@ -84,7 +83,14 @@ def inference(self,
     :param backend: str, to set the backend library. "onnx" for onnxruntime, which
             provides lower latency and any other value will make `inference` call
             the pytorch forwarding method.
-    :param **kwargs: any other keywords that will be passed to onnx session's building.
+    :param **kwargs: any other keywords that will be passed to onnx session's building,
+            e.g. num_sessions, intra_op_num_threads and inter_op_num_threads.
+            Please call update_ortsess in advance to build and warm up the sessions
+            instead of building them implicitly in the first call.
+    :return: If backend is set to "onnx" and batch_size is not None, a numpy ndarray
+            (or a tuple of ndarrays for a multi-output model) in which the batches are
+            inferenced concurrently by the session pool and written into place. Otherwise,
+            a torch tensor (or a tuple of torch tensors).
     '''
 
     if isinstance(input_data, list):
@@ -120,24 +126,9 @@ def inference(self,
             else:
                 return self._forward_onnx_quantized(*input_sample_list)
         else:
-            yhat_list = []
-            sample_num = input_sample_list[0].shape[0]  # the first dim should be sample_num
-            batch_num = math.ceil(sample_num / batch_size)
-            if not quantize:
-                for batch_id in range(batch_num):
-                    yhat_list.append(self._forward_onnx(
-                        *tuple(map(lambda x: x[batch_id * batch_size:
-                                               (batch_id + 1) * batch_size],
-                                   input_sample_list))))
-            else:
-                for batch_id in range(batch_num):
-                    yhat_list.append(self._forward_onnx_quantized(
-                        *tuple(map(lambda x: x[batch_id * batch_size:
-                                               (batch_id + 1) * batch_size],
-                                   input_sample_list))))
-            # this operation may cause performance degradation
-            yhat = np.concatenate(yhat_list, axis=0)
-            return yhat
+            pool = self._ortsess_pool if not quantize else self._quantized_ortsess_pool
+            yhat = pool.run_batches(*input_sample_list, batch_size=batch_size)
+            return yhat[0] if len(yhat) == 1 else tuple(yhat)
     else:
         # inference w/o onnxruntime (fallback to pytorch native forward)
         quantize = quantize if quantize is not None else self._default_inference_quantize
@@ -151,6 +142,9 @@ def inference(self,
                 yhat_list.append(self(*map(lambda x: x[batch_id * batch_size:
                                                        (batch_id + 1) * batch_size],
                                            input_sample_list)))
+            if isinstance(yhat_list[0], (tuple, list)):
+                # multi-output model
+                return tuple(torch.cat(outputs, axis=0) for outputs in zip(*yhat_list))
             yhat = torch.cat(yhat_list, axis=0)
             return yhat
 
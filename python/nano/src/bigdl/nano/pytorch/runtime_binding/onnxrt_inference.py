@@ -18,6 +18,7 @@ from pytorch_lightning import LightningModule
 import torch
 from torch.utils.data import DataLoader
 from bigdl.nano.pytorch.lightning import LightningModuleFromTorch
+from bigdl.nano.pytorch.runtime_binding.ortsess_pool import ORTSessionPool
 import onnxruntime as ort
 import onnx
 from functools import partial, wraps
@@ -30,6 +31,7 @@ import inspect
 
 ONNXRT_BINDED_COMPONENTS = ['_ortsess_up_to_date',
                             '_ortsess',
+                            '_ortsess_pool',
                             '_onnx_graph',
                             '_build_ortsess',
                             'update_ortsess',
@@ -43,13 +45,20 @@ def _build_ortsess(self,
                    input_sample=None,
                    file_path="model.onnx",
                    sess_options=None,
+                   num_sessions=1,
+                   intra_op_num_threads=None,
+                   inter_op_num_threads=None,
                    **kwargs):
     '''
-    Internal function to build a ortsess and bind to the lightningmodule.
+    Internal function to build a pool of ortsess, warm it up and bind to the lightningmodule.
 
     :param input_sample: torch.Tensor or a list for the model tracing.
     :param file_path: The path to save onnx model file.
     :param sess_options: ortsess options in ort.SessionOptions type
+    :param num_sessions: the number of ortsess to serve concurrent inference.
+    :param intra_op_num_threads: the number of intra-op threads of each ortsess. Default to
+           None, which divides the physical cores evenly among the ortsess.
+    :param inter_op_num_threads: the number of inter-op threads of each ortsess.
     :param **kwargs: will be passed to torch.onnx.export function.
     '''
 
@@ -66,16 +75,23 @@ def _build_ortsess(self,
     assert input_sample is not None,\
         'You should set either input_sample or self.example_input_array'
 
+    input_sample_tuple = tuple(input_sample) if isinstance(input_sample, (tuple, list)) \
+        else (input_sample,)
+    output_names = kwargs.pop('output_names', None)
+    if output_names is None:
+        output_names = _get_output_names(self, input_sample_tuple)
+
     dynamic_axes = {}
     for forward_arg in self._forward_args:
         dynamic_axes[forward_arg] = {0: 'batch_size'}  # set all dim0 to be dynamic
-    dynamic_axes['output'] = {0: 'batch_size'}
+    for output_name in output_names:
+        dynamic_axes[output_name] = {0: 'batch_size'}
 
     default_onnx_export_args = {'export_params': True,
                                 'opset_version': 11,  # version = 11 by default
                                 'do_constant_folding': True,
                                 'input_names': self._forward_args,
-                                'output_names': ['output'],  # TODO: only support single output
+                                'output_names': output_names,
                                 'dynamic_axes': dynamic_axes}
     default_onnx_export_args.update(kwargs)
 
@@ -84,50 +100,108 @@ def _build_ortsess(self,
                       file_path,
                       **default_onnx_export_args)
 
-    self._ortsess = ort.InferenceSession(file_path, sess_options=sess_options)
+    _close_pool(self._ortsess_pool)
+    self._ortsess_pool = ORTSessionPool(file_path,
+                                        self._forward_args,
+                                        num_sessions=num_sessions,
+                                        intra_op_num_threads=intra_op_num_threads,
+                                        inter_op_num_threads=inter_op_num_threads,
+                                        sess_options=sess_options)
+    # warm up eagerly so that the first request does not pay for the initialization
+    self._ortsess_pool.warmup(*input_sample_tuple)
+    self._ortsess = self._ortsess_pool.sessions[0]
     self._onnx_graph = onnx.load(file_path)
     self._ortsess_up_to_date = True
 
 
+def _get_output_names(self, input_sample):
+    # trace the number of outputs, each of which is an onnx graph output
+    forward = self._torch_forward if "_torch_forward" in dir(self) else self.forward
+    # switch the mode without the binded hooks, which would reset the ortsess
+    training = self.training
+    torch.nn.Module.train(self, False)
+    try:
+        with torch.no_grad():
+            outputs = forward(*input_sample)
+    finally:
+        torch.nn.Module.train(self, training)
+    if isinstance(outputs, (tuple, list)):
+        return ['output_{}'.format(i) for i in range(len(outputs))]
+    return ['output']
+
+
+def _close_pool(pool):
+    if pool is not None:
+        pool.close()
+
+
+def _to_torch_outputs(outputs):
+    if len(outputs) == 1:
+        return torch.from_numpy(outputs[0])
+    return tuple(torch.from_numpy(output) for output in outputs)
+
+
 # external method to update(& rebuild) ortsess
 def update_ortsess(self,
                    input_sample=None,
                    file_path="model.onnx",
                    sess_options=None,
+                   num_sessions=1,
+                   intra_op_num_threads=None,
+                   inter_op_num_threads=None,
                    **kwargs):
     '''
     Update the onnxruntime session options and rebuild the session.
     Users may also want to call this method before `inference(..., onnx=True`)`
-    to avoid implicit building.
+    to avoid implicit building. The sessions are warmed up with input_sample
+    before this method returns.
 
     :param input_sample: torch.Tensor for the model tracing.
     :param file_path: The path to save onnx model file.
     :param sess_options: ortsess options in ort.SessionOptions type.
+    :param num_sessions: the number of sessions to build, so that up to num_sessions
+           concurrent `inference` calls or batches run in parallel. Default to 1.
+    :param intra_op_num_threads: the number of intra-op threads of each session. Default to
+           None, which divides the physical cores evenly among the sessions
+           as `schedule_workers` does.
+    :param inter_op_num_threads: the number of inter-op threads of each session.
+           Default to None.
     :param **kwargs: will be passed to torch.onnx.export function.
     '''
     self._build_ortsess(input_sample=input_sample,
                         file_path=file_path,
                         sess_options=sess_options,
+                        num_sessions=num_sessions,
+                        intra_op_num_threads=intra_op_num_threads,
+                        inter_op_num_threads=inter_op_num_threads,
                         **kwargs)
 
 
 # on_fit_start (LightningModule method overwrite)
 def _onnx_on_fit_start(self):
     self._ortsess_up_to_date = False
+    _close_pool(self._ortsess_pool)
+    self._ortsess_pool = None
     self._ortsess = None
     self._quantized_ortsess_up_to_date = False
     self._default_ortsess_inference_quantize = False
     self._quantized_ortsess = None
+    _close_pool(getattr(self, "_quantized_ortsess_pool", None))
+    self._quantized_ortsess_pool = None
     self.exit_onnx()
 
 
 def _onnx_on_train(self, mode=True):
     self.exit_onnx()
     self._ortsess_up_to_date = False
+    _close_pool(self._ortsess_pool)
+    self._ortsess_pool = None
     self._ortsess = None
     self._quantized_ortsess_up_to_date = False
     self._default_ortsess_inference_quantize = False
     self._quantized_ortsess = None
+    _close_pool(getattr(self, "_quantized_ortsess_pool", None))
+    self._quantized_ortsess_pool = None
 
 
 def to_quantized_onnx(self, file_path):
@@ -139,23 +213,11 @@ def to_quantized_onnx(self, file_path):
 
 
 def _forward_onnx(self, *args):
-    ort_inputs = {}
-    for i, ort_input_item in enumerate(args):
-        if isinstance(ort_input_item, torch.Tensor):
-            ort_input_item = ort_input_item.numpy()
-        ort_inputs[self._forward_args[i]] = ort_input_item
-    ort_outs = self._ortsess.run(None, ort_inputs)
-    return torch.from_numpy(ort_outs[0])
+    return _to_torch_outputs(self._ortsess_pool.run(*args))
 
 
 def _forward_onnx_quantized(self, *args):
-    ort_inputs = {}
-    for i, ort_input_item in enumerate(args):
-        if isinstance(ort_input_item, torch.Tensor):
-            ort_input_item = ort_input_item.numpy()
-        ort_inputs[self._forward_args[i]] = ort_input_item
-    ort_outs = self._quantized_ortsess.run(None, ort_inputs)
-    return torch.from_numpy(ort_outs[0])
+    return _to_torch_outputs(self._quantized_ortsess_pool.run(*args))
 
 
 def eval_onnx(self, input_sample=None, file_path="model.onnx",
@@ -217,17 +279,9 @@ def bind_onnxrt_methods(pl_model: LightningModule, q_onnx_model=None, sess_optio
     # assert isinstance(pl_model, LightningModule),\
     #     f"onnxruntime support is only valid for a LightningModule, but found a {type(pl_model)}."
 
-    if q_onnx_model:
-        onnx.save(q_onnx_model, "_model_quantized_cache.onnx")
-        pl_model._q_onnx_model = q_onnx_model
-        pl_model._quantized_ortsess = ort.InferenceSession("_model_quantized_cache.onnx",
-                                                           sess_options=sess_options)
-        pl_model._quantized_ortsess_up_to_date = True
-        pl_model._default_ortsess_inference_quantize = True
-
     # if all needed method has been binded, return the same model
     if set(ONNXRT_BINDED_COMPONENTS) <= set(dir(pl_model)):
-        return pl_model
+        return _bind_quantized_ortsess(pl_model, q_onnx_model, sess_options)
 
     # check conflicts
     for component in ONNXRT_BINDED_COMPONENTS:
@@ -239,6 +293,7 @@ def bind_onnxrt_methods(pl_model: LightningModule, q_onnx_model=None, sess_optio
     # additional attributes
     pl_model._ortsess_up_to_date = False  # indicate if we need to build ortsess again
     pl_model._ortsess = None  # ortsess instance
+    pl_model._ortsess_pool = None  # ortsess pool to serve inference
     pl_model._default_ortsess_inference_quantize = False
     pl_model._onnx_graph = None  # onnx graph for quantization
     if isinstance(pl_model, LightningModuleFromTorch):  # forward param list for compiled model
@@ -257,4 +312,23 @@ def bind_onnxrt_methods(pl_model: LightningModule, q_onnx_model=None, sess_optio
     pl_model._forward_onnx_quantized = partial(_forward_onnx_quantized, pl_model)
     pl_model.to_quantized_onnx = partial(to_quantized_onnx, pl_model)
 
+    return _bind_quantized_ortsess(pl_model, q_onnx_model, sess_options)
+
+
+def _bind_quantized_ortsess(pl_model, q_onnx_model, sess_options=None):
+    if q_onnx_model:
+        onnx.save(q_onnx_model, "_model_quantized_cache.onnx")
+        pl_model._q_onnx_model = q_onnx_model
+        _close_pool(getattr(pl_model, "_quantized_ortsess_pool", None))
+        pl_model._quantized_ortsess_pool = ORTSessionPool("_model_quantized_cache.onnx",
+                                                          pl_model._forward_args,
+                                                          sess_options=sess_options)
+        input_sample = getattr(pl_model, "example_input_array", None)
+        if input_sample is not None:
+            input_sample_tuple = tuple(input_sample) if isinstance(input_sample, (tuple, list)) \
+                else (input_sample,)
+            pl_model._quantized_ortsess_pool.warmup(*input_sample_tuple)
+        pl_model._quantized_ortsess = pl_model._quantized_ortsess_pool.sessions[0]
+        pl_model._quantized_ortsess_up_to_date = True
+        pl_model._default_ortsess_inference_quantize = True
     return pl_model
@@ -0,0 +1,262 @@
+#
+# Copyright 2016 The BigDL Authors.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+import os
+import queue
+import math
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+
+import numpy as np
+import onnxruntime as ort
+from onnxruntime.capi.onnxruntime_pybind11_state import Fail, InvalidArgument, \
+    RuntimeException
+
+# the errors that onnxruntime raises when a run fails
+_ORT_ERRORS = (Fail, InvalidArgument, RuntimeException)
+
+
+class _OutputSpecMismatch(Exception):
+    '''
+    Raised when the outputs of a run do not fit the preallocated outputs, with the outputs
+    of the run without IO binding.
+    '''
+
+    def __init__(self, outputs):
+        super().__init__("the output shape is not fixed apart from the batch dim")
+        self.outputs = outputs
+
+
+def _threads_per_session(num_sessions):
+    '''
+    Get the number of intra-op threads for each of num_sessions sessions, which is the
+    number of physical cores that schedule_workers assigns to a worker.
+    '''
+    try:
+        from bigdl.nano.common.cpu_schedule import schedule_workers
+        return max(len(schedule_workers(num_sessions)[0]), 1)
+    except Exception:
+        # cpuset or lscpu is not available, e.g. on macOS
+        return max((os.cpu_count() or 1) // num_sessions, 1)
+
+
+class ORTSessionPool:
+    '''
+    A pool of onnxruntime sessions of the same model to serve concurrent inference.
+    Each session runs with IO binding, where the inputs are bound to the numpy buffers of
+    the callers and the outputs are written into preallocated arrays, so that no copy or
+    concatenation is needed after the run.
+
+    :param model: the path of the onnx model file or the serialized model bytes.
+    :param input_names: the names of the model inputs, in the order of the positional
+           arguments of `run`.
+    :param num_sessions: the number of sessions in the pool, each of which can serve
+           one request at a time. Default to 1.
+    :param intra_op_num_threads: the number of intra-op threads of each session. Default to
+           None, which divides the physical cores evenly by schedule_workers.
+    :param inter_op_num_threads: the number of inter-op threads of each session. Default to
+           None, which is 1 unless sess_options specifies it.
+    :param sess_options: ortsess options in ort.SessionOptions type, which will be copied
+           for each session.
+    '''
+
+    def __init__(self,
+                 model,
+                 input_names,
+                 num_sessions=1,
+                 intra_op_num_threads=None,
+                 inter_op_num_threads=None,
+                 sess_options=None):
+        assert num_sessions >= 1, f"num_sessions should be at least 1, but got {num_sessions}"
+        self.input_names = list(input_names)
+        self.num_sessions = num_sessions
+        if sess_options is None or sess_options.intra_op_num_threads == 0:
+            intra_op_num_threads = intra_op_num_threads or _threads_per_session(num_sessions)
+        self.sessions = []
+        for _ in range(num_sessions):
+            options = ort.SessionOptions() if sess_options is None else _copy_options(sess_options)
+            if intra_op_num_threads:
+                options.intra_op_num_threads = intra_op_num_threads
+            if inter_op_num_threads:
+                options.inter_op_num_threads = inter_op_num_threads
+            elif options.inter_op_num_threads == 0:
+                options.inter_op_num_threads = 1
+            self.sessions.append(ort.InferenceSession(model, sess_options=options))
+        self.output_names = [o.name for o in self.sessions[0].get_outputs()]
+        # the (dtype, shape without batch dim) of each output, known after the first run
+        self._output_specs = None
+        self._preallocate = True
+        self._idle = queue.Queue()
+        for session in self.sessions:
+            self._idle.put(session)
+        self._executor = None
+
+    @contextmanager
+    def acquire(self):
+        '''
+        Borrow an idle session from the pool, waiting until one is returned if all the
+        sessions are busy.
+        '''
+        session = self._idle.get()
+        try:
+            yield session
+        finally:
+            self._idle.put(session)
+
+    def warmup(self, *inputs):
+        '''
+        Run every session once on inputs so that the memory arena and kernels are
+        initialized before the first request, and record the output specs for preallocation.
+        '''
+        for session in self.sessions:
+            outputs = session.run(None, self._feed(inputs))
+        self._record_specs(outputs)
+
+    def _record_specs(self, outputs):
+        if self._preallocate and self._output_specs is None:
+            self._output_specs = [(out.dtype, out.shape[1:]) for out in outputs]
+
+    def _feed(self, inputs):
+        return {name: _to_numpy(x) for name, x in zip(self.input_names, inputs)}
+
+    def _run_bound(self, session, inputs, outputs):
+        binding = session.io_binding()
+        for name, x in zip(self.input_names, inputs):
+            binding.bind_cpu_input(name, np.ascontiguousarray(x))
+        for name, out in zip(self.output_names, outputs):
+            binding.bind_output(name, "cpu", 0, out.dtype.type, out.shape,
+                                out.__array_interface__["data"][0])
+        session.run_with_iobinding(binding)
+
+    def _run_on(self, session, inputs, outputs=None):
+        if outputs is None:
+            outputs = session.run(None, self._feed(inputs))
+            self._record_specs(outputs)
+            return outputs
+        try:
+            self._run_bound(session, inputs, outputs)
+        except _ORT_ERRORS:
+            # The binding fails if the output shape is not fixed apart from the batch dim,
+            # which is told by a run without binding. Any other error is raised.
+            actual = session.run(None, self._feed(inputs))
+            if [(out.dtype, out.shape[1:]) for out in actual] == self._output_specs:
+                raise
+            raise _OutputSpecMismatch(actual)
+        return outputs
+
+    def _disable_preallocation(self):
+        self._preallocate = False
+        self._output_specs = None
+
+    def _allocate(self, num_samples):
+        if self._output_specs is None:
+            return None
+        return [np.empty((num_samples,) + shape, dtype=dtype)
+                for dtype, shape in self._output_specs]
+
+    def run(self, *inputs):
+        '''
+        Run one request on an idle session.
+
+        :param inputs: numpy ndarrays or torch tensors in the order of input_names.
+        :return: a list of numpy ndarrays, one for each model output.
+        '''
+        inputs = [_to_numpy(x) for x in inputs]
+        outputs = self._allocate(len(inputs[0]))
+        with self.acquire() as session:
+            try:
+                return self._run_on(session, inputs, outputs)
+            except _OutputSpecMismatch as e:
+                self._disable_preallocation()
+                return e.outputs
+
+    def run_batches(self, *inputs, batch_size=None):
+        '''
+        Run inputs batch by batch on all the sessions of the pool concurrently. Each batch
+        writes into its own slice of the preallocated outputs.
+
+        :param inputs: numpy ndarrays or torch tensors in the order of input_names, where the
+               first dim is the number of samples.
+        :param batch_size: the number of samples of each batch. Default to None, which splits
+               the inputs evenly among the sessions.
+        :return: a list of numpy ndarrays, one for each model output.
+        '''
+        inputs = [_to_numpy(x) for x in inputs]
+        num_samples = len(inputs[0])
+        if batch_size is None:
+            batch_size = max(math.ceil(num_samples / self.num_sessions), 1)
+        starts = list(range(0, num_samples, batch_size))
+        if len(starts) <= 1:
+            return self.run(*inputs)
+        outputs = self._allocate(num_samples)
+        if outputs is None:
+            # the output specs are unknown before the first run
+            head = self.run(*[x[:batch_size] for x in inputs])
+            if self._output_specs is None:
+                return self._run_and_concat(inputs, starts[1:], batch_size, head)
+            outputs = self._allocate(num_samples)
+            for out, h in zip(outputs, head):
+                out[:len(h)] = h
+            starts = starts[1:]
+
+        def run_batch(start):
+            end = min(start + batch_size, num_samples)
+            with self.acquire() as session:
+                self._run_on(session, [x[start:end] for x in inputs],
+                             [out[start:end] for out in outputs])
+
+        try:
+            if self.num_sessions == 1:
+                for start in starts:
+                    run_batch(start)
+            else:
+                if self._executor is None:
+                    self._executor = ThreadPoolExecutor(self.num_sessions)
+                # onnxruntime releases the GIL while running, so the sessions run in parallel
+                list(self._executor.map(run_batch, starts))
+        except _OutputSpecMismatch:
+            self._disable_preallocation()
+            return self._run_and_concat(inputs, list(range(0, num_samples, batch_size)),
+                                        batch_size)
+        return outputs
+
+    def _run_and_concat(self, inputs, starts, batch_size, head=None):
+        results = [] if head is None else [head]
+        results += [self.run(*[x[start:start + batch_size] for x in inputs]) for start in starts]
+        return [np.concatenate(outs, axis=0) for outs in zip(*results)]
+
+    def close(self):
+        if self._executor is not None:
+            self._executor.shutdown()
+            self._executor = None
+
+
+def _to_numpy(x):
+    if isinstance(x, np.ndarray):
+        return x
+    # torch.Tensor
+    return x.detach().cpu().numpy()
+
+
+def _copy_options(sess_options):
+    options = ort.SessionOptions()
+    for attr in ["enable_cpu_mem_arena", "enable_mem_pattern", "enable_profiling",
+                 "execution_mode", "graph_optimization_level", "inter_op_num_threads",
+                 "intra_op_num_threads", "log_severity_level", "optimized_model_filepath",
+                 "use_deterministic_compute"]:
+        if hasattr(sess_options, attr):
+            setattr(options, attr, getattr(sess_options, attr))
+    return options
@@ -23,6 +23,12 @@ from contextlib import closing
 import socket
 import tensorflow as tf
 
+# the worker addresses of each nprocs, which are reused so that TF_CONFIG stays the same
+# across runs and the persistent workers of MultiprocessingBackend can be reused
+_WORKER_LISTS = {}
+# the strategy of the current worker process, which can only be created once in a process
+_STRATEGY = None
+
 
 def find_free_port():
     with closing(socket.socket(socket.AF_INET, socket.SOCK_STREAM)) as s:
@@ -36,7 +42,10 @@ def train_func(model_dir, ds_graph, elem_spec,
     import tensorflow as tf
     from tensorflow.python.distribute.coordinator.values import deserialize_dataset_from_graph
 
-    strategy = tf.distribute.MultiWorkerMirroredStrategy()
+    global _STRATEGY
+    if _STRATEGY is None:
+        _STRATEGY = tf.distribute.MultiWorkerMirroredStrategy()
+    strategy = _STRATEGY
     with strategy.scope():
         new_model = tf.keras.models.load_model(os.path.join(model_dir, "temp_model"))
         train_dataset = deserialize_dataset_from_graph(ds_graph, elem_spec)
@@ -65,6 +74,15 @@ def train_func(model_dir, ds_graph, elem_spec,
         return history
 
 
+def _get_worker_list(nprocs):
+    if nprocs not in _WORKER_LISTS:
+        ports = set()
+        while len(ports) < nprocs:
+            ports.add(find_free_port())
+        _WORKER_LISTS[nprocs] = [f"localhost:{p}" for p in ports]
+    return _WORKER_LISTS[nprocs]
+
+
 def distributed_train_keras(backend, model, nprocs, fit_kwargs=None):
 
     backend.setup()
@@ -93,11 +111,7 @@ def distributed_train_keras(backend, model, nprocs, fit_kwargs=None):
     model.evaluate(train_dataset, verbose=0, steps=1)
     assert model.compiled_metrics.built
 
-    ports = set()
-    while len(ports) < nprocs:
-        ports.add(find_free_port())
-    ports = list(ports)
-    worker_list = [f"localhost:{p}" for p in ports]
+    worker_list = _get_worker_list(nprocs)
 
     with TemporaryDirectory() as temp_dir:
         model.save(os.path.join(temp_dir, 'temp_model'))
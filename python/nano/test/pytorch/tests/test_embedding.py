@@ -0,0 +1,60 @@
+#
+# Copyright 2016 The BigDL Authors.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+import pytest
+from unittest import TestCase
+
+import torch
+
+from bigdl.nano.pytorch.layers import Embedding
+from bigdl.nano.pytorch.optim import SparseAdam
+
+
+class TestEmbedding(TestCase):
+
+    def test_sparse_gradient(self):
+        embedding = Embedding(100, 8)
+        optimizer = SparseAdam(embedding.parameters())
+        weight = embedding.weight.detach().clone()
+        embedding(torch.tensor([[1, 2], [2, 3]])).sum().backward()
+        assert embedding.weight.grad.is_sparse
+        optimizer.step()
+        changed = (embedding.weight != weight).any(dim=1).nonzero().flatten().tolist()
+        assert changed == [1, 2, 3]
+
+    def test_hashed_embedding(self):
+        embedding = Embedding(10 ** 8, 8, hash_size=1000)
+        assert embedding.weight.shape == (1000, 8)
+        ids = torch.randint(0, 10 ** 8, (64, 4))
+        rows = embedding.get_rows(ids)
+        assert rows.shape == ids.shape
+        assert rows.min() >= 0 and rows.max() < 1000
+        assert embedding(ids).shape == (64, 4, 8)
+        # consecutive ids are spread over the buckets
+        assert len(embedding.get_rows(torch.arange(1000)).unique()) > 500
+
+    def test_hot_ids(self):
+        embedding = Embedding(10 ** 6, 8, hash_size=100, hot_ids=[7, 3, 500])
+        assert embedding.weight.shape == (103, 8)
+        rows = embedding.get_rows(torch.tensor([3, 7, 500, 4, 10 ** 6 - 1]))
+        assert rows[:3].tolist() == [0, 1, 2]
+        assert (rows[3:] >= 3).all() and (rows[3:] < 103).all()
+        assert "hot_ids" in embedding.state_dict()
+
+        with pytest.raises(ValueError):
+            Embedding(100, 8, hot_ids=[1, 2])
+        with pytest.raises(ValueError):
+            Embedding(100, 8, hash_size=10, padding_idx=0)
@@ -0,0 +1,105 @@
+#
+# Copyright 2016 The BigDL Authors.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+import os
+import pytest
+from unittest import TestCase
+
+import numpy as np
+import torch
+from torch import nn
+
+from bigdl.nano.pytorch.inference import MultiInstanceRunner, benchmark_multi_instance
+
+
+class TwoOutputModel(nn.Module):
+    def __init__(self):
+        super().__init__()
+        self.layer_1 = nn.Linear(16, 4)
+        self.layer_2 = nn.Linear(16, 2)
+
+    def forward(self, x):
+        return self.layer_1(x), self.layer_2(x)
+
+
+class ExitModel(nn.Module):
+    def forward(self, x):
+        if len(x) == 3:
+            # the replica dies without replying
+            os._exit(1)
+        return x
+
+
+class TestMultiInstance(TestCase):
+
+    def test_multi_instance_predict(self):
+        model = nn.Sequential(nn.Linear(16, 8), nn.ReLU(), nn.Linear(8, 1))
+        x = torch.randn(100, 16)
+        with torch.no_grad():
+            expected = model(x).numpy()
+
+        with MultiInstanceRunner(model, num_instances=2) as runner:
+            assert len(runner.cpu_procs) == 2
+            np.testing.assert_almost_equal(runner.predict(x), expected, decimal=5)
+            np.testing.assert_almost_equal(runner.predict(x.numpy(), batch_size=7),
+                                           expected, decimal=5)
+            futures = [runner.submit(x[i:i + 10]) for i in range(0, 100, 10)]
+            np.testing.assert_almost_equal(np.concatenate([f.result() for f in futures]),
+                                           expected, decimal=5)
+            # errors in a replica are raised from the future
+            with pytest.raises(RuntimeError):
+                runner.submit(torch.randn(3, 5)).result()
+
+    def test_multi_instance_multiple_output(self):
+        model = TwoOutputModel()
+        x = torch.randn(50, 16)
+        with torch.no_grad():
+            expected = model(x)
+        with MultiInstanceRunner(model, num_instances=2) as runner:
+            outputs = runner.predict(x, batch_size=8)
+        assert len(outputs) == 2
+        for output, expected_output in zip(outputs, expected):
+            np.testing.assert_almost_equal(output, expected_output.numpy(), decimal=5)
+
+    def test_multi_instance_too_many_instances(self):
+        with pytest.raises(ValueError):
+            MultiInstanceRunner(nn.Linear(16, 1), num_instances=(os.cpu_count() or 1) + 1)
+
+    def test_multi_instance_replica_exit(self):
+        with MultiInstanceRunner(ExitModel(), num_instances=1) as runner:
+            np.testing.assert_almost_equal(runner.submit(np.ones((2, 4))).result(),
+                                           np.ones((2, 4)))
+            future = runner.submit(np.ones((3, 4)))
+            with pytest.raises(RuntimeError):
+                future.result(timeout=60)
+            with pytest.raises(RuntimeError):
+                runner.submit(np.ones((2, 4)))
+
+    def test_benchmark_multi_instance(self):
+        model = nn.Linear(16, 1)
+        result = benchmark_multi_instance(model, torch.randn(4, 16),
+                                          num_instances=[1, 2],
+                                          batch_sizes=[1, 4],
+                                          num_requests=20,
+                                          warmup_requests=2)
+        assert len(result["results"]) == 4
+        assert result["throughput"] == max(r["throughput"] for r in result["results"])
+        assert result["num_instances"] in [1, 2]
+        assert result["batch_size"] in [1, 4]
+
+
+if __name__ == '__main__':
+    pytest.main([__file__])
@@ -64,6 +64,16 @@ class MultiInputModel(nn.Module):
         return self.layer_3(x)
 
 
+class MultiOutputModel(nn.Module):
+    def __init__(self):
+        super().__init__()
+        self.layer_1 = nn.Linear(28 * 28, 2)
+        self.layer_2 = nn.Linear(28 * 28, 3)
+
+    def forward(self, x):
+        return self.layer_1(x), self.layer_2(x)
+
+
 class TestOnnx(TestCase):
 
     def test_trainer_compile_with_onnx(self):
@@ -133,6 +143,56 @@ class TestOnnx(TestCase):
         for x1, x2, y in train_loader:
             pl_model.inference([x1.numpy(), x2.numpy()])
 
+    def test_onnx_session_pool(self):
+        model = MultiInputModel()
+        loss = nn.CrossEntropyLoss()
+        optimizer = torch.optim.Adam(model.parameters(), lr=0.01)
+        pl_model = Trainer.compile(model, loss, optimizer, onnx=True)
+        x1 = torch.randn(100, 28 * 28)
+        x2 = torch.randn(100, 28 * 28)
+
+        pl_model.update_ortsess(input_sample=(x1[:1], x2[:1]), num_sessions=2,
+                                intra_op_num_threads=1)
+        assert pl_model._ortsess_up_to_date is True
+        assert len(pl_model._ortsess_pool.sessions) == 2
+        pytorch_res = pl_model.inference([x1, x2], backend=None).numpy()
+        # batches run concurrently on the sessions and are written into place
+        onnx_res = pl_model.inference([x1.numpy(), x2.numpy()], batch_size=7)
+        np.testing.assert_almost_equal(onnx_res, pytorch_res, decimal=5)
+        onnx_res = pl_model.inference([x1.numpy(), x2.numpy()])
+        np.testing.assert_almost_equal(onnx_res.numpy(), pytorch_res, decimal=5)
+
+        from concurrent.futures import ThreadPoolExecutor
+        with ThreadPoolExecutor(4) as executor:
+            results = list(executor.map(
+                lambda i: pl_model.inference([x1[i:i + 10].numpy(), x2[i:i + 10].numpy()]),
+                range(0, 100, 10)))
+        np.testing.assert_almost_equal(torch.cat(results).numpy(), pytorch_res, decimal=5)
+
+        # errors other than a changed output shape are raised and keep the preallocation
+        with pytest.raises(Exception):
+            pl_model._ortsess_pool.run(x1[:10, :100].numpy(), x2[:10].numpy())
+        assert pl_model._ortsess_pool._output_specs is not None
+
+    def test_multiple_output_onnx(self):
+        model = MultiOutputModel()
+        loss = nn.CrossEntropyLoss()
+        optimizer = torch.optim.Adam(model.parameters(), lr=0.01)
+        pl_model = Trainer.compile(model, loss, optimizer, onnx=True)
+        x = torch.randn(100, 28 * 28)
+
+        pl_model.update_ortsess(input_sample=x[:1])
+        pytorch_res = pl_model.inference(x, backend=None)
+        onnx_res = pl_model.inference(x.numpy(), batch_size=32)
+        assert len(onnx_res) == 2
+        for onnx_out, pytorch_out in zip(onnx_res, pytorch_res):
+            np.testing.assert_almost_equal(onnx_out, pytorch_out.numpy(), decimal=5)
+        pl_model.eval_onnx(input_sample=x[:1])
+        forward_res = pl_model(x)
+        pl_model.exit_onnx()
+        for onnx_out, pytorch_out in zip(forward_res, pytorch_res):
+            np.testing.assert_almost_equal(onnx_out.numpy(), pytorch_out.numpy(), decimal=5)
+
     def test_trainer_compile_with_onnx_quantize(self):
         model = ResNet18(10, pretrained=False, include_top=False, freeze=True)
         loss = nn.CrossEntropyLoss()
@@ -88,3 +88,37 @@ def test_optim_sparseadam():
     assert ((sparse_dic['result0'] != sparse_dic['result1']).all())
     assert ((sparse_dic['result2'] == sparse_dic['result3']).all())
 
+
+def test_optim_sparseadam_weight_decay():
+    # rows touched in every step are updated the same as the dense gradient
+    torch.manual_seed(0)
+    model1 = Example18(10, 4, sparse=False)
+    model2 = Example18(10, 4, sparse=True)
+    model2.load_state_dict(model1.state_dict())
+    optimizer1 = SparseAdam(model1.parameters(), lr=0.1, weight_decay=0.1)
+    optimizer2 = SparseAdam(model2.parameters(), lr=0.1, weight_decay=0.1)
+    x = torch.arange(10)
+    y = torch.rand(10, 4)
+    for _ in range(3):
+        for model, optimizer in [(model1, optimizer1), (model2, optimizer2)]:
+            model.zero_grad()
+            nn.MSELoss()(model(x), y).backward()
+            optimizer.step()
+    np.testing.assert_allclose(model1.embedding.weight.detach().numpy(),
+                               model2.embedding.weight.detach().numpy(), atol=1e-5)
+
+    # the weight decay of untouched rows is applied when they appear again
+    model = Example18(10, 4, sparse=True)
+    optimizer = SparseAdam(model.parameters(), lr=0.1, weight_decay=0.5)
+    weight = model.embedding.weight.detach().clone()
+    for i in range(3):
+        model.zero_grad()
+        model(torch.tensor([0])).sum().backward()
+        optimizer.step()
+        assert (model.embedding.weight[1:] == weight[1:]).all()
+    model.zero_grad()
+    # zero gradient, so that only the weight decay of 4 steps changes row 1
+    (model(torch.tensor([1])) * 0).sum().backward()
+    optimizer.step()
+    np.testing.assert_allclose(model.embedding.weight[1].detach().numpy(),
+                               (weight[1] * 0.95 ** 4).numpy(), rtol=1e-5)
@@ -90,3 +90,11 @@ def test_fit_function():
                                                   validation_data=val_ds, nprocs=2, backend="multiprocessing")
     assert 1 - (history_multiprocess.history['loss'][-1]
                 / history_default.history['loss'][-1]) <= 0.1
+
+    # Case 2.2: run again on the persistent workers of multiple processing backend
+    from bigdl.nano.common.multiprocessing.multiprocs_backend import _WORKER_POOLS
+    pools = list(_WORKER_POOLS.values())
+    model_rerun = model_init(num_classes)
+    model_rerun.fit(train_ds, epochs=1, validation_data=val_ds,
+                    nprocs=2, backend="multiprocessing")
+    assert list(_WORKER_POOLS.values()) == pools
@@ -25,6 +25,8 @@ class OrcaContextMeta(type):
     _serialize_data_creator = False
     _train_data_store = "DRAM"
     __shard_size = None
+    _shard_cache_dir = None
+    _shard_cache_budget = None
 
     @property
     def log_output(cls):
@@ -120,6 +122,39 @@ class OrcaContextMeta(type):
                 "shard size should be either None or a positive integer."
         cls.__shard_size = value
 
+    @property
+    def shard_cache_dir(cls):
+        """
+        The directory on each executor to store the SparkXShards persisted with level
+        "LOCAL_DISK". Default to be None, in which case a directory under the system temporary
+        directory would be used.
+        """
+        return cls._shard_cache_dir
+
+    @shard_cache_dir.setter
+    def shard_cache_dir(cls, value):
+        if value is not None:
+            assert isinstance(value, str), "shard_cache_dir should be either None or a str"
+        cls._shard_cache_dir = value
+
+    @property
+    def shard_cache_budget(cls):
+        """
+        The maximum number of bytes of SparkXShards persisted with level "LOCAL_DISK" on each
+        executor. The least recently used shards would be evicted when the budget is exceeded
+        and recomputed when they are needed again.
+        Default to be None, in which case the shards may take at most half of the disk space
+        that is free or already used by them.
+        """
+        return cls._shard_cache_budget
+
+    @shard_cache_budget.setter
+    def shard_cache_budget(cls, value):
+        if value is not None:
+            assert isinstance(value, int) and value > 0, \
+                "shard_cache_budget should be either None or a positive integer."
+        cls._shard_cache_budget = value
+
     @property
     def barrier_mode(cls):
         """
@@ -0,0 +1,173 @@
+#
+# Copyright 2016 The BigDL Authors.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+import os
+import pickle
+import shutil
+import tempfile
+import uuid
+
+import numpy as np
+
+META_FILE = "meta.pkl"
+
+
+def default_cache_dir():
+    return os.path.join(tempfile.gettempdir(), "bigdl_xshards_cache")
+
+
+def _save_data(data, path, name):
+    # Arrays and DataFrames are written in formats that can be memory mapped back,
+    # other objects are pickled into the meta file.
+    import pandas as pd
+    if isinstance(data, np.ndarray) and data.dtype != object:
+        file_name = name + ".npy"
+        np.save(os.path.join(path, file_name), data, allow_pickle=False)
+        return "npy", file_name
+    elif isinstance(data, pd.DataFrame):
+        import pyarrow as pa
+        try:
+            table = pa.Table.from_pandas(data, preserve_index=True)
+        except (pa.ArrowInvalid, pa.ArrowTypeError, pa.ArrowNotImplementedError):
+            return "pickle", pickle.dumps(data, protocol=pickle.HIGHEST_PROTOCOL)
+        file_name = name + ".arrow"
+        with pa.OSFile(os.path.join(path, file_name), "wb") as sink:
+            with pa.ipc.new_file(sink, table.schema) as writer:
+                writer.write_table(table)
+        return "arrow", file_name
+    elif isinstance(data, dict):
+        return "dict", {k: _save_data(v, path, "{}_{}".format(name, i))
+                        for i, (k, v) in enumerate(data.items())}
+    elif isinstance(data, (list, tuple)):
+        items = [_save_data(v, path, "{}_{}".format(name, i)) for i, v in enumerate(data)]
+        return ("tuple" if isinstance(data, tuple) else "list"), items
+    else:
+        return "pickle", pickle.dumps(data, protocol=pickle.HIGHEST_PROTOCOL)
+
+
+def _load_data(meta, path):
+    kind, value = meta
+    if kind == "npy":
+        return np.load(os.path.join(path, value), mmap_mode="r")
+    elif kind == "arrow":
+        import pyarrow as pa
+        source = pa.memory_map(os.path.join(path, value), "r")
+        return pa.ipc.open_file(source).read_all().to_pandas(split_blocks=True)
+    elif kind == "dict":
+        return {k: _load_data(v, path) for k, v in value.items()}
+    elif kind == "list":
+        return [_load_data(v, path) for v in value]
+    elif kind == "tuple":
+        return tuple(_load_data(v, path) for v in value)
+    else:
+        return pickle.loads(value)
+
+
+def save_partition(shards, path):
+    """
+    Save the shards of a partition to the directory path. The directory is written under a
+    temporary name and renamed at last, so that a partially written partition is never read.
+    """
+    tmp_path = "{}.tmp-{}".format(path, uuid.uuid4().hex)
+    os.makedirs(tmp_path)
+    try:
+        meta = [_save_data(shard, tmp_path, str(i)) for i, shard in enumerate(shards)]
+        with open(os.path.join(tmp_path, META_FILE), "wb") as f:
+            pickle.dump(meta, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.rename(tmp_path, path)
+    except OSError:
+        # The partition has been written by another task.
+        shutil.rmtree(tmp_path, ignore_errors=True)
+
+
+def load_partition(path):
+    meta_path = os.path.join(path, META_FILE)
+    with open(meta_path, "rb") as f:
+        meta = pickle.load(f)
+    shards = [_load_data(m, path) for m in meta]
+    # Record the access time for LRU eviction.
+    os.utime(meta_path)
+    return shards
+
+
+def _dir_size(path):
+    size = 0
+    for root, _, files in os.walk(path):
+        for file in files:
+            try:
+                size += os.path.getsize(os.path.join(root, file))
+            except OSError:
+                pass
+    return size
+
+
+def remove_local_cache(cache_dir, cache_id):
+    shutil.rmtree(os.path.join(cache_dir, cache_id), ignore_errors=True)
+
+
+def evict(cache_dir, budget=None, keep=None):
+    """
+    Remove the least recently used partitions under cache_dir until the total size is
+    within budget. If budget is None, the cache may take at most half of the disk space that
+    is free or already used by the cache. The partition at path keep is never removed.
+    """
+    entries = []
+    for cache_id in os.listdir(cache_dir):
+        cache_path = os.path.join(cache_dir, cache_id)
+        if not os.path.isdir(cache_path):
+            continue
+        for index in os.listdir(cache_path):
+            path = os.path.join(cache_path, index)
+            try:
+                last_access = os.path.getmtime(os.path.join(path, META_FILE))
+            except OSError:
+                # being written or removed
+                continue
+            entries.append((last_access, path, _dir_size(path)))
+    total = sum(entry[2] for entry in entries)
+    if budget is None:
+        budget = (shutil.disk_usage(cache_dir).free + total) // 2
+    for _, path, size in sorted(entries):
+        if total <= budget:
+            break
+        if path != keep:
+            shutil.rmtree(path, ignore_errors=True)
+            total -= size
+
+
+def read_or_write_local_cache(index, iterator, cache_dir, cache_id, budget=None):
+    """
+    Read the shards of partition index from the local cache if they exist on this executor,
+    otherwise compute them from iterator and write them to the local cache.
+    """
+    path = os.path.join(cache_dir, cache_id, str(index))
+    if os.path.exists(os.path.join(path, META_FILE)):
+        try:
+            return load_partition(path)
+        except (OSError, EOFError):
+            # evicted while reading, fall back to computing the partition
+            pass
+    shards = list(iterator)
+    os.makedirs(os.path.join(cache_dir, cache_id), exist_ok=True)
+    save_partition(shards, path)
+    evict(cache_dir, budget, keep=path)
+    if os.path.exists(os.path.join(path, META_FILE)):
+        # Return the memory mapped copy so that the computed shards can be released.
+        try:
+            return load_partition(path)
+        except (OSError, EOFError):
+            pass
+    return shards
@@ -134,6 +134,8 @@ class SparkXShards(XShards):
     def __init__(self, rdd, transient=False):
         self.rdd = rdd
         self.user_cached = False
+        self._local_cache_parent = None
+        self._local_cache_path = None
         if transient:
             self.eager = False
         else:
@@ -181,6 +183,44 @@ class SparkXShards(XShards):
         self.rdd.cache()
         return self
 
+    def persist(self, level="MEMORY_ONLY"):
+        """
+
+        Persist this SparkXShards with the given storage level.
+
+        :param level: str, one of the Spark storage levels, such as "MEMORY_ONLY",
+        "MEMORY_AND_DISK" and "DISK_ONLY", or "LOCAL_DISK". For "LOCAL_DISK", shards are
+        written to OrcaContext.shard_cache_dir on the executor that computes them, with
+        ndarrays as .npy files and pandas DataFrames as Arrow IPC files, and are read back
+        through memory mapping instead of being held in Python and JVM memory. Shards
+        evicted under OrcaContext.shard_cache_budget, or not found on the executor that
+        needs them, are recomputed. Note that ndarrays read from "LOCAL_DISK" are read-only.
+        Default is "MEMORY_ONLY".
+        :return: this SparkXShards.
+        """
+        from pyspark import StorageLevel
+        level = level.upper()
+        self.uncache()
+        self.user_cached = True
+        if level == "LOCAL_DISK":
+            from bigdl.orca.data.local_cache import read_or_write_local_cache, \
+                default_cache_dir
+            import uuid
+            cache_dir = OrcaContext.shard_cache_dir or default_cache_dir()
+            budget = OrcaContext.shard_cache_budget
+            cache_id = uuid.uuid4().hex
+            self._local_cache_parent = self.rdd
+            self._local_cache_path = (cache_dir, cache_id)
+            self.rdd = self.rdd.mapPartitionsWithIndex(
+                lambda index, iter: read_or_write_local_cache(index, iter, cache_dir,
+                                                              cache_id, budget))
+        else:
+            assert hasattr(StorageLevel, level), "Unsupported storage level " + level
+            self.rdd.persist(getattr(StorageLevel, level))
+        if self.eager:
+            self.compute()
+        return self
+
     def uncache(self):
         """
 
@@ -189,6 +229,10 @@ class SparkXShards(XShards):
         :return:
         """
         self.user_cached = False
+        if self._local_cache_parent is not None:
+            self.rdd = self._local_cache_parent
+            self._local_cache_parent = None
+            self._remove_local_cache()
         if self.is_cached():
             try:
                 self.rdd.unpersist()
@@ -196,12 +240,27 @@ class SparkXShards(XShards):
                 print("Try to unpersist an uncached rdd")
         return self
 
+    def _remove_local_cache(self):
+        from bigdl.orca.data.local_cache import remove_local_cache
+        cache_dir, cache_id = self._local_cache_path
+        self._local_cache_path = None
+        # Spark can't run a task on each executor, the cache is removed on a best effort basis
+        # by at least as many tasks as the partitions, and whatever is left over is evicted
+        # later under the budget.
+        sc = self.rdd.context
+        num_tasks = max(self.rdd.getNumPartitions(), sc.defaultParallelism)
+        try:
+            sc.parallelize(range(num_tasks), num_tasks) \
+                .foreach(lambda _: remove_local_cache(cache_dir, cache_id))
+        except Py4JError:
+            print("Fail to remove the local cache " + cache_id)
+
     def _uncache(self):
         if not self.user_cached:
             self.uncache()
 
     def is_cached(self):
-        return self.rdd.is_cached
+        return self.rdd.is_cached or self._local_cache_parent is not None
 
     def compute(self):
         self.rdd.count()
@@ -228,23 +287,11 @@ class SparkXShards(XShards):
             import pandas as pd
 
             if num_partitions > self.rdd.getNumPartitions():
-                rdd = self.rdd\
-                    .flatMap(lambda df: df.apply(lambda row: (row[0], row.values.tolist()), axis=1)
-                             .values.tolist())\
-                    .partitionBy(num_partitions)
-
-                schema = self._get_schema()
-
-                def merge_rows(iter):
-                    data = [value[1] for value in list(iter)]
-                    if data:
-                        df = pd.DataFrame(data=data, columns=schema['columns'])\
-                            .astype(schema['dtypes'])
-                        return [df]
-                    else:
-                        # no data in this partition
-                        return iter
-                repartitioned_shard = SparkXShards(rdd.mapPartitions(merge_rows))
+                def round_robin_ids(df, index):
+                    return (np.arange(len(df)) + index) % num_partitions
+
+                rdd = shuffle_pandas_rdd(self.rdd, num_partitions, round_robin_ids)
+                repartitioned_shard = SparkXShards(rdd)
             else:
                 def combine_df(iter):
                     dfs = list(iter)
@@ -292,52 +339,66 @@ class SparkXShards(XShards):
         self._uncache()
         return repartitioned_shard
 
-    def partition_by(self, cols, num_partitions=None):
+    def partition_by(self, cols, num_partitions=None, mode="hash"):
         """
 
         Return a new SparkXShards partitioned using the specified columns.
         This is only applicable for SparkXShards of Pandas DataFrame.
 
-        :param cols: specified columns to partition by.
+        :param cols: specified column or list of columns to partition by.
         :param num_partitions: target number of partitions. If not specified,
         the new SparkXShards would keep the current partition number.
+        :param mode: "hash" or "range". For "hash", records with the same values of cols go
+        to the same partition. For "range", each partition holds a range of values of cols
+        and the ranges are ordered by partition, with bounds estimated from a sample of the
+        data. Default is "hash".
         :return: a new SparkXShards.
         """
         if self._get_class_name() == 'pandas.core.frame.DataFrame':
             import pandas as pd
             schema = self._get_schema()
-            # if partition by a column
             if isinstance(cols, str):
-                if cols not in schema['columns']:
+                cols = [cols]
+            if not isinstance(cols, list) or not cols:
+                raise Exception("Only support partition by a column name or a list of "
+                                "column names")
+            for col in cols:
+                if col not in schema['columns']:
                     raise Exception("The partition column is not in the DataFrame")
-                # change data to key value pairs
-                rdd = self.rdd.flatMap(
-                    lambda df: df.apply(lambda row: (row[cols], row.values.tolist()), axis=1)
-                    .values.tolist())
-
-                partition_num = self.rdd.getNumPartitions() if not num_partitions \
-                    else num_partitions
-                # partition with key
-                partitioned_rdd = rdd.partitionBy(partition_num)
-            else:
-                raise Exception("Only support partition by a column name")
 
-            def merge(iterator):
-                data = [value[1] for value in list(iterator)]
-                if data:
-                    df = pd.DataFrame(data=data, columns=schema['columns']).astype(schema['dtypes'])
-                    return [df]
-                else:
-                    # no data in this partition
-                    return []
-            # merge records to df in each partition
-            partitioned_shard = SparkXShards(partitioned_rdd.mapPartitions(merge))
+            partition_num = self.rdd.getNumPartitions() if not num_partitions \
+                else num_partitions
+            if mode == "hash":
+                def get_partition_ids(df, index):
+                    return hash_partition_ids(df, cols, partition_num)
+            elif mode == "range":
+                bounds = self._sample_range_bounds(cols, partition_num)
+
+                def get_partition_ids(df, index):
+                    return range_partition_ids(df, cols, bounds)
+            else:
+                raise Exception("mode should be either hash or range, but got " + str(mode))
+            partitioned_shard = SparkXShards(
+                shuffle_pandas_rdd(self.rdd, partition_num, get_partition_ids))
             self._uncache()
             return partitioned_shard
         else:
             raise Exception("Currently only support partition by for XShards"
                             " of Pandas DataFrame")
 
+    def _sample_range_bounds(self, cols, num_partitions, sample_size_per_partition=20):
+        import pandas as pd
+        sample_size = sample_size_per_partition * num_partitions
+        sample_per_shard = max(1, sample_size // self.rdd.getNumPartitions())
+        samples = self.rdd.map(
+            lambda df: df[cols].sample(n=min(len(df), sample_per_shard), random_state=0)) \
+            .collect()
+        sample = pd.concat(samples, ignore_index=True).sort_values(cols, kind="mergesort") \
+            .reset_index(drop=True)
+        positions = [len(sample) * (i + 1) // num_partitions for i in range(num_partitions - 1)]
+        positions = [p for p in positions if p < len(sample)]
+        return sample.iloc[positions].drop_duplicates().reset_index(drop=True)
+
     def unique(self):
         """
 
@@ -333,6 +333,146 @@ def get_size(x):
             " or a list of ndarrays, please check your input")
 
 
+def split_pandas_by_partition(df, partition_ids, num_partitions):
+    """
+    Split a pandas DataFrame into sub DataFrames by the target partition id of each row.
+
+    :return: A generator of (partition_id, sub DataFrame) for non-empty partitions.
+    """
+    order = np.argsort(partition_ids, kind="stable")
+    bounds = np.searchsorted(partition_ids[order], np.arange(num_partitions + 1))
+    for partition_id in range(num_partitions):
+        start, end = bounds[partition_id], bounds[partition_id + 1]
+        if end > start:
+            yield partition_id, df.iloc[order[start:end]]
+
+
+def canonical_hash_key(s):
+    """
+    Convert a key column to one dtype per kind of values, since hash_pandas_object hashes by
+    dtype and the same key could be stored in different dtypes in different shards, e.g.
+    int32 and int64, or object and category. Numbers are hashed as float64, which maps any
+    equal numbers to the same hash.
+    """
+    import pandas as pd
+    from pandas.api import types
+    if isinstance(s.dtype, pd.CategoricalDtype):
+        s = pd.Series(np.asarray(s), index=s.index)
+    if types.is_object_dtype(s.dtype) and types.infer_dtype(s, skipna=True) in \
+            ("integer", "floating", "mixed-integer-float", "decimal", "boolean"):
+        s = s.astype(np.float64)
+    if types.is_bool_dtype(s.dtype) or types.is_numeric_dtype(s.dtype):
+        # adding 0.0 turns -0.0 into 0.0
+        return s.astype(np.float64) + 0.0
+    if types.is_datetime64_any_dtype(s.dtype):
+        if getattr(s.dt, "tz", None) is not None:
+            s = s.dt.tz_convert(None)
+        return s.astype("datetime64[ns]")
+    if types.is_timedelta64_dtype(s.dtype):
+        return s.astype("timedelta64[ns]")
+    return s.astype(object).where(s.notna(), None)
+
+
+def hash_partition_ids(df, cols, num_partitions):
+    import pandas as pd
+    keys = pd.DataFrame({col: canonical_hash_key(df[col]) for col in cols}, index=df.index)
+    hashes = pd.util.hash_pandas_object(keys, index=False).values
+    return (hashes % np.uint64(num_partitions)).astype(np.int64)
+
+
+def range_partition_ids(df, cols, bounds):
+    # The partition id of a row is the number of bounds smaller than it, i.e. a row equal to
+    # a bound goes to the partition on the left of the bound.
+    import pandas as pd
+    flag_col = "__is_bound__"
+    keys = pd.concat([df[cols].assign(**{flag_col: 0}), bounds[cols].assign(**{flag_col: 1})],
+                     ignore_index=True)
+    keys = keys.sort_values(cols + [flag_col], kind="mergesort")
+    keys["partition_id"] = keys[flag_col].cumsum()
+    return keys.sort_index()["partition_id"].values[:len(df)].astype(np.int64)
+
+
+def shuffle_pandas_rdd(rdd, num_partitions, get_partition_ids):
+    """
+    Shuffle an RDD of pandas DataFrames. Each DataFrame is split by the partition ids
+    given by get_partition_ids(df, split_index) with vectorized operations, only the sub
+    DataFrames are serialized for the shuffle and each target partition is merged with one
+    concat.
+    """
+    import pandas as pd
+
+    def split(index, iterator):
+        for df in iterator:
+            partition_ids = get_partition_ids(df, index)
+            for item in split_pandas_by_partition(df, partition_ids, num_partitions):
+                yield item
+
+    def merge(iterator):
+        dfs = [df for _, df in iterator]
+        if dfs:
+            return [pd.concat(dfs, ignore_index=True)]
+        else:
+            # no data in this partition
+            return []
+
+    return rdd.mapPartitionsWithIndex(split) \
+        .partitionBy(num_partitions, lambda partition_id: partition_id) \
+        .mapPartitions(merge)
+
+
+def spark_df_to_arrow_batch_rdd(df):
+    """
+    Convert a Spark DataFrame to an RDD of serialized Arrow record batches without going
+    through Python Row objects.
+
+    :param df: A Spark DataFrame.
+    :return: A tuple of the RDD of serialized Arrow record batches and the Arrow schema of
+             the batches, or None if the DataFrame can not be converted through Arrow.
+    """
+    from pyspark.rdd import RDD
+    from pyspark.serializers import NoOpSerializer
+    from pyspark.sql.types import TimestampType
+    try:
+        import pyarrow  # noqa: F401
+        try:
+            from pyspark.sql.pandas.types import to_arrow_schema
+        except ImportError:
+            from pyspark.sql.types import to_arrow_schema
+        # Timestamps would need session time zone conversion, keep them on the Row path.
+        if any(isinstance(field.dataType, TimestampType) for field in df.schema.fields):
+            return None
+        arrow_schema = to_arrow_schema(df.schema)
+        jrdd = df._jdf.toArrowBatchRdd().toJavaRDD()
+    except Exception:
+        return None
+    return RDD(jrdd, df.sql_ctx._sc, NoOpSerializer()), arrow_schema
+
+
+def arrow_batches_to_pandas(iter, schema, batch_size=None):
+    """
+    Convert serialized Arrow record batches to pandas DataFrames, each of which has batch_size
+    rows except for the last one. The Arrow buffers are handed to pandas without copy when
+    possible and the column types are preserved.
+    """
+    import pyarrow as pa
+    batches = []
+    num_rows = 0
+    for batch_bytes in iter:
+        batch = pa.ipc.read_record_batch(pa.py_buffer(batch_bytes), schema)
+        if batch.num_rows == 0:
+            continue
+        batches.append(batch)
+        num_rows += batch.num_rows
+        while batch_size and num_rows >= batch_size:
+            table = pa.Table.from_batches(batches, schema)
+            yield table.slice(0, batch_size).to_pandas(split_blocks=True)
+            table = table.slice(batch_size)
+            batches = table.to_batches()
+            num_rows = table.num_rows
+    if num_rows > 0:
+        yield pa.Table.from_batches(batches, schema).to_pandas(split_blocks=True)
+
+
 def spark_df_to_pd_sparkxshards(df):
     def to_pandas(iter, columns, batch_size=None):
         import pandas as pd
@@ -351,11 +491,35 @@ def spark_df_to_pd_sparkxshards(df):
     from bigdl.orca import OrcaContext
     columns = df.columns
     shard_size = OrcaContext._shard_size
-    pd_rdd = df.rdd.mapPartitions(lambda iter: to_pandas(iter, columns, shard_size))
+    arrow_rdd = spark_df_to_arrow_batch_rdd(df)
+    if arrow_rdd is not None:
+        batch_rdd, arrow_schema = arrow_rdd
+        pd_rdd = batch_rdd.mapPartitions(
+            lambda iter: arrow_batches_to_pandas(iter, arrow_schema, shard_size))
+    else:
+        pd_rdd = df.rdd.mapPartitions(lambda iter: to_pandas(iter, columns, shard_size))
     spark_xshards = SparkXShards(pd_rdd)
     return spark_xshards
 
 
+def spark_df_to_pandas(df):
+    """
+    Collect a Spark DataFrame to a pandas DataFrame with Arrow enabled.
+    Spark falls back to the non-Arrow collection for the types not supported by Arrow.
+    """
+    spark = df.sql_ctx.sparkSession
+    if spark.version >= "3":
+        conf_key = "spark.sql.execution.arrow.pyspark.enabled"
+    else:
+        conf_key = "spark.sql.execution.arrow.enabled"
+    original = spark.conf.get(conf_key, "false")
+    spark.conf.set(conf_key, "true")
+    try:
+        return df.toPandas()
+    finally:
+        spark.conf.set(conf_key, original)
+
+
 def spark_xshards_to_ray_dataset(spark_xshards):
     from bigdl.orca.data.ray_xshards import RayXShards
     import ray
@@ -52,6 +52,10 @@ class Estimator(object):
                learning rate scheduler wrapping the optimizer. You will need to set
                ``scheduler_step_freq="epoch"`` for the scheduler to be incremented correctly.
         :param config: parameter config dict to create model, optimizer loss and data.
+               For the `spark` backend, "state_compression" (None, "zlib" or "lz4") compresses
+               the state sent between the driver and the workers, and "sparse_state_ratio"
+               (default 0.25) is the maximum ratio of changed rows for which a tensor such as
+               an embedding table is sent back after training as a row delta.
         :param scheduler_step_freq: parameter for `horovod` and `torch_distributed` backends.
                "batch", "epoch" or None. This will determine when ``scheduler.step`` is called. If
                "batch", ``step`` will be called after every optimizer step. If "epoch", ``step``
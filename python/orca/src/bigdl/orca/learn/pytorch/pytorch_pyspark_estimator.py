@@ -40,33 +40,14 @@ from bigdl.dllib.utils.utils import get_node_ip
 def partition_to_creator(partition):
 
     def data_creator(config, batch_size):
-        from bigdl.orca.data.utils import ray_partition_get_data_label, index_data, get_size
-        from torch.utils.data import Dataset, DataLoader
-
-        class NDArrayDataset(Dataset):
-            def __init__(self, x, y):
-                self.x = x  # features
-                self.y = y  # labels
-
-            def __len__(self):
-                return get_size(self.y)
-
-            def __getitem__(self, i):
-                return index_data(self.x, i), index_data(self.y, i)
-
-        params = {"batch_size": batch_size, "shuffle": True}
-        for arg in ["shuffle", "sampler", "batch_sampler", "num_workers", "collate_fn",
-                    "pin_memory", "drop_last", "timeout", "worker_init_fn",
-                    "multiprocessing_context"]:
-            if arg in config:
-                params[arg] = config[arg]
+        from bigdl.orca.data.utils import ray_partition_get_data_label
+        from bigdl.orca.learn.pytorch.utils import ndarrays_to_data_loader
+
         data, label = ray_partition_get_data_label(partition,
                                                    allow_tuple=False,
                                                    allow_list=False)
         print("Data size on worker: ", len(label))
-        dataset = NDArrayDataset(data, label)
-        data_loader = DataLoader(dataset, **params)
-        return data_loader
+        return ndarrays_to_data_loader(data, label, config, batch_size)
 
     return data_creator
 
@@ -259,7 +240,10 @@ class PyTorchPySparkEstimator(BaseEstimator):
             res = self.workerRDD.barrier().mapPartitions(
                 lambda iter: transform_func(iter, init_params, params)).collect()
 
-        self.state_dict = PyTorchPySparkEstimator._get_state_dict_from_remote(self.model_dir)
+        from bigdl.orca.learn.pytorch.state_sync import apply_state_delta
+        state_delta = PyTorchPySparkEstimator._get_state_dict_from_remote(self.model_dir)
+        # The workers write the trained state as a delta against the broadcast state.
+        self.state_dict = apply_state_delta(self.state_dict, state_delta)
         worker_stats = res
 
         epoch_stats = list(map(list, zip(*worker_stats)))
@@ -287,16 +271,13 @@ class PyTorchPySparkEstimator(BaseEstimator):
             shutil.rmtree(temp_dir)
         return state_dicts
 
-    def _get_broadcasted_state_dict(self, sc):
-        if self.state_dict:
-            state_dict_b = sc.broadcast(self.state_dict)
-        else:
-            state_dict_b = None
-        return state_dict_b
-
-    def _get_broadcasted_state_dict(self, sc):
+    def _get_broadcasted_state_dict(self, sc, weights_only=False):
+        from bigdl.orca.learn.pytorch import state_sync
         if self.state_dict:
-            state_dict_b = sc.broadcast(self.state_dict)
+            state = state_sync.weights_only(self.state_dict) if weights_only \
+                else self.state_dict
+            state_dict_b = state_sync.broadcast_state(
+                sc, state, compression=self.config.get("state_compression"))
         else:
             state_dict_b = None
         return state_dict_b
@@ -332,7 +313,7 @@ class PyTorchPySparkEstimator(BaseEstimator):
 
         sc = OrcaContext.get_spark_context()
         cluster_info = self._get_cluster_info(sc)
-        state_dict = self._get_broadcasted_state_dict(sc)
+        state_dict = self._get_broadcasted_state_dict(sc, weights_only=True)
 
         init_params = dict(
             mode="predict",
@@ -401,7 +382,7 @@ class PyTorchPySparkEstimator(BaseEstimator):
         """
         sc = OrcaContext.get_spark_context()
         cluster_info = self._get_cluster_info(sc)
-        state_dict = self._get_broadcasted_state_dict(sc)
+        state_dict = self._get_broadcasted_state_dict(sc, weights_only=True)
         init_params = dict(
             mode="evaluate",
             state_dict=state_dict,
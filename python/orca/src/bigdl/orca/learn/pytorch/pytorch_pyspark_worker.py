@@ -34,6 +34,7 @@ from bigdl.orca.learn.pytorch.torch_runner import TorchRunner
 import torch.distributed as dist
 import logging
 from bigdl.orca.learn.utils import save_pkl
+from bigdl.orca.learn.pytorch import state_sync
 import os
 import tempfile
 
@@ -121,23 +122,27 @@ class PytorchPysparkWorker(TorchRunner):
 
     def train_epochs(self, data_creator, epochs=1, batch_size=32, profile=False,
                      info=None, wrap_dataloader=None, callbacks=None):
-        self.load_state_dict(self.state_dict.value)
+        base_state = state_sync.load_shared_state(self.state_dict.value)
+        self.load_state_dict(base_state)
         stats_list = super().train_epochs(data_creator, epochs, batch_size, profile, info,
                                           wrap_dataloader, callbacks)
-        state_dict = self.get_state_dict()
 
         if self.log_to_driver:
             LogMonitor.stop_log_monitor(self.log_path, self.logger_thread, self.thread_stop)
 
         if self.rank == 0:
-            save_pkl(state_dict, os.path.join(self.model_dir, "state.pkl"))
+            state_delta = state_sync.state_delta(
+                self.get_state_dict(), base_state,
+                max_changed_ratio=self.config.get("sparse_state_ratio", 0.25),
+                compression=self.config.get("state_compression"))
+            save_pkl(state_delta, os.path.join(self.model_dir, "state.pkl"))
 
         return [stats_list]
 
     def validate(self, data_creator, batch_size=32, num_steps=None, profile=False,
                  info=None, wrap_dataloader=None):
         """Evaluates the model on the validation data set."""
-        self.load_state_dict(self.state_dict.value)
+        self.load_state_dict(state_sync.load_shared_state(self.state_dict.value))
         validation_stats = super().validate(data_creator, batch_size, num_steps, profile, info,
                                             wrap_dataloader)
         if self.log_to_driver:
@@ -150,7 +155,7 @@ class PytorchPysparkWorker(TorchRunner):
         self._toggle_profiling(profile=profile)
 
         partition = data_creator(config, batch_size)
-        self.load_state_dict(self.state_dict.value)
+        self.load_state_dict(state_sync.load_shared_state(self.state_dict.value))
         result = super().predict(partition=partition, batch_size=batch_size, profile=profile)
         if self.log_to_driver:
             LogMonitor.stop_log_monitor(self.log_path, self.logger_thread, self.thread_stop)
@@ -57,33 +57,14 @@ def check_for_failure(remote_values):
 
 def partition_refs_to_creator(partition_refs):
     def data_creator(config, batch_size):
-        from bigdl.orca.data.utils import ray_partitions_get_data_label, index_data, get_size
-        from torch.utils.data import Dataset, DataLoader
-
-        class NDArrayDataset(Dataset):
-            def __init__(self, x, y):
-                self.x = x  # features
-                self.y = y  # labels
-
-            def __len__(self):
-                return get_size(self.y)
-
-            def __getitem__(self, i):
-                return index_data(self.x, i), index_data(self.y, i)
-
-        params = {"batch_size": batch_size, "shuffle": True}
-        for arg in ["shuffle", "sampler", "batch_sampler", "num_workers", "collate_fn",
-                    "pin_memory", "drop_last", "timeout", "worker_init_fn",
-                    "multiprocessing_context"]:
-            if arg in config:
-                params[arg] = config[arg]
+        from bigdl.orca.data.utils import ray_partitions_get_data_label
+        from bigdl.orca.learn.pytorch.utils import ndarrays_to_data_loader
+
         data, label = ray_partitions_get_data_label(ray.get(partition_refs),
                                                     allow_tuple=False,
                                                     allow_list=False)
         print("Data size on worker: ", len(label))
-        dataset = NDArrayDataset(data, label)
-        data_loader = DataLoader(dataset, **params)
-        return data_loader
+        return ndarrays_to_data_loader(data, label, config, batch_size)
 
     return data_creator
 
@@ -0,0 +1,229 @@
+#
+# Copyright 2016 The BigDL Authors.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+import os
+import pickle
+import tempfile
+import uuid
+import warnings
+import zlib
+from collections import OrderedDict
+
+import numpy as np
+import torch
+
+_FULL = "full"
+_ROWS = "rows"
+
+
+class _TensorRef(object):
+    def __init__(self, index):
+        self.index = index
+
+
+def _extract_tensors(obj, arrays):
+    if isinstance(obj, torch.Tensor):
+        try:
+            array = obj.detach().cpu().numpy()
+        except TypeError:
+            # dtypes without a numpy equivalent (e.g. bfloat16) are kept in the skeleton
+            return obj
+        arrays.append(array)
+        return _TensorRef(len(arrays) - 1)
+    elif isinstance(obj, OrderedDict):
+        return OrderedDict((k, _extract_tensors(v, arrays)) for k, v in obj.items())
+    elif isinstance(obj, dict):
+        return {k: _extract_tensors(v, arrays) for k, v in obj.items()}
+    elif isinstance(obj, list):
+        return [_extract_tensors(v, arrays) for v in obj]
+    elif isinstance(obj, tuple):
+        return tuple(_extract_tensors(v, arrays) for v in obj)
+    return obj
+
+
+def _restore_tensors(obj, arrays):
+    if isinstance(obj, _TensorRef):
+        with warnings.catch_warnings():
+            # Memory mapped arrays are read-only, the tensors are only copied into the
+            # model and optimizers by load_state_dict.
+            warnings.simplefilter("ignore", UserWarning)
+            return torch.from_numpy(arrays[obj.index])
+    elif isinstance(obj, OrderedDict):
+        return OrderedDict((k, _restore_tensors(v, arrays)) for k, v in obj.items())
+    elif isinstance(obj, dict):
+        return {k: _restore_tensors(v, arrays) for k, v in obj.items()}
+    elif isinstance(obj, list):
+        return [_restore_tensors(v, arrays) for v in obj]
+    elif isinstance(obj, tuple):
+        return tuple(_restore_tensors(v, arrays) for v in obj)
+    return obj
+
+
+def weights_only(state):
+    """Returns the part of the runner state that is needed for evaluate and predict."""
+    return {"epoch": state["epoch"], "models": state["models"]}
+
+
+def _compress(data, compression):
+    if compression is None:
+        return data
+    elif compression == "zlib":
+        return zlib.compress(data, 1)
+    elif compression == "lz4":
+        import lz4.frame
+        return lz4.frame.compress(data)
+    raise ValueError("compression should be one of None, 'zlib' and 'lz4', "
+                     "but got {}".format(compression))
+
+
+def _decompress(data, compression):
+    if compression is None:
+        return data
+    elif compression == "zlib":
+        return zlib.decompress(data)
+    else:
+        import lz4.frame
+        return lz4.frame.decompress(data)
+
+
+def dump_state(state, compression=None):
+    """
+    Serializes a state dict into bytes. Tensors are written as raw numpy buffers instead of
+    going through torch.save.
+
+    :param state: The state dict of a TorchRunner.
+    :param compression: None, "zlib" or "lz4".
+    :return: The serialized bytes.
+    """
+    arrays = []
+    skeleton = _extract_tensors(state, arrays)
+    data = pickle.dumps((skeleton, arrays), protocol=4)
+    return pickle.dumps((compression, _compress(data, compression)), protocol=4)
+
+
+def _load_skeleton_and_arrays(payload):
+    compression, data = pickle.loads(payload)
+    return pickle.loads(_decompress(data, compression))
+
+
+def load_state(payload):
+    """Deserializes the bytes generated by dump_state into a state dict."""
+    skeleton, arrays = _load_skeleton_and_arrays(payload)
+    return _restore_tensors(skeleton, arrays)
+
+
+def state_delta(state, base, max_changed_ratio=0.25, compression=None):
+    """
+    Serializes state as a delta against base, the state it was trained from.
+    For each tensor of at least two dimensions with the same shape in base (e.g. embedding
+    tables and their optimizer slots), only the rows that changed are written if they are no
+    more than max_changed_ratio of all rows. Other tensors are written in full.
+
+    :param state: The new state dict.
+    :param base: The state dict that state was updated from.
+    :param max_changed_ratio: The maximum ratio of changed rows to write a tensor sparsely.
+    :param compression: None, "zlib" or "lz4".
+    :return: The serialized bytes, to be applied to base with apply_state_delta.
+    """
+    arrays = []
+    skeleton = _extract_tensors(state, arrays)
+    base_arrays = []
+    _extract_tensors(base, base_arrays)
+    sparse = len(arrays) == len(base_arrays)
+    entries = []
+    for i, array in enumerate(arrays):
+        if sparse and array.ndim >= 2 and array.shape == base_arrays[i].shape \
+                and array.dtype == base_arrays[i].dtype:
+            diff = array != base_arrays[i]
+            changed = np.flatnonzero(diff.reshape(diff.shape[0], -1).any(axis=1))
+            if len(changed) <= max_changed_ratio * array.shape[0]:
+                entries.append((_ROWS, changed, array[changed]))
+                continue
+        entries.append((_FULL, array))
+    data = pickle.dumps((skeleton, entries), protocol=4)
+    return pickle.dumps((compression, _compress(data, compression)), protocol=4)
+
+
+def apply_state_delta(base, payload):
+    """Applies the bytes generated by state_delta to base and returns the new state dict."""
+    compression, data = pickle.loads(payload)
+    skeleton, entries = pickle.loads(_decompress(data, compression))
+    base_arrays = []
+    _extract_tensors(base, base_arrays)
+    arrays = []
+    for i, entry in enumerate(entries):
+        if entry[0] == _ROWS:
+            array = np.array(base_arrays[i])
+            array[entry[1]] = entry[2]
+            arrays.append(array)
+        else:
+            arrays.append(entry[1])
+    return _restore_tensors(skeleton, arrays)
+
+
+def default_state_dir():
+    return os.path.join(tempfile.gettempdir(), "bigdl_torch_state")
+
+
+def broadcast_state(sc, state, compression=None):
+    """
+    Broadcasts a state dict as bytes generated by dump_state, tagged with a unique version
+    so that the workers on the same node can share one decoded copy with load_shared_state.
+    """
+    return sc.broadcast((uuid.uuid4().hex, dump_state(state, compression)))
+
+
+def load_shared_state(broadcast_value, state_dir=None):
+    """
+    Loads the state dict of a broadcast_state value. The first worker on a node decodes the
+    state into memory mapped files under state_dir and the other workers on the node map the
+    same files instead of each deserializing their own copy. Files of older versions are
+    removed.
+    """
+    from filelock import FileLock
+    from bigdl.orca.data.local_cache import save_partition, load_partition, META_FILE
+
+    version, payload = broadcast_value
+    state_dir = state_dir or default_state_dir()
+    os.makedirs(state_dir, exist_ok=True)
+    path = os.path.join(state_dir, version)
+    with FileLock(os.path.join(state_dir, ".lock")):
+        if not os.path.exists(os.path.join(path, META_FILE)):
+            skeleton, arrays = _load_skeleton_and_arrays(payload)
+            skeleton = pickle.dumps(skeleton, protocol=4)
+            save_partition([{"skeleton": skeleton, "arrays": arrays}], path)
+            _remove_old_versions(state_dir, keep=path)
+    try:
+        data = load_partition(path)[0]
+    except (OSError, EOFError):
+        return load_state(payload)
+    return _restore_tensors(pickle.loads(data["skeleton"]), data["arrays"])
+
+
+def _remove_old_versions(state_dir, keep, max_versions=2):
+    import shutil
+    from bigdl.orca.data.local_cache import META_FILE
+    versions = []
+    for name in os.listdir(state_dir):
+        path = os.path.join(state_dir, name)
+        if path != keep and os.path.isdir(path):
+            try:
+                versions.append((os.path.getmtime(os.path.join(path, META_FILE)), path))
+            except OSError:
+                continue
+    # Keep the latest versions that concurrent tasks of an earlier stage may still read.
+    for _, path in sorted(versions)[:max(0, len(versions) - max_versions + 1)]:
+        shutil.rmtree(path, ignore_errors=True)
@@ -37,6 +37,8 @@ import io
 import itertools
 import os
 import tempfile
+from contextlib import contextmanager
+import numpy as np
 import torch
 import torch.nn as nn
 from torch.utils.data import DataLoader, IterableDataset
@@ -343,36 +345,74 @@ class TorchRunner:
         return validation_stats
 
     def predict(self, partition, batch_size=32, profile=False):
-        """Evaluates the model on the validation data set."""
+        """Runs inference on the shards of a partition.
+
+        The shards are coalesced into full batches, which are prepared in a background
+        thread (config["prefetch_batches"], default 2) while the model runs the forward
+        pass under torch.inference_mode. config["inference_num_threads"] sets the number
+        of intra-op threads used by the forward pass. Returns one {"prediction": ndarray}
+        per input shard. If DataLoader arguments such as collate_fn are given in config,
+        each shard is fed through a DataLoader with these arguments instead.
+        """
         config = self.config.copy()
         self._toggle_profiling(profile=profile)
 
-        params = {"batch_size": batch_size, "shuffle": False}
-        for arg in ["shuffle", "sampler", "batch_sampler", "num_workers", "collate_fn",
-                    "pin_memory", "drop_last", "timeout", "worker_init_fn",
-                    "multiprocessing_context"]:
-            if arg in config:
-                params[arg] = config[arg]
+        if isinstance(partition, IterableDataset):
+            with self.timers.record("predict"), self._inference_context(config):
+                return [{"prediction": self.training_operator.predict(shard)}
+                        for shard, shard_idx in partition]
 
-        def predict_fn(shard):
-            if isinstance(partition, IterableDataset):
-                y = self.training_operator.predict(shard)
-            else:
+        loader_args = ["sampler", "batch_sampler", "num_workers", "collate_fn", "pin_memory",
+                       "drop_last", "timeout", "worker_init_fn", "multiprocessing_context"]
+        if any(arg in config for arg in loader_args):
+            params = {"batch_size": batch_size, "shuffle": False}
+            for arg in ["shuffle"] + loader_args:
+                if arg in config:
+                    params[arg] = config[arg]
+
+            def predict_fn(shard):
                 if isinstance(shard["x"], tuple) or isinstance(shard["x"], list):
                     tensors = [torch.from_numpy(arr) for arr in shard["x"]]
                 else:
                     tensors = [torch.from_numpy(shard["x"])]
                 dataset = torch.utils.data.TensorDataset(*tensors)
                 data_loader = DataLoader(dataset, **params)
-                y = self.training_operator.predict(iter(data_loader))
-            return {"prediction": y}
+                return {"prediction": self.training_operator.predict(iter(data_loader))}
 
-        with self.timers.record("predict"):
-            if isinstance(partition, IterableDataset):
-                new_part = [predict_fn(shard) for shard, shard_idx in partition]
+            with self.timers.record("predict"), self._inference_context(config):
+                return [predict_fn(shard) for shard in partition]
+
+        features = []
+        for shard in partition:
+            if isinstance(shard["x"], tuple) or isinstance(shard["x"], list):
+                features.append(list(shard["x"]))
             else:
-                new_part = [predict_fn(shard) for shard in partition]
-        return new_part
+                features.append([shard["x"]])
+        sizes = [len(feature[0]) for feature in features]
+        if sum(sizes) == 0:
+            return [{"prediction": np.empty((0,))} for _ in sizes]
+
+        batches = utils.coalesce_batches(features, batch_size)
+        num_prefetch = config.get("prefetch_batches", 2)
+        if num_prefetch > 0:
+            batches = utils.prefetch_iterator(batches, num_prefetch)
+        with self.timers.record("predict"), self._inference_context(config):
+            y = self.training_operator.predict(batches)
+        return [{"prediction": pred} for pred in np.split(y, np.cumsum(sizes)[:-1])]
+
+    @contextmanager
+    def _inference_context(self, config):
+        num_threads = config.get("inference_num_threads")
+        prev_threads = torch.get_num_threads()
+        if num_threads:
+            torch.set_num_threads(num_threads)
+        inference_mode = getattr(torch, "inference_mode", torch.no_grad)
+        try:
+            with inference_mode():
+                yield
+        finally:
+            if num_threads:
+                torch.set_num_threads(prev_threads)
 
     def _toggle_profiling(self, profile=False):
         """Enables/Disables and resets timing profiles."""
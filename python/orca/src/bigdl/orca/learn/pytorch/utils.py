@@ -278,3 +278,193 @@ def get_filesystem(filepath):
     from fsspec.core import url_to_fs
     fs, _ = url_to_fs(str(filepath))
     return fs
+
+
+def prefetch_iterator(iterator, num_prefetch):
+    """Runs iterator in a background thread, keeping at most num_prefetch items ahead."""
+    import queue
+    import threading
+    items = queue.Queue(maxsize=num_prefetch)
+    stop = threading.Event()
+    end = object()
+
+    def produce():
+        try:
+            for item in iterator:
+                while not stop.is_set():
+                    try:
+                        items.put((item, None), timeout=0.1)
+                        break
+                    except queue.Full:
+                        continue
+                if stop.is_set():
+                    return
+        except Exception as e:
+            items.put((end, e))
+            return
+        items.put((end, None))
+
+    thread = threading.Thread(target=produce, daemon=True)
+    thread.start()
+    try:
+        while True:
+            item, error = items.get()
+            if error is not None:
+                raise error
+            if item is end:
+                return
+            yield item
+    finally:
+        stop.set()
+
+
+def _slice_to_tensor(data, index):
+    if isinstance(data, (list, tuple)):
+        return [_slice_to_tensor(d, index) for d in data]
+    return torch.from_numpy(data[index])
+
+
+class NDArrayBatchDataset(torch.utils.data.IterableDataset):
+    """An IterableDataset that generates whole batches from in-memory ndarrays.
+
+    Each batch is gathered from the arrays with one slice (or one fancy index when
+    shuffle is True) per array and wrapped with torch.from_numpy, instead of indexing
+    and collating one sample at a time. Use it with ``DataLoader(batch_size=None)``.
+
+    Args:
+        x: An ndarray, or a list or tuple of ndarrays of features.
+        y: An ndarray, or a list or tuple of ndarrays of labels.
+        batch_size (int): The number of samples in each batch.
+        shuffle (bool): Whether to reshuffle the samples on every iteration.
+        drop_last (bool): Whether to drop the last incomplete batch.
+        prefetch (int): The number of batches to prepare ahead in a background
+            thread. 0 to prepare batches in the consuming thread.
+    """
+
+    def __init__(self, x, y, batch_size, shuffle=False, drop_last=False, prefetch=0):
+        from bigdl.orca.data.utils import get_size
+        self.x = x
+        self.y = y
+        self.size = get_size(x)
+        self.batch_size = batch_size
+        self.shuffle = shuffle
+        self.drop_last = drop_last
+        self.prefetch = prefetch
+        self._epoch = 0
+
+    def __len__(self):
+        if self.drop_last:
+            return self.size // self.batch_size
+        return (self.size + self.batch_size - 1) // self.batch_size
+
+    def _indices(self):
+        worker_info = torch.utils.data.get_worker_info()
+        if self.shuffle:
+            if worker_info is None:
+                permutation = torch.randperm(self.size).numpy()
+            else:
+                # All the workers must draw the same permutation so that their batches
+                # together cover each sample once. DataLoader draws a base seed in the main
+                # process for each epoch and seeds worker i with base seed + i.
+                generator = torch.Generator()
+                generator.manual_seed(worker_info.seed - worker_info.id + self._epoch)
+                permutation = torch.randperm(self.size, generator=generator).numpy()
+            # persistent workers keep their seed, reshuffle them by the epoch
+            self._epoch += 1
+        indices = []
+        for start in range(0, len(self) * self.batch_size, self.batch_size):
+            end = min(start + self.batch_size, self.size)
+            indices.append(permutation[start:end] if self.shuffle else slice(start, end))
+        if worker_info is not None:
+            indices = indices[worker_info.id::worker_info.num_workers]
+        return indices
+
+    def _get_batch(self, index):
+        return [_slice_to_tensor(self.x, index), _slice_to_tensor(self.y, index)]
+
+    def __iter__(self):
+        batches = map(self._get_batch, self._indices())
+        if self.prefetch > 0:
+            return prefetch_iterator(batches, self.prefetch)
+        return batches
+
+
+def ndarrays_to_data_loader(x, y, config, batch_size, shuffle=True):
+    """Creates a DataLoader over in-memory ndarrays for the estimators.
+
+    Batches are generated by NDArrayBatchDataset unless a custom sampler,
+    batch_sampler or collate_fn is given in config, which requires per-sample access.
+    config["prefetch_batches"] sets the number of batches prepared in a background thread.
+    """
+    from torch.utils.data import Dataset, DataLoader
+    from bigdl.orca.data.utils import index_data, get_size
+
+    if not any(arg in config for arg in ["sampler", "batch_sampler", "collate_fn"]):
+        dataset = NDArrayBatchDataset(x, y, batch_size,
+                                      shuffle=config.get("shuffle", shuffle),
+                                      drop_last=config.get("drop_last", False),
+                                      prefetch=config.get("prefetch_batches", 0))
+        params = {"batch_size": None}
+        for arg in ["num_workers", "pin_memory", "timeout", "worker_init_fn",
+                    "multiprocessing_context"]:
+            if arg in config:
+                params[arg] = config[arg]
+        return DataLoader(dataset, **params)
+
+    class NDArrayDataset(Dataset):
+        def __init__(self, x, y):
+            self.x = x  # features
+            self.y = y  # labels
+
+        def __len__(self):
+            return get_size(self.y)
+
+        def __getitem__(self, i):
+            return index_data(self.x, i), index_data(self.y, i)
+
+    params = {"batch_size": batch_size, "shuffle": shuffle}
+    for arg in ["shuffle", "sampler", "batch_sampler", "num_workers", "collate_fn",
+                "pin_memory", "drop_last", "timeout", "worker_init_fn",
+                "multiprocessing_context"]:
+        if arg in config:
+            params[arg] = config[arg]
+    return DataLoader(NDArrayDataset(x, y), **params)
+
+
+def coalesce_batches(shards, batch_size):
+    """Generates batches of batch_size samples across the features of consecutive shards.
+
+    Small shards are merged so that every batch but the last one is full. Batches within
+    a single shard are views of the shard arrays; only batches spanning two or more shards
+    are concatenated.
+
+    Args:
+        shards: An iterable of shards, each a list of ndarrays of features.
+        batch_size (int): The number of samples in each batch.
+
+    Returns:
+        A generator of lists of tensors.
+    """
+    pending = []
+    pending_size = 0
+    for features in shards:
+        size = len(features[0])
+        start = 0
+        while start < size:
+            end = min(size, start + batch_size - pending_size)
+            pending.append([feature[start:end] for feature in features])
+            pending_size += end - start
+            start = end
+            if pending_size == batch_size:
+                yield _merge_pieces(pending)
+                pending = []
+                pending_size = 0
+    if pending:
+        yield _merge_pieces(pending)
+
+
+def _merge_pieces(pieces):
+    if len(pieces) == 1:
+        return [torch.from_numpy(piece) for piece in pieces[0]]
+    return [torch.from_numpy(np.concatenate([piece[i] for piece in pieces]))
+            for i in range(len(pieces[0]))]
@@ -275,10 +275,49 @@ def process_xshards_of_pandas_dataframe(data, feature_cols, label_cols=None, val
         return data
 
 
+def _is_arrow_numeric_col(data_type):
+    import pyspark.sql.types as df_types
+    numeric_types = (df_types.ByteType, df_types.ShortType, df_types.IntegerType,
+                     df_types.LongType, df_types.FloatType, df_types.DoubleType)
+    if isinstance(data_type, df_types.ArrayType):
+        return isinstance(data_type.elementType, numeric_types)
+    return isinstance(data_type, numeric_types)
+
+
+def pandas_to_arrays_dict(df, feature_cols, label_cols=None):
+    # Same output as arrays2dict, built from the columns of an Arrow-converted pandas DataFrame.
+    def to_arrays(cols):
+        arrays = []
+        for col in cols:
+            values = df[col].values
+            if values.dtype == object:  # array column
+                arrays.append(np.stack(values).astype(np.float32))
+            else:
+                arrays.append(values)
+        if len(arrays) == 1:
+            return arrays[0]
+        return tuple(arrays)
+
+    result = {"x": to_arrays(feature_cols)}
+    if label_cols is not None:
+        result["y"] = to_arrays(label_cols)
+    return result
+
+
 def _dataframe_to_xshards(data, feature_cols, label_cols=None, accept_str_col=False):
     from bigdl.orca import OrcaContext
+    from bigdl.orca.data.utils import spark_df_to_arrow_batch_rdd, arrow_batches_to_pandas
     schema = data.schema
     shard_size = OrcaContext._shard_size
+    cols = list(dict.fromkeys(feature_cols + (label_cols if label_cols else [])))
+    if all(_is_arrow_numeric_col(schema[col].dataType) for col in cols):
+        arrow_rdd = spark_df_to_arrow_batch_rdd(data.select(*cols))
+        if arrow_rdd is not None:
+            batch_rdd, arrow_schema = arrow_rdd
+            shard_rdd = batch_rdd.mapPartitions(
+                lambda iter: arrow_batches_to_pandas(iter, arrow_schema, shard_size)) \
+                .map(lambda df: pandas_to_arrays_dict(df, feature_cols, label_cols))
+            return SparkXShards(shard_rdd)
     numpy_rdd = data.rdd.map(lambda row: convert_row_to_numpy(row,
                                                               schema,
                                                               feature_cols,
@@ -121,6 +121,76 @@ class TestSparkXShards(TestCase):
         partitions = partitioned_shard.rdd.glom().collect()
         assert len(partitions) == 3
 
+    def test_partition_by_multiple_columns(self):
+        file_path = os.path.join(self.resource_path, "orca/data/csv")
+        data_shard = bigdl.orca.data.pandas.read_csv(file_path)
+        total = len(data_shard)
+        partitioned_shard = data_shard.partition_by(cols=["location", "ID"], num_partitions=4)
+        partitions = partitioned_shard.rdd.collect()
+        assert sum(len(df) for df in partitions) == total
+        keys = [set(zip(df["location"], df["ID"])) for df in partitions]
+        for i in range(len(keys)):
+            for j in range(i + 1, len(keys)):
+                assert not keys[i] & keys[j], "the same key should be in one partition"
+
+    def test_partition_by_mixed_dtypes(self):
+        import numpy as np
+        import pandas as pd
+        from bigdl.orca.data.utils import hash_partition_ids
+        ids = [1, 2, 3, 4, 5, 6, 7, 8]
+        names = ["a", "b", "c", "d", "e", "f", "g", "h"]
+        df1 = pd.DataFrame({"id": np.array(ids, dtype=np.int32), "name": names})
+        df2 = pd.DataFrame({"id": np.array(ids, dtype=np.int64),
+                            "name": pd.Categorical(names)})
+        df3 = pd.DataFrame({"id": np.array(ids + [None], dtype=object),
+                            "name": pd.array(names + [None], dtype="string")})
+        expected = hash_partition_ids(df1, ["id", "name"], 4)
+        assert list(hash_partition_ids(df2, ["id", "name"], 4)) == list(expected)
+        assert list(hash_partition_ids(df3, ["id", "name"], 4)[:8]) == list(expected)
+
+        sc = init_nncontext()
+        shards = SparkXShards(sc.parallelize([df1, df2], 2))
+        partitions = shards.partition_by(cols=["id", "name"], num_partitions=4).rdd.collect()
+        assert sum(len(df) for df in partitions) == 16
+        keys = [set(zip(df["id"].astype(int), df["name"].astype(str))) for df in partitions]
+        for i in range(len(keys)):
+            for j in range(i + 1, len(keys)):
+                assert not keys[i] & keys[j], "the same key should be in one partition"
+
+    def test_partition_by_range(self):
+        file_path = os.path.join(self.resource_path, "orca/data/csv")
+        data_shard = bigdl.orca.data.pandas.read_csv(file_path)
+        total = len(data_shard)
+        partitioned_shard = data_shard.partition_by(cols="ID", num_partitions=3, mode="range")
+        partitions = partitioned_shard.rdd.glom().collect()
+        assert len(partitions) == 3
+        dfs = [p[0] for p in partitions if p]
+        assert sum(len(df) for df in dfs) == total
+        for left, right in zip(dfs[:-1], dfs[1:]):
+            assert left["ID"].max() <= right["ID"].min(), "partitions should be ordered by ID"
+
+    def test_persist_local_disk(self):
+        import tempfile
+        file_path = os.path.join(self.resource_path, "orca/data/csv")
+        data_shard = bigdl.orca.data.pandas.read_csv(file_path)
+        expected = data_shard.collect()
+        with tempfile.TemporaryDirectory() as cache_dir:
+            OrcaContext.shard_cache_dir = cache_dir
+            try:
+                data_shard.persist("LOCAL_DISK")
+                assert data_shard.is_cached(), "data_shard should be cached"
+                assert os.listdir(cache_dir), "shards should be written to the cache dir"
+                for df, expected_df in zip(data_shard.collect(), expected):
+                    assert df.equals(expected_df)
+                transformed = data_shard.transform_shard(lambda df: df["ID"].values * 2)
+                for arr, expected_df in zip(transformed.collect(), expected):
+                    assert np.array_equal(arr, expected_df["ID"].values * 2)
+                data_shard.uncache()
+                assert not data_shard.is_cached(), "data_shard should be uncached"
+                assert not os.listdir(cache_dir), "the cache dir should be removed by uncache"
+            finally:
+                OrcaContext.shard_cache_dir = None
+
     def test_unique(self):
         file_path = os.path.join(self.resource_path, "orca/data/csv")
         data_shard = bigdl.orca.data.pandas.read_csv(file_path)
@@ -214,6 +214,100 @@ class TestPyTorchEstimator(TestCase):
         val_stats = estimator.evaluate(val_xshards, batch_size=128)
         print(val_stats)
 
+    def test_ndarray_batch_data_loader(self):
+        from bigdl.orca.learn.pytorch.utils import ndarrays_to_data_loader
+        x = np.arange(100, dtype=np.float32).reshape(50, 2)
+        y = np.arange(50, dtype=np.float32)
+        for config in [{"shuffle": False}, {"shuffle": True, "prefetch_batches": 2}]:
+            loader = ndarrays_to_data_loader(x, y, config, batch_size=16)
+            batches = list(loader)
+            assert len(batches) == len(loader) == 4
+            assert [len(batch[1]) for batch in batches] == [16, 16, 16, 2]
+            features = torch.cat([batch[0] for batch in batches]).numpy()
+            labels = torch.cat([batch[1] for batch in batches]).numpy()
+            assert np.array_equal(features[:, 0], labels * 2)
+            assert sorted(labels.tolist()) == y.tolist()
+
+    def test_ndarray_batch_data_loader_shuffle_workers(self):
+        from bigdl.orca.learn.pytorch.utils import ndarrays_to_data_loader
+        x = np.arange(100, dtype=np.float32).reshape(50, 2)
+        y = np.arange(50, dtype=np.float32)
+        config = {"shuffle": True, "num_workers": 2}
+        loader = ndarrays_to_data_loader(x, y, config, batch_size=8)
+        epochs = []
+        for _ in range(2):
+            labels = torch.cat([batch[1] for batch in loader]).numpy()
+            assert sorted(labels.tolist()) == y.tolist(), \
+                "each sample should appear exactly once per epoch"
+            epochs.append(labels.tolist())
+        assert epochs[0] != epochs[1], "the samples should be reshuffled in each epoch"
+
+    def test_coalesce_batches(self):
+        from bigdl.orca.learn.pytorch.utils import coalesce_batches
+        shards = [[np.arange(i * 10, i * 10 + 5), np.ones(5)] for i in range(7)]
+        batches = list(coalesce_batches(shards, batch_size=8))
+        assert [len(batch[0]) for batch in batches] == [8, 8, 8, 8, 3]
+        result = torch.cat([batch[0] for batch in batches]).numpy()
+        assert np.array_equal(result, np.concatenate([shard[0] for shard in shards]))
+
+    def test_xshards_predict_coalesce_shards(self):
+        sc = init_nncontext()
+        rdd = sc.range(0, 110).map(lambda x: np.array([x] * 50))
+        shards = rdd.mapPartitions(lambda iter: chunks(iter, 3)).map(lambda x: {"x": np.stack(x)})
+        shards = SparkXShards(shards)
+
+        estimator = get_estimator(workers_per_node=2,
+                                  model_fn=lambda config: IdentityNet(),
+                                  model_dir=self.model_dir)
+        estimator.worker_init_params["config"]["inference_num_threads"] = 1
+        result_shards = estimator.predict(shards, batch_size=16)
+        for shard in result_shards.collect():
+            assert np.array_equal(shard["prediction"], shard["x"])
+
+    def test_xshards_predict_collate_fn(self):
+        sc = init_nncontext()
+        rdd = sc.range(0, 110).map(lambda x: np.array([x] * 50, dtype=np.float32))
+        shards = rdd.mapPartitions(lambda iter: chunks(iter, 3)).map(lambda x: {"x": np.stack(x)})
+        shards = SparkXShards(shards)
+
+        def double_collate_fn(samples):
+            return [torch.stack([sample[0] for sample in samples]) * 2]
+
+        estimator = get_estimator(workers_per_node=2,
+                                  model_fn=lambda config: IdentityNet(),
+                                  model_dir=self.model_dir)
+        estimator.worker_init_params["config"]["collate_fn"] = double_collate_fn
+        result_shards = estimator.predict(shards, batch_size=16)
+        for shard in result_shards.collect():
+            assert np.array_equal(shard["prediction"], shard["x"] * 2)
+
+    def test_state_sync(self):
+        import tempfile
+        import shutil
+        from bigdl.orca.learn.pytorch import state_sync
+        model = nn.Sequential(nn.Embedding(100, 8), nn.Linear(8, 1))
+        base = {"epoch": 1, "models": [model.state_dict()]}
+        base = state_sync.load_state(state_sync.dump_state(base, compression="zlib"))
+        new = {"epoch": 2, "models": [{k: v.clone() for k, v in base["models"][0].items()}]}
+        new["models"][0]["0.weight"][[3, 7]] += 1
+        new["models"][0]["1.bias"] += 1
+        delta = state_sync.state_delta(new, base, compression="zlib")
+        assert len(delta) < len(state_sync.dump_state(new))
+        result = state_sync.apply_state_delta(base, delta)
+        assert result["epoch"] == 2
+        for k, v in new["models"][0].items():
+            assert torch.equal(result["models"][0][k], v)
+
+        state_dir = tempfile.mkdtemp()
+        try:
+            value = ("v1", state_sync.dump_state(new))
+            for _ in range(2):
+                result = state_sync.load_shared_state(value, state_dir=state_dir)
+                for k, v in new["models"][0].items():
+                    assert torch.equal(result["models"][0][k], v)
+        finally:
+            shutil.rmtree(state_dir)
+
     def test_dataframe_train_eval(self):
 
         sc = init_nncontext()
@@ -213,6 +213,38 @@ class TestUtil(TestCase):
         assert num_shards == df.rdd.count()
         OrcaContext._shard_size = None
 
+    def test_dataframe_to_xshards_scalar_cols(self):
+        from pyspark.sql.types import StructType, StructField, FloatType, IntegerType
+        from pyspark.sql import SparkSession
+        spark = SparkSession(self.sc)
+        schema = StructType([StructField("f1", FloatType()), StructField("f2", FloatType()),
+                             StructField("label", IntegerType())])
+        df = spark.createDataFrame([(float(i), float(i * 2), i % 2) for i in range(100)],
+                                   schema)
+        shards = _dataframe_to_xshards(df, feature_cols=["f1", "f2"], label_cols=["label"])
+        data = shards.collect()
+        x1 = np.concatenate([d["x"][0] for d in data])
+        x2 = np.concatenate([d["x"][1] for d in data])
+        y = np.concatenate([d["y"] for d in data])
+        assert x1.dtype == np.float32 and y.dtype == np.int32
+        assert np.allclose(x1 * 2, x2)
+        assert np.array_equal(x1.astype(np.int32) % 2, y)
+
+    def test_arrow_batches_to_pandas(self):
+        import pyarrow as pa
+        from bigdl.orca.data.utils import arrow_batches_to_pandas
+        schema = pa.schema([("a", pa.int32()), ("b", pa.float32())])
+        serialized = []
+        for i in range(3):
+            batch = pa.RecordBatch.from_arrays(
+                [pa.array(np.arange(10, dtype=np.int32) + i * 10),
+                 pa.array(np.ones(10, dtype=np.float32))], schema=schema)
+            serialized.append(batch.serialize().to_pybytes())
+        dfs = list(arrow_batches_to_pandas(iter(serialized), schema, batch_size=12))
+        assert [len(df) for df in dfs] == [12, 12, 6]
+        assert dfs[0]["a"].dtype == np.int32 and dfs[0]["b"].dtype == np.float32
+        assert np.array_equal(np.concatenate([df["a"].values for df in dfs]), np.arange(30))
+
 
 if __name__ == "__main__":
     pytest.main([__file__])
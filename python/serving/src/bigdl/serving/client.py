@@ -14,30 +14,98 @@
 # limitations under the License.
 #
 
+import asyncio
+import logging
 import redis
+import threading
 import time
+from concurrent.futures import Future, ThreadPoolExecutor, TimeoutError
 from bigdl.serving.schema import *
 import httpx
 import json
+import struct
 import uuid
 
 RESULT_PREFIX = "cluster-serving_"
+# the serving job notifies a client of its results on the channel of NOTIFY_PREFIX, the job
+# name and the client id, i.e. the prefix of the uri before "_", with the uri as the message
+NOTIFY_PREFIX = "cluster-serving-notify_"
+# the maximum delay in seconds before subscribing the results again after a failure
+MAX_SUBSCRIBE_BACKOFF = 60
+
+logger = logging.getLogger(__name__)
+
+
+# the content type of the binary response of the http frontend, which is a sequence of the
+# results of the instances, each of which is a 4-byte big-endian length and the result bytes
+BINARY_CONTENT_TYPE = "application/octet-stream"
+# ask the http frontend for one json prediction of each instance, which carries the instance
+# id and all the fields of its result
+HTTP_BATCH_PARAMS = {"batch": "true"}
+
+
+def decode_http_value(value):
+    """
+    Decode the value of a result of the http frontend, which is the json of data and shape,
+    the (base64 of) arrow ipc stream, or NaN if the request is invalid.
+    """
+    if value == "NaN" or value == b"NaN":
+        return "NaN"
+    if value[:1] == "{" or value[:1] == b"{":
+        res_dict = json.loads(value if isinstance(value, str) else bytes(value))
+        return np.asarray(res_dict['data'], dtype=np.float32).reshape(res_dict['shape'])
+    return decode_result(value)
+
+
+def http_json_to_ndarrays(json_str):
+    """
+    Decode the json response of the http frontend to a list of the results of the instances
+    of the request. Each prediction is the json of the result hash of an instance if the
+    request asks for batch=true, or the json of the value of a result otherwise.
+    """
+    results = []
+    for prediction in json.loads(json_str)["predictions"]:
+        prediction = json.loads(prediction)
+        results.append(decode_http_value(
+            prediction['value'] if isinstance(prediction, dict) else prediction))
+    return results
+
+
+def http_binary_to_ndarrays(content):
+    """
+    Decode the binary response of the http frontend to a list of the results of the
+    instances of the request. The arrow results are read from the response buffer without
+    copies.
+    """
+    view = memoryview(content)
+    results = []
+    pos = 0
+    while pos < len(view):
+        size, = struct.unpack_from(">I", view, pos)
+        pos += 4
+        results.append(decode_http_value(view[pos:pos + size]))
+        pos += size
+    return results
 
 
 def http_json_to_ndarray(json_str):
-    # currently there is no http user use batch predict, so batch is not implemented here
-    # to add batch predict, replace 0 index to [0, batch_size)
-    res_dict = json.loads(json.loads(json.loads(json_str)["predictions"][0])['value'])
-    data, shape = res_dict['data'], res_dict['shape']
-    array = np.array(data)
-    array = array.reshape(shape)
-    return array
+    """
+    :return: the result, or a list of results if the request has multiple instances.
+    """
+    results = http_json_to_ndarrays(json_str)
+    return results[0] if len(results) == 1 else results
 
 
-def http_response_to_ndarray(response):
+def http_response_to_ndarrays(response):
+    """
+    Decode the json or binary response of the http frontend to a list of results.
+
+    :return: the list of results, or None if the server returns an error.
+    """
     if response.status_code == 200:
-        response_str = response.text
-        return http_json_to_ndarray(response_str)
+        if response.headers.get("content-type", "").startswith(BINARY_CONTENT_TYPE):
+            return http_binary_to_ndarrays(response.content)
+        return http_json_to_ndarrays(response.text)
     elif response.status_code == 400:
         print("Invalid input format, valid example:")
         print("""{
@@ -53,11 +121,109 @@ def http_response_to_ndarray(response):
     else:
         print("Error when calling Cluster Serving Http server, error code:", response.status_code)
     print("WARNING: Server returns invalid response, so you will get []")
-    return "[]"
+    return None
+
+
+def http_response_to_ndarray(response):
+    results = http_response_to_ndarrays(response)
+    if results is None:
+        return "[]"
+    return results[0] if len(results) == 1 else results
+
+
+def to_instances(request_data):
+    """
+    Convert the request of predict to a list of json serializable instances of the http
+    frontend, where the request is a json string with "instances" or a dict.
+    """
+    if isinstance(request_data, (str, bytes)):
+        return json.loads(request_data)['instances']
+    return [{key: value.tolist() if isinstance(value, np.ndarray) else value
+             for key, value in request_data.items()}]
+
+
+def http_batches(request_list, batch_size):
+    """
+    Split the instances of the requests into batches of batch_size instances, each of which
+    is sent in one http request.
+
+    :return: the list of batches and the number of instances of each request.
+    """
+    instance_lists = [to_instances(request_data) for request_data in request_list]
+    batches = list(chunks([i for instances in instance_lists for i in instances], batch_size))
+    return batches, [len(instances) for instances in instance_lists]
+
+
+def group_results(batches, batch_results, sizes):
+    """
+    Group the results of the batches of http_batches by the requests. A request of a single
+    instance gets the result, and others get a list of results.
+    """
+    results = []
+    for batch, result in zip(batches, batch_results):
+        # the server returns an error for the batch
+        results.extend(result if result is not None else ["[]"] * len(batch))
+    grouped = []
+    pos = 0
+    for size in sizes:
+        grouped.append(results[pos] if size == 1 else results[pos:pos + size])
+        pos += size
+    return grouped
+
+
+def to_input_dict(request_data):
+    """
+    Convert the request of predict to a dict of the input name to the input, where the
+    request is a json string with "instances", a dict, or the data of a single input.
+    """
+    def json_to_ndarray_dict(json_str):
+        ndarray_dict = {}
+        data_dict = json.loads(json_str)['instances'][0]
+        for key in data_dict.keys():
+            ndarray_dict[key] = np.array(data_dict[key])
+        return ndarray_dict
+
+    try:
+        json.loads(request_data)
+        input_dict = json_to_ndarray_dict(request_data)
+    except Exception as e:
+        if isinstance(request_data, dict):
+            input_dict = request_data
+        else:
+            input_dict = {'t': request_data}
+    return input_dict
+
+
+def is_empty_result(result):
+    # the result is "[]" if it is not ready, which can not be compared with an ndarray
+    return isinstance(result, str) and result == "[]"
+
+
+def chunks(iterable, size):
+    chunk = []
+    for item in iterable:
+        chunk.append(item)
+        if len(chunk) == size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def subscribe_failed(output_queue, error):
+    """
+    Back off the subscription of output_queue after a failure, whose results are polled
+    until it is retried after an exponentially growing delay.
+    """
+    output_queue._subscribe_backoff = min(max(output_queue._subscribe_backoff * 2, 1),
+                                          MAX_SUBSCRIBE_BACKOFF)
+    output_queue._subscribe_retry_at = time.time() + output_queue._subscribe_backoff
+    logger.warning("Failed to subscribe the results, will poll them instead and retry in "
+                   "%s seconds. Error msg is %s", output_queue._subscribe_backoff, error)
 
 
 def perdict(frontend_url, request_str):
-    httpx.post(frontend_url + "/predict", data=request_str)
+    return http_response_to_ndarray(httpx.post(frontend_url + "/predict", data=request_str))
 
 
 class API:
@@ -80,16 +246,35 @@ class API:
 
 
 class InputQueue(API):
-    def __init__(self, frontend_url=None, **kwargs):
+    def __init__(self, frontend_url=None, serde="b64", max_connections=10, max_keepalive=10,
+                 binary_response=False, **kwargs):
+        """
+        :param frontend_url: the url of the http frontend, the requests are sent to redis
+               directly if it is None.
+        :param serde: the format of the requests written to redis, "b64" for the base64
+               string of arrow ipc stream, or "arrow" for the raw bytes of arrow ipc stream,
+               which is a quarter smaller and saves the encoding. "arrow" requires a serving
+               job which supports it.
+        :param max_connections: the maximum number of connections to the http frontend.
+        :param max_keepalive: the maximum number of idle connections to the http frontend
+               kept alive for later requests.
+        :param binary_response: whether to ask the http frontend for the binary response,
+               which carries the arrow results instead of their json. The json response is
+               still decoded if the frontend does not support it.
+        """
         super().__init__(**kwargs)
+        if serde not in ("b64", "arrow"):
+            raise ValueError("serde should be b64 or arrow, but got " + str(serde))
+        self.serde = serde
         self.frontend_url = frontend_url
+        self.binary_response = binary_response
         if self.frontend_url:
             # frontend_url is provided, using frontend
+            self.cli = httpx.Client(limits=httpx.Limits(
+                max_connections=max_connections, max_keepalive_connections=max_keepalive))
             try:
-                res = httpx.get(frontend_url)
+                res = self.cli.get(frontend_url)
                 if res.status_code == 200:
-                    httpx.PoolLimits(max_keepalive=1, max_connections=1)
-                    self.cli = httpx.Client()
                     print("Attempt connecting to Cluster Serving frontend success")
                 else:
                     raise ConnectionError()
@@ -101,71 +286,106 @@ class InputQueue(API):
         # TODO: these params can be read from config in future
         self.input_threshold = 0.6
         self.interval_if_error = 1
+        # the used memory of redis is checked at most once per interval in seconds
+        self.memory_check_interval = 1
+        self._memory_checked_at = 0
+        self._memory_full = False
+        # the number of records written to redis in one round trip by enqueue_many, or the
+        # number of instances in one http request
+        self.batch_size = 256
+        self._executor = None
+
+    def _http_headers(self):
+        headers = {"Content-Type": "application/json"}
+        if self.binary_response:
+            headers["Accept"] = BINARY_CONTENT_TYPE + ", */*;q=0.1"
+        return headers
+
+    def _http_predict(self, instances, timeout):
+        body = json.dumps({"instances": instances})
+        response = self.cli.post(self.frontend_url + "/predict", content=body,
+                                 params=HTTP_BATCH_PARAMS, headers=self._http_headers(),
+                                 timeout=timeout)
+        return http_response_to_ndarrays(response)
 
     def predict(self, request_data, timeout=5):
         """
-        :param request_data:
-        :param time_sleep:
-        :return:
+        :param request_data: a json string with "instances", a dict of the input name to the
+               input, or the data of a single input if the requests are sent to redis.
+        :param timeout: the timeout in seconds to wait for the result.
+        :return: the result, or "[]" if the result is not ready before timeout.
         """
-        def json_to_ndarray_dict(json_str):
-            ndarray_dict = {}
-            data_dict = json.loads(json_str)['instances'][0]
-            for key in data_dict.keys():
-                ndarray_dict[key] = np.array(data_dict[key])
-            return ndarray_dict
-
         if self.frontend_url:
-            response = self.cli.post(self.frontend_url + "/predict", data=request_data)
-            predictions = json.loads(response.text)['predictions']
-            processed = predictions[0].lstrip("{value=").rstrip("}")
-        else:
-            try:
-                json.loads(request_data)
-                input_dict = json_to_ndarray_dict(request_data)
-            except Exception as e:
-                if isinstance(request_data, dict):
-                    input_dict = request_data
-                else:
-                    input_dict = {'t': request_data}
-
-            uri = str(uuid.uuid4())
-            self.enqueue(uri, **input_dict)
-            processed = "[]"
-            time_sleep = 0.001
-            while time_sleep < timeout:
-                processed = self.output_queue.query_and_delete(uri)
-                if processed != "[]":
-                    break
-                time.sleep(time_sleep)
-                time_sleep += 0.001
-        return processed
+            return self.predict_batch([request_data], timeout)[0]
+        input_dict = to_input_dict(request_data)
+        self._subscribe()
+        uri = self.output_queue.new_uri()
+        # register the future before enqueue, so that the notification is not missed
+        future = self.output_queue.query_future(uri)
+        self.enqueue(uri, **input_dict)
+        return self.output_queue.wait(uri, future, timeout)
+
+    def predict_batch(self, request_list, timeout=5):
+        """
+        Predict a list of requests, which are written to redis in pipelined batches and
+        wait for their results together. With the http frontend, the instances of the
+        requests are sent in requests of batch_size instances on the pooled connections.
+
+        :param request_list: a list of requests, each of which is in any format of predict.
+        :param timeout: the timeout in seconds to wait for all the results.
+        :return: a list of results in the order of request_list, where a result is "[]"
+                 if it is not ready before timeout.
+        """
+        if self.frontend_url:
+            batches, sizes = http_batches(request_list, self.batch_size)
+            batch_results = [self._http_predict(batch, timeout) for batch in batches]
+            return group_results(batches, batch_results, sizes)
+        input_dicts = [to_input_dict(request_data) for request_data in request_list]
+        self._subscribe()
+        uris = [self.output_queue.new_uri() for _ in input_dicts]
+        futures = [self.output_queue.query_future(uri) for uri in uris]
+        self.enqueue_many(zip(uris, input_dicts))
+        deadline = time.time() + timeout
+        return [self.output_queue.wait(uri, future, deadline - time.time())
+                for uri, future in zip(uris, futures)]
+
+    def _subscribe(self):
+        if time.time() < self.output_queue._subscribe_retry_at:
+            return
+        try:
+            self.output_queue.subscribe()
+        except Exception as e:
+            subscribe_failed(self.output_queue, e)
 
     def enqueue(self, uri, **data):
-        b64str = self.data_to_b64(**data)
-        d = {"uri": uri, "data": b64str}
-        self.__enqueue_data(d)
+        self.__enqueue_data(self._to_record(uri, data))
+
+    def _to_record(self, uri, data):
+        if self.serde == "arrow":
+            return {"uri": uri, "data": encode_arrow(**data), "serde": "arrow"}
+        return {"uri": uri, "data": self.data_to_b64(**data)}
+
+    def enqueue_many(self, requests):
+        """
+        Enqueue requests in pipelined batches of batch_size records per round trip, where
+        the serialization of a batch overlaps the writing of the previous one.
+
+        :param requests: an iterable of (uri, data), where data is a dict of the input name
+               to the input as the kwargs of enqueue.
+        """
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(1)
+        pending = None
+        for chunk in chunks(requests, self.batch_size):
+            records = [self._to_record(uri, data) for uri, data in chunk]
+            if pending is not None:
+                pending.result()
+            pending = self._executor.submit(self.__enqueue_batch, records)
+        if pending is not None:
+            pending.result()
 
     def data_to_b64(self, **data):
-        sink = pa.BufferOutputStream()
-        field_list = []
-        data_list = []
-        for key, value in data.items():
-            field, data = get_field_and_data(key, value)
-            field_list.append(field)
-            data_list.append(data)
-
-        schema = pa.schema(field_list)
-        batch = pa.RecordBatch.from_arrays(
-            data_list, schema)
-
-        writer = pa.RecordBatchStreamWriter(sink, batch.schema)
-        writer.write_batch(batch)
-        writer.close()
-        buf = sink.getvalue()
-        b = buf.to_pybytes()
-        b64str = self.base64_encode_image(b)
-        return b64str
+        return encode_b64(**data)
 
     def enqueue_tensor(self, uri, data):
         """
@@ -208,13 +428,26 @@ class InputQueue(API):
         self.__enqueue_data(d)
 
     def __enqueue_data(self, data):
-        inf = self.db.info()
+        self.__enqueue_batch([data])
+
+    def __is_memory_full(self):
+        # INFO is a round trip, so the memory is sampled at most once per interval
+        now = time.time()
+        if now - self._memory_checked_at >= self.memory_check_interval:
+            inf = self.db.info("memory")
+            self._memory_full = inf['maxmemory'] != 0 and \
+                inf['used_memory'] >= inf['maxmemory'] * self.input_threshold
+            self._memory_checked_at = now
+        return self._memory_full
+
+    def __enqueue_batch(self, records):
         try:
-            if inf['used_memory'] >= inf['maxmemory'] * self.input_threshold\
-                    and inf['maxmemory'] != 0:
+            if self.__is_memory_full():
                 raise redis.exceptions.ConnectionError
-            self.db.xadd(self.name, data)
-            print("Write to Redis successful")
+            pipe = self.db.pipeline(transaction=False)
+            for record in records:
+                pipe.xadd(self.name, record)
+            pipe.execute()
         except redis.exceptions.ConnectionError:
             print("Redis queue is full, please wait for inference "
                   "or delete the unprocessed records.")
@@ -234,54 +467,479 @@ class InputQueue(API):
 class OutputQueue(API):
     def __init__(self, **kwargs):
         super().__init__(**kwargs)
+        # the prefix of the uris of this client, whose result notifications are subscribed
+        self.client_id = uuid.uuid4().hex
+        # the interval to check the result in case its notification is lost, e.g. when
+        # the serving job does not publish notifications
+        self.poll_interval = 0.1
+        self._pubsub = None
+        self._listener = None
+        self._subscribe_backoff = 0
+        self._subscribe_retry_at = 0
+        self._futures = {}
+        self._lock = threading.Lock()
+        # the number of keys each SCAN of dequeue goes over
+        self.scan_count = 1000
+        self._scan_cursor = 0
+        # the keys found by SCAN but not returned by dequeue yet
+        self._pending_keys = []
+
+    def _result_key(self, uri):
+        return RESULT_PREFIX + self.name + ':' + uri
+
+    def _result_channel(self):
+        return NOTIFY_PREFIX + self.name + ':' + self.client_id
+
+    def new_uri(self):
+        """
+        Generate a unique uri for a request of this client, whose result is pushed to the
+        future of query_future after subscribe.
+        """
+        return self.client_id + "_" + str(uuid.uuid4())
+
+    def subscribe(self):
+        """
+        Subscribe the results of the uris of new_uri. The serving job publishes the uri
+        to the channel of this client once a result is written, and a background thread
+        completes the future of the uri as soon as it is notified.
+        """
+        if self._listener is not None:
+            return
+        pubsub = self.db.pubsub()
+        pubsub.subscribe(**{self._result_channel(): self._on_notification})
+        # wait until the subscription is active, so that no later notification is missed
+        deadline = time.time() + 5
+        while time.time() < deadline:
+            message = pubsub.get_message(timeout=deadline - time.time())
+            if message is not None and message["type"] == "subscribe":
+                break
+        self._pubsub = pubsub
+        self._listener = pubsub.run_in_thread(sleep_time=1, daemon=True)
+
+    def close(self):
+        if self._listener is not None:
+            self._listener.stop()
+            self._pubsub.close()
+            self._listener = None
+            self._pubsub = None
+
+    def query_future(self, uri):
+        """
+        Get a future of the result of uri, which completes once the result is notified.
+        It should be called before the request of uri is enqueued.
+        """
+        future = Future()
+        with self._lock:
+            self._futures[uri] = future
+        return future
+
+    def _on_notification(self, message):
+        uri = message["data"].decode("utf-8")
+        with self._lock:
+            future = self._futures.pop(uri, None)
+        if future is None:
+            # fetched by wait or not a request of predict
+            return
+        try:
+            result = self.query_and_delete(uri)
+        except Exception as e:
+            future.set_exception(e)
+            return
+        if is_empty_result(result):
+            with self._lock:
+                self._futures[uri] = future
+        else:
+            future.set_result(result)
+
+    def wait(self, uri, future, timeout=5):
+        """
+        Wait for the result of uri for at most timeout seconds.
+
+        :param uri: the uri of the request.
+        :param future: the future of query_future(uri).
+        :param timeout: the timeout in seconds.
+        :return: the result, or "[]" if the result is not ready before timeout.
+        """
+        deadline = time.time() + timeout
+        # poll with increasing intervals if the notifications are not subscribed
+        interval = self.poll_interval if self._listener is not None else 0.001
+        while True:
+            remaining = deadline - time.time()
+            if remaining <= 0:
+                break
+            try:
+                return future.result(timeout=min(interval, remaining))
+            except TimeoutError:
+                pass
+            with self._lock:
+                owned = self._futures.pop(uri, None) is not None
+            if not owned:
+                # the result is being fetched by the notification
+                continue
+            result = self.query_and_delete(uri)
+            if not is_empty_result(result):
+                return result
+            with self._lock:
+                self._futures[uri] = future
+            if self._listener is None:
+                interval += 0.001
+        with self._lock:
+            owned = self._futures.pop(uri, None) is not None
+        if future.done():
+            return future.result()
+        if owned:
+            # the last chance, e.g. for the later requests of predict_batch after timeout
+            return self.query_and_delete(uri)
+        return "[]"
+
+    def dequeue(self, batch_size=None):
+        """
+        Get the results and delete them from redis. The result keys are found by SCAN, which
+        does not block redis like KEYS, and each batch of keys is fetched and deleted in one
+        transaction, so that a result is returned by exactly one of the consumers which
+        dequeue concurrently.
+
+        :param batch_size: the maximum number of results to return. Default to None, which
+               returns all the results. Otherwise the scan continues from where the last call
+               stops, so that repeated calls go over all the results.
+        :return: a dict of uri to result.
+        """
+        if batch_size is None:
+            self._scan_cursor = 0
+        decoded = {}
+        scanned = False
+        while batch_size is None or len(decoded) < batch_size:
+            if not self._pending_keys:
+                if scanned and self._scan_cursor == 0:
+                    # a pass over all the keys is done
+                    break
+                self._scan_cursor, keys = self.db.scan(self._scan_cursor,
+                                                       match=self._result_key("*"),
+                                                       count=self.scan_count)
+                self._pending_keys.extend(keys)
+                scanned = True
+                continue
+            n = len(self._pending_keys) if batch_size is None else \
+                min(len(self._pending_keys), batch_size - len(decoded))
+            keys = self._pending_keys[:n]
+            del self._pending_keys[:n]
+            decoded.update(self._fetch_and_delete(keys))
+        return decoded
 
-    def dequeue(self):
-        res_list = self.db.keys(RESULT_PREFIX + self.name + ':*')
+    def _fetch_and_delete(self, keys):
+        pipe = self.db.pipeline(transaction=True)
+        for key in keys:
+            pipe.hgetall(key)
+            pipe.delete(key)
+        replies = pipe.execute()
         decoded = {}
-        for res in res_list:
-            res_dict = self.db.hgetall(res.decode('utf-8'))
-            res_id = res.decode('utf-8').split(":")[1]
-            res_value = res_dict[b'value'].decode('utf-8')
-            if res_value == "NaN":
+        prefix_len = len(self._result_key(""))
+        for key, res_dict in zip(keys, replies[::2]):
+            if not res_dict:
+                # dequeued by another consumer
+                continue
+            res_id = key.decode('utf-8')[prefix_len:]
+            res_value = res_dict[b'value']
+            if res_value == b"NaN":
                 decoded[res_id] = "NaN"
             else:
-                decoded[res_id] = self.get_ndarray_from_b64(res_value)
-            self.db.delete(res)
+                decoded[res_id] = decode_result(res_value)
         return decoded
 
     def query_and_delete(self, uri):
         return self.query(uri, True)
 
     def query(self, uri, delete=False):
-        res_dict = self.db.hgetall(RESULT_PREFIX + self.name + ':' + uri)
+        if delete:
+            # fetch and delete in one transaction, so that a result written between them
+            # is not deleted unread
+            pipe = self.db.pipeline(transaction=True)
+            pipe.hgetall(self._result_key(uri))
+            pipe.delete(self._result_key(uri))
+            res_dict = pipe.execute()[0]
+        else:
+            res_dict = self.db.hgetall(self._result_key(uri))
 
         if not res_dict or len(res_dict) == 0:
             return "[]"
-        if delete:
-            self.db.delete(RESULT_PREFIX + self.name + ':' + uri)
-        s = res_dict[b'value'].decode('utf-8')
-        if s == "NaN":
-            return s
-        return self.get_ndarray_from_b64(s)
+        s = res_dict[b'value']
+        if s == b"NaN":
+            return "NaN"
+        return decode_result(s)
 
     def get_ndarray_from_b64(self, b64str):
-        b = base64.b64decode(b64str)
-        a = pa.BufferReader(b)
-        c = a.read_buffer()
-        myreader = pa.ipc.open_stream(c)
-        r = [i for i in myreader]
-        assert len(r) > 0
-        if len(r) == 1:
-            return self.get_ndarray_from_record_batch(r[0])
-        else:
-            l = []
-            for ele in r:
-                l.append(self.get_ndarray_from_record_batch(ele))
-            return l
+        return decode_result(b64str)
 
     def get_ndarray_from_record_batch(self, record_batch):
-        data = record_batch[0].to_numpy()
-        shape_list = record_batch[1].to_pylist()
-        shape = [i for i in shape_list if i]
-        ndarray = data.reshape(shape)
-        return ndarray
+        return record_batch_to_ndarray(record_batch)
+
+
+class AsyncInputQueue:
+    """
+    The asyncio version of InputQueue on redis.asyncio of redis-py >= 4.2, or on
+    httpx.AsyncClient if frontend_url is given, which serves many concurrent requests in one
+    event loop without a thread for each of them. The params are the same as InputQueue.
+    """
+    def __init__(self, host=None, port=None, name="serving_stream", batch_size=256,
+                 serde="b64", frontend_url=None, max_connections=10, max_keepalive=10,
+                 binary_response=False):
+        if serde not in ("b64", "arrow"):
+            raise ValueError("serde should be b64 or arrow, but got " + str(serde))
+        self.serde = serde
+        self.name = name
+        self.host = host if host else "localhost"
+        self.port = port if port else "6379"
+        self.frontend_url = frontend_url
+        self.binary_response = binary_response
+        if self.frontend_url:
+            # the batches of predict_batch are sent concurrently on the pooled connections
+            self.cli = httpx.AsyncClient(limits=httpx.Limits(
+                max_connections=max_connections, max_keepalive_connections=max_keepalive))
+        else:
+            import redis.asyncio as aioredis
+            self.db = aioredis.StrictRedis(host=self.host, port=self.port, db=0)
+            self.output_queue = AsyncOutputQueue(host=self.host, port=self.port, name=name)
+
+        self.input_threshold = 0.6
+        self.interval_if_error = 1
+        # the used memory of redis is checked at most once per interval in seconds
+        self.memory_check_interval = 1
+        self._memory_checked_at = 0
+        self._memory_full = False
+        # the number of records written to redis in one round trip
+        self.batch_size = batch_size
+        self._group_created = False
+
+    data_to_b64 = InputQueue.data_to_b64
+    _to_record = InputQueue._to_record
+    _http_headers = InputQueue._http_headers
+
+    async def _http_predict(self, instances, timeout):
+        body = json.dumps({"instances": instances})
+        response = await self.cli.post(self.frontend_url + "/predict", content=body,
+                                       params=HTTP_BATCH_PARAMS, headers=self._http_headers(),
+                                       timeout=timeout)
+        return http_response_to_ndarrays(response)
+
+    async def predict(self, request_data, timeout=5):
+        return (await self.predict_batch([request_data], timeout))[0]
+
+    async def predict_batch(self, request_list, timeout=5):
+        """
+        Predict a list of requests and wait for their results concurrently.
+
+        :param request_list: a list of requests, each of which is in any format of
+               InputQueue.predict.
+        :param timeout: the timeout in seconds to wait for the results.
+        :return: a list of results in the order of request_list, where a result is "[]"
+                 if it is not ready before timeout.
+        """
+        if self.frontend_url:
+            batches, sizes = http_batches(request_list, self.batch_size)
+            batch_results = await asyncio.gather(*[self._http_predict(batch, timeout)
+                                                   for batch in batches])
+            return group_results(batches, batch_results, sizes)
+        input_dicts = [to_input_dict(request_data) for request_data in request_list]
+        if time.time() >= self.output_queue._subscribe_retry_at:
+            try:
+                await self.output_queue.subscribe()
+            except Exception as e:
+                subscribe_failed(self.output_queue, e)
+        uris = [self.output_queue.new_uri() for _ in input_dicts]
+        futures = [self.output_queue.query_future(uri) for uri in uris]
+        await self.enqueue_many(zip(uris, input_dicts))
+        return await asyncio.gather(*[self.output_queue.wait(uri, future, timeout)
+                                      for uri, future in zip(uris, futures)])
+
+    async def enqueue(self, uri, **data):
+        await self.enqueue_many([(uri, data)])
+
+    async def enqueue_many(self, requests):
+        """
+        Enqueue requests in pipelined batches of batch_size records per round trip. Each
+        batch is serialized in a thread while the previous one is being written.
+
+        :param requests: an iterable of (uri, data), where data is a dict of the input name
+               to the input as the kwargs of enqueue.
+        """
+        loop = asyncio.get_event_loop()
+        pending = None
+        for chunk in chunks(requests, self.batch_size):
+            records = await loop.run_in_executor(None, self._serialize, chunk)
+            if pending is not None:
+                await pending
+            pending = asyncio.ensure_future(self._enqueue_batch(records))
+        if pending is not None:
+            await pending
+
+    def _serialize(self, chunk):
+        return [self._to_record(uri, data) for uri, data in chunk]
+
+    async def _is_memory_full(self):
+        now = time.time()
+        if now - self._memory_checked_at >= self.memory_check_interval:
+            self._memory_checked_at = now
+            inf = await self.db.info("memory")
+            self._memory_full = inf['maxmemory'] != 0 and \
+                inf['used_memory'] >= inf['maxmemory'] * self.input_threshold
+        return self._memory_full
+
+    async def _enqueue_batch(self, records):
+        if not self._group_created:
+            try:
+                await self.db.xgroup_create(self.name, "serving")
+            except Exception:
+                # the group exists
+                pass
+            self._group_created = True
+        try:
+            if await self._is_memory_full():
+                raise redis.exceptions.ConnectionError
+            pipe = self.db.pipeline(transaction=False)
+            for record in records:
+                pipe.xadd(self.name, record)
+            await pipe.execute()
+        except redis.exceptions.ConnectionError:
+            print("Redis queue is full, please wait for inference "
+                  "or delete the unprocessed records.")
+            await asyncio.sleep(self.interval_if_error)
+
+        except redis.exceptions.ResponseError as e:
+            print(e, "Please check if Redis version > 5, "
+                     "if yes, memory may be full, try dequeue or delete.")
+            await asyncio.sleep(self.interval_if_error)
+
+    async def close(self):
+        if self.frontend_url:
+            await self.cli.aclose()
+            return
+        await self.output_queue.close()
+        await self.db.close()
+
+
+class AsyncOutputQueue:
+    """
+    The asyncio version of OutputQueue on redis.asyncio of redis-py >= 4.2. After subscribe,
+    the results of the uris of new_uri are pushed to the futures of query_future.
+    """
+    def __init__(self, host=None, port=None, name="serving_stream"):
+        import redis.asyncio as aioredis
+        self.name = name
+        self.host = host if host else "localhost"
+        self.port = port if port else "6379"
+        self.db = aioredis.StrictRedis(host=self.host, port=self.port, db=0)
+        self.client_id = uuid.uuid4().hex
+        self.poll_interval = 0.1
+        self._pubsub = None
+        self._listener = None
+        self._futures = {}
+        self._subscribe_backoff = 0
+        self._subscribe_retry_at = 0
+
+    get_ndarray_from_b64 = OutputQueue.get_ndarray_from_b64
+    get_ndarray_from_record_batch = OutputQueue.get_ndarray_from_record_batch
+    _result_key = OutputQueue._result_key
+    _result_channel = OutputQueue._result_channel
+    new_uri = OutputQueue.new_uri
+
+    async def subscribe(self):
+        if self._listener is not None:
+            return
+        pubsub = self.db.pubsub()
+        await pubsub.subscribe(self._result_channel())
+        # wait until the subscription is active, so that no later notification is missed
+        loop = asyncio.get_event_loop()
+        deadline = loop.time() + 5
+        while loop.time() < deadline:
+            message = await pubsub.get_message(timeout=deadline - loop.time())
+            if message is not None and message["type"] == "subscribe":
+                break
+        self._pubsub = pubsub
+        self._listener = asyncio.ensure_future(self._listen())
+
+    async def _listen(self):
+        while True:
+            message = await self._pubsub.get_message(timeout=1)
+            uris = []
+            # drain the notifications at hand and fetch their results in one round trip
+            while message is not None and len(uris) < 1024:
+                if message["type"] == "message":
+                    uris.append(message["data"].decode("utf-8"))
+                message = await self._pubsub.get_message(timeout=0)
+            if uris:
+                await self._on_notification(uris)
+
+    async def close(self):
+        if self._listener is not None:
+            self._listener.cancel()
+            await self._pubsub.close()
+            self._listener = None
+            self._pubsub = None
+        await self.db.close()
+
+    def query_future(self, uri):
+        future = asyncio.get_event_loop().create_future()
+        self._futures[uri] = future
+        return future
+
+    async def _on_notification(self, uris):
+        owned = [(uri, self._futures.pop(uri)) for uri in uris if uri in self._futures]
+        if not owned:
+            return
+        try:
+            results = await self._query_and_delete_many([uri for uri, _ in owned])
+        except Exception as e:
+            for _, future in owned:
+                future.set_exception(e)
+            return
+        for (uri, future), result in zip(owned, results):
+            if is_empty_result(result):
+                self._futures[uri] = future
+            else:
+                future.set_result(result)
+
+    async def wait(self, uri, future, timeout=5):
+        loop = asyncio.get_event_loop()
+        deadline = loop.time() + timeout
+        interval = self.poll_interval if self._listener is not None else 0.001
+        while True:
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                break
+            try:
+                return await asyncio.wait_for(asyncio.shield(future), min(interval, remaining))
+            except asyncio.TimeoutError:
+                pass
+            if self._futures.pop(uri, None) is None:
+                # the result is being fetched by the notification
+                continue
+            result = await self.query_and_delete(uri)
+            if not is_empty_result(result):
+                return result
+            self._futures[uri] = future
+            if self._listener is None:
+                interval += 0.001
+        self._futures.pop(uri, None)
+        if future.done():
+            return future.result()
+        return "[]"
+
+    async def query_and_delete(self, uri):
+        return (await self._query_and_delete_many([uri]))[0]
+
+    async def _query_and_delete_many(self, uris):
+        # fetch and delete in one transaction, as OutputQueue.query does
+        pipe = self.db.pipeline(transaction=True)
+        for uri in uris:
+            pipe.hgetall(self._result_key(uri))
+            pipe.delete(self._result_key(uri))
+        replies = await pipe.execute()
+        results = []
+        for res_dict in replies[::2]:
+            if not res_dict:
+                results.append("[]")
+            elif res_dict[b'value'] == b"NaN":
+                results.append("NaN")
+            else:
+                results.append(decode_result(res_dict[b'value']))
+        return results
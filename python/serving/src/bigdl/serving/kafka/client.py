@@ -14,9 +14,10 @@
 # limitations under the License.
 #
 from kafka import KafkaProducer, KafkaConsumer
-from kafka.errors import kafka_errors
+import asyncio
 import json
 from bigdl.serving.schema import *
+from bigdl.serving.client import chunks
 
 
 RESULT_PREFIX = "cluster-serving_"
@@ -40,36 +41,33 @@ class InputQueue:
         b64str = self.data_to_b64(**data)
         d = {"key":uri, "value":{"uri":uri, "data":b64str}}        
         self.__enqueue_data(d)
+
+    def enqueue_many(self, requests):
+        """
+        Enqueue requests, which are batched by the producer, and wait until all of them
+        are sent.
+
+        :param requests: an iterable of (uri, data), where data is a dict of the input name
+               to the input as the kwargs of enqueue.
+        """
+        for uri, data in requests:
+            self.enqueue(uri, **data)
+        self.db.flush()
     
     def data_to_b64(self, **data):
-        sink = pa.BufferOutputStream()
-        field_list = []
-        data_list = []
-        for key, value in data.items():
-            field, data = get_field_and_data(key, value)
-            field_list.append(field)
-            data_list.append(data)
-
-        schema = pa.schema(field_list)
-        batch = pa.RecordBatch.from_arrays(
-            data_list, schema)
-
-        writer = pa.RecordBatchStreamWriter(sink, batch.schema)
-        writer.write_batch(batch)
-        writer.close()
-        buf = sink.getvalue()
-        b = buf.to_pybytes()
-        b64str = self.base64_encode_image(b)
-        return b64str
+        return encode_b64(**data)
     
     def __enqueue_data(self, data):
-        # send a message {key:value}
+        # send a message {key:value} without waiting, the failure is reported by the callback
         future = self.db.send(self.topic_name, **data)
-        try:
-            future.get(timeout=10) # check if send successfully
-        except kafka_errors:  # throw kafka_errors if failed
-            traceback.format_exc()
-        print("Write to Kafka successful")
+        future.add_errback(self._on_send_error)
+
+    @staticmethod
+    def _on_send_error(e):
+        print("Failed to write to Kafka, error msg is ", e)
+
+    def flush(self):
+        self.db.flush()
     
     @staticmethod
     def base64_encode_image(img):
@@ -107,26 +105,106 @@ class OutputQueue:
         return decoded
     
     def get_ndarray_from_b64(self, b64str):
-        b = base64.b64decode(b64str)
-        a = pa.BufferReader(b)
-        c = a.read_buffer()
-        myreader = pa.ipc.open_stream(c)
-        r = [i for i in myreader]
-        assert len(r) > 0
-        if len(r) == 1:
-            return self.get_ndarray_from_record_batch(r[0])
-        else:
-            l = []
-            for ele in r:
-                l.append(self.get_ndarray_from_record_batch(ele))
-            return l
+        return decode_result(b64str)
 
     def get_ndarray_from_record_batch(self, record_batch):
-        data = record_batch[0].to_numpy()
-        shape_list = record_batch[1].to_pylist()
-        shape = [i for i in shape_list if i]
-        ndarray = data.reshape(shape)
-        return ndarray
+        return record_batch_to_ndarray(record_batch)
     
     def close(self):
         self.db.close()
+
+
+class AsyncInputQueue:
+    """
+    The asyncio version of InputQueue on aiokafka, which is installed by
+    `pip install bigdl-serving[async]`.
+    """
+    def __init__(self, host=None, port=None, topic_name=None, batch_size=256, **kwargs):
+        from aiokafka import AIOKafkaProducer
+        host = host if host else "localhost"
+        port = port if port else "9092"
+        self.topic_name = topic_name if topic_name else "serving_stream"
+        # the number of records serialized in a thread at a time
+        self.batch_size = batch_size
+        self.db = AIOKafkaProducer(bootstrap_servers=host+":"+port,
+                                   key_serializer=lambda k: json.dumps(k).encode('utf-8'),
+                                   value_serializer=lambda v: json.dumps(v).encode('utf-8'),
+                                   **kwargs)
+        self._started = False
+
+    data_to_b64 = InputQueue.data_to_b64
+
+    async def start(self):
+        if not self._started:
+            await self.db.start()
+            self._started = True
+
+    async def enqueue(self, uri, **data):
+        await self.enqueue_many([(uri, data)])
+
+    async def enqueue_many(self, requests):
+        """
+        Enqueue requests and wait until all of them are sent. Each batch of batch_size
+        requests is serialized in a thread while the previous ones are being sent.
+
+        :param requests: an iterable of (uri, data), where data is a dict of the input name
+               to the input as the kwargs of enqueue.
+        """
+        await self.start()
+        loop = asyncio.get_event_loop()
+        futures = []
+        for chunk in chunks(requests, self.batch_size):
+            records = await loop.run_in_executor(None, self._serialize, chunk)
+            for uri, value in records:
+                futures.append(await self.db.send(self.topic_name, key=uri, value=value))
+        await asyncio.gather(*futures)
+
+    def _serialize(self, chunk):
+        return [(uri, {"uri": uri, "data": self.data_to_b64(**data)}) for uri, data in chunk]
+
+    async def close(self):
+        if self._started:
+            await self.db.stop()
+            self._started = False
+
+
+class AsyncOutputQueue:
+    """
+    The asyncio version of OutputQueue on aiokafka, which is installed by
+    `pip install bigdl-serving[async]`.
+    """
+    def __init__(self, host=None, port=None, group_id='group-1',
+                 auto_offset_reset='earliest', topic_name=None, **kwargs):
+        from aiokafka import AIOKafkaConsumer
+        host = host if host else "localhost"
+        port = port if port else "9092"
+        self.topic_name = topic_name if topic_name else RESULT_PREFIX + "serving_stream"
+        self.db = AIOKafkaConsumer(self.topic_name, bootstrap_servers=host+":"+port,
+                                   group_id=group_id, auto_offset_reset=auto_offset_reset,
+                                   **kwargs)
+        self._started = False
+
+    get_ndarray_from_b64 = OutputQueue.get_ndarray_from_b64
+    get_ndarray_from_record_batch = OutputQueue.get_ndarray_from_record_batch
+
+    async def start(self):
+        if not self._started:
+            await self.db.start()
+            self._started = True
+
+    async def dequeue(self):
+        await self.start()
+        records = await self.db.getmany(timeout_ms=500)
+        await self.db.commit()
+        decoded = {}
+        for tp, messages in records.items():
+            for message in messages:
+                res_id = message.key.decode()
+                res_value = message.value.decode()
+                decoded[res_id] = self.get_ndarray_from_b64(res_value)
+        return decoded
+
+    async def close(self):
+        if self._started:
+            await self.db.stop()
+            self._started = False
@@ -19,6 +19,107 @@ import numpy as np
 import cv2
 import base64
 
+# the first 4 bytes of an arrow ipc stream message, which never appear in a base64 string
+ARROW_STREAM_MAGIC = b"\xff\xff\xff\xff"
+
+TENSOR_TYPE = pa.struct([pa.field("indiceData", pa.list_(pa.int32())),
+                         pa.field("indiceShape", pa.list_(pa.int32())),
+                         pa.field("data", pa.list_(pa.float32())),
+                         pa.field("shape", pa.list_(pa.int32()))])
+
+
+def _list_at(values, row, num_rows=4):
+    # a list array of num_rows rows, whose row-th row is values and the other rows are null,
+    # the null offsets take the next valid offset so that only the row-th row spans values
+    offsets = [None] * (num_rows + 1)
+    offsets[row] = 0
+    offsets[num_rows] = len(values)
+    return pa.ListArray.from_arrays(pa.array(offsets, type=pa.int32()), values)
+
+
+def tensor_to_arrow(data, shape, indices=None):
+    """
+    Convert a dense or sparse tensor to the arrow struct array of TENSOR_TYPE, which has a
+    row for each of the indices, the indices shape, the values and the shape. The arrays
+    are wrapped from the numpy buffers without converting to python lists.
+
+    :param data: ndarray, the values of the tensor.
+    :param shape: the shape of the tensor.
+    :param indices: ndarray, the indices of a sparse tensor, or None for a dense tensor.
+    """
+    if indices is None:
+        indices = np.empty(0, dtype=np.int32)
+        indices_shape = np.empty(0, dtype=np.int32)
+    else:
+        indices_shape = np.array(indices.shape, dtype=np.int32)
+        indices = np.ascontiguousarray(indices, dtype=np.int32).reshape(-1)
+    data = np.ascontiguousarray(data, dtype=np.float32).reshape(-1)
+    shape = np.array(shape, dtype=np.int32)
+    children = [_list_at(pa.array(array), i)
+                for i, array in enumerate([indices, indices_shape, data, shape])]
+    return pa.StructArray.from_arrays(children, fields=list(TENSOR_TYPE))
+
+
+def to_record_batch(**data):
+    field_list = []
+    data_list = []
+    for key, value in data.items():
+        field, array = get_field_and_data(key, value)
+        field_list.append(field)
+        data_list.append(array)
+    return pa.RecordBatch.from_arrays(data_list, schema=pa.schema(field_list))
+
+
+def encode_arrow(**data):
+    """
+    Serialize a request to the bytes of an arrow ipc stream, which is the binary format
+    of the request sent with serde "arrow".
+    """
+    batch = to_record_batch(**data)
+    sink = pa.BufferOutputStream()
+    writer = pa.RecordBatchStreamWriter(sink, batch.schema)
+    writer.write_batch(batch)
+    writer.close()
+    return sink.getvalue().to_pybytes()
+
+
+def encode_b64(**data):
+    """
+    Serialize a request to the base64 string of encode_arrow, which is the default format.
+    """
+    return base64.b64encode(encode_arrow(**data)).decode("utf-8")
+
+
+def decode_result(value):
+    """
+    Decode a result, which is the bytes or string of either an arrow ipc stream or its
+    base64 encoding, which can also be a memoryview. The ndarrays are views of the decoded
+    buffer without copies.
+
+    :return: an ndarray, or a list of ndarrays if the result has multiple outputs.
+    """
+    if isinstance(value, str):
+        value = value.encode("utf-8")
+    if bytes(value[:4]) != ARROW_STREAM_MAGIC:
+        value = base64.b64decode(value)
+    reader = pa.ipc.open_stream(pa.py_buffer(value))
+    r = [record_batch_to_ndarray(batch) for batch in reader]
+    assert len(r) > 0
+    return r[0] if len(r) == 1 else r
+
+
+def record_batch_to_ndarray(record_batch):
+    data = record_batch[0]
+    shape_list = record_batch[1].to_pylist()
+    shape = [i for i in shape_list if i]
+    if data.null_count == 0 and data.type == pa.float32():
+        # zero copy view of the arrow buffer
+        data = np.frombuffer(data.buffers()[1], dtype=np.float32,
+                             count=len(data), offset=data.offset * 4)
+    else:
+        data = data.to_numpy(zero_copy_only=False)
+    return data.reshape(shape)
+
 
 def get_field_and_data(key, value):
     if isinstance(value, list):
@@ -36,22 +137,9 @@ def get_field_and_data(key, value):
             assert len(value) == 3, "Sparse Tensor must have list of ndarray" \
                                     "with length 3, which represent indices, " \
                                     "values, shape respectively"
-            indices_field = pa.field("indiceData", pa.list_(pa.int32()))
-            indices_shape_field = pa.field("indiceShape", pa.list_(pa.int32()))
-            value_field = pa.field("data", pa.list_(pa.float32()))
-            shape_field = pa.field("shape", pa.list_(pa.int32()))
-            sparse_tensor_type = pa.struct(
-                [indices_field, indices_shape_field, value_field, shape_field])
-            field = pa.field(key, sparse_tensor_type)
-
-            shape = value[2]
-            values = value[1]
-            indices = value[0].astype("float32").flatten()
-            indices_shape = value[0].shape
-            data = pa.array([{'indiceData': indices},
-                             {'indiceShape': indices_shape},
-                             {'data': values},
-                             {'shape': shape}], type=sparse_tensor_type)
+            field = pa.field(key, TENSOR_TYPE)
+            indices, values, shape = value
+            data = tensor_to_arrow(values, shape, indices)
             return field, data
         else:
             raise TypeError("List of string and ndarray is supported,"
@@ -80,22 +168,8 @@ def get_field_and_data(key, value):
 
     elif isinstance(value, np.ndarray):
         # ndarray value will be considered as tensor
-        indices_field = pa.field("indiceData", pa.list_(pa.int32()))
-        indices_shape_field = pa.field("indiceShape", pa.list_(pa.int32()))
-        data_field = pa.field("data", pa.list_(pa.float32()))
-        shape_field = pa.field("shape", pa.list_(pa.int32()))
-        tensor_type = pa.struct(
-            [indices_field, indices_shape_field, data_field, shape_field])
-        field = pa.field(key, tensor_type)
-
-        shape = np.array(value.shape)
-        d = value.astype("float32").flatten()
-        # data = pa.array([{'data': d}, {'shape': shape}, {}],
-        #                 type=tensor_type)
-        data = pa.array([{'indiceData': []},
-                         {'indiceShape': []},
-                         {'data': d},
-                         {'shape': shape}], type=tensor_type)
+        field = pa.field(key, TENSOR_TYPE)
+        data = tensor_to_arrow(value, value.shape)
         return field, data
 
     else:
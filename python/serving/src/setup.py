@@ -68,6 +68,7 @@ def setup_package():
         include_package_data=False,
         scripts=scripts,
         install_requires=['redis', 'pyyaml', 'httpx', 'pyarrow', 'opencv-python', 'kafka-python'],
+        extras_require={'async': ['aiokafka']},
         classifiers=[
             'License :: OSI Approved :: Apache Software License',
             'Programming Language :: Python :: 3',
@@ -14,7 +14,13 @@
 # limitations under the License.
 #
 
-from bigdl.serving.client import InputQueue, OutputQueue
+import asyncio
+import time
+from unittest import mock
+
+import numpy as np
+from bigdl.serving.client import InputQueue, OutputQueue, AsyncOutputQueue, chunks, \
+    group_results, http_batches, is_empty_result, to_input_dict
 
 
 class TestClient:
@@ -50,3 +56,182 @@ class TestClient:
         assert output_api.name == "my-test"
         assert output_api.host == "1.1.1.1"
         assert output_api.port == "1111"
+
+    def test_output_queue_notification(self):
+        output_api = OutputQueue(host="1.1.1.1", port="1111", name="my-test")
+        uri = output_api.new_uri()
+        assert uri.startswith(output_api.client_id + "_")
+        future = output_api.query_future(uri)
+        output_api.query_and_delete = lambda u: "result of " + u
+        # the notification is published to the channel of the client with the uri
+        assert output_api._result_channel() == \
+            "cluster-serving-notify_my-test:" + output_api.client_id
+        output_api._on_notification(
+            {"channel": output_api._result_channel().encode("utf-8"),
+             "data": uri.encode("utf-8")})
+        assert future.result(timeout=1) == "result of " + uri
+        assert output_api.wait(uri, future, timeout=1) == "result of " + uri
+
+    def test_input_queue_subscribe_backoff(self):
+        input_api = InputQueue(host="1.1.1.1", port="1111", name="my-test")
+        input_api.output_queue.subscribe = mock.MagicMock(side_effect=ConnectionError())
+        input_api._subscribe()
+        input_api._subscribe()
+        # not retried until the backoff passes
+        assert input_api.output_queue.subscribe.call_count == 1
+        input_api.output_queue._subscribe_retry_at = 0
+        input_api._subscribe()
+        assert input_api.output_queue.subscribe.call_count == 2
+        assert input_api.output_queue._subscribe_backoff == 2
+
+    def test_input_queue_batch(self):
+        input_api = InputQueue(host="1.1.1.1", port="1111", name="my-test")
+        assert input_api.batch_size == 256
+        assert [len(c) for c in chunks(range(600), input_api.batch_size)] == [256, 256, 88]
+        assert list(to_input_dict('{"instances": [{"a": [1, 2]}]}')["a"]) == [1, 2]
+        assert to_input_dict({"a": 1}) == {"a": 1}
+        assert to_input_dict("image.jpg") == {"t": "image.jpg"}
+
+    def test_output_queue_dequeue_batch(self):
+        output_api = OutputQueue(host="1.1.1.1", port="1111", name="my-test")
+        assert output_api.scan_count == 1000
+        assert output_api._result_key("*") == "cluster-serving_my-test:*"
+        assert is_empty_result("[]")
+        assert not is_empty_result("[1]")
+        assert not is_empty_result(None)
+
+    def test_output_queue_query_and_delete(self):
+        output_api = OutputQueue(host="1.1.1.1", port="1111", name="my-test")
+        output_api.db = mock.MagicMock()
+        pipe = output_api.db.pipeline.return_value
+        pipe.execute.return_value = [{}, 0]
+        assert output_api.query_and_delete("uri") == "[]"
+        # the result is fetched and deleted in one transaction
+        output_api.db.pipeline.assert_called_once_with(transaction=True)
+        pipe.hgetall.assert_called_once_with("cluster-serving_my-test:uri")
+        pipe.delete.assert_called_once_with("cluster-serving_my-test:uri")
+
+        async_output_api = AsyncOutputQueue(host="1.1.1.1", port="1111", name="my-test")
+        async_output_api.db = mock.MagicMock()
+        pipe = async_output_api.db.pipeline.return_value
+        pipe.execute = mock.AsyncMock(return_value=[{}, 0, {b"value": b"NaN"}, 1])
+        results = asyncio.run(async_output_api._query_and_delete_many(["uri1", "uri2"]))
+        assert results == ["[]", "NaN"]
+        async_output_api.db.pipeline.assert_called_once_with(transaction=True)
+        assert pipe.delete.call_args_list == [mock.call("cluster-serving_my-test:uri1"),
+                                              mock.call("cluster-serving_my-test:uri2")]
+
+    def test_input_queue_enqueue_many(self):
+        input_api = InputQueue(host="1.1.1.1", port="1111", name="my-test")
+        input_api.db = mock.MagicMock()
+        input_api.db.info.return_value = {"maxmemory": 0, "used_memory": 0}
+        pipe = input_api.db.pipeline.return_value
+        input_api.batch_size = 2
+        uris = ["uri" + str(i) for i in range(5)]
+        input_api.enqueue_many((uri, {"t": np.array([i])}) for i, uri in enumerate(uris))
+        # one pipelined round trip for each batch
+        assert input_api.db.pipeline.call_args_list == [mock.call(transaction=False)] * 3
+        assert pipe.execute.call_count == 3
+        assert [c.args[0] for c in pipe.xadd.call_args_list] == ["my-test"] * 5
+        assert [c.args[1]["uri"] for c in pipe.xadd.call_args_list] == uris
+        # the used memory is checked at most once per interval
+        assert input_api.db.info.call_count == 1
+
+    def test_input_queue_predict_batch(self):
+        input_api = InputQueue(host="1.1.1.1", port="1111", name="my-test")
+        output_api = input_api.output_queue
+        output_api.subscribe = lambda: None
+        results = {}
+
+        def enqueue_many(requests):
+            # the results arrive in the reverse order, and the second one never arrives
+            for i, (uri, data) in reversed(list(enumerate(requests))):
+                if i != 1:
+                    results[uri] = "result " + str(data["a"][0])
+        input_api.enqueue_many = enqueue_many
+        output_api.query_and_delete = lambda uri: results.pop(uri, "[]")
+
+        start = time.time()
+        assert input_api.predict_batch([{"a": np.array([i])} for i in range(4)],
+                                       timeout=0.5) == ["result 0", "[]", "result 2", "result 3"]
+        # the timeout is for all the requests
+        assert time.time() - start < 1.5
+
+    def test_output_queue_dequeue_scan(self):
+        output_api = OutputQueue(host="1.1.1.1", port="1111", name="my-test")
+        keys = [("cluster-serving_my-test:uri" + str(i)).encode("utf-8") for i in range(6)]
+        # uri2 is empty and uri4 is taken by another consumer before it is fetched
+        store = {key: {b"value": b"NaN"} for key in keys if key not in keys[2::2]}
+        scans = {0: (7, keys[:3]), 7: (0, keys[3:])}
+        pipelines = []
+
+        class Pipeline:
+            def __init__(self, transaction):
+                self.transaction = transaction
+                self.commands = []
+
+            def hgetall(self, key):
+                self.commands.append(("hgetall", key))
+
+            def delete(self, key):
+                self.commands.append(("delete", key))
+
+            def execute(self):
+                store.pop(keys[4], None)
+                return [store.get(key, {}) if command == "hgetall" else int(store.pop(key, 0) != 0)
+                        for command, key in self.commands]
+
+        def pipeline(transaction):
+            pipelines.append(Pipeline(transaction))
+            return pipelines[-1]
+        output_api.db = mock.MagicMock()
+        output_api.db.scan.side_effect = lambda cursor, match, count: scans[cursor]
+        output_api.db.pipeline.side_effect = pipeline
+
+        # the batch is bounded and the scan resumes where the last call stops, skipping the
+        # empty and taken results
+        assert output_api.dequeue(batch_size=2) == {"uri0": "NaN", "uri1": "NaN"}
+        assert [c.args[0] for c in output_api.db.scan.call_args_list] == [0]
+        assert output_api.dequeue(batch_size=2) == {"uri3": "NaN", "uri5": "NaN"}
+        assert [c.args[0] for c in output_api.db.scan.call_args_list] == [0, 7]
+        assert output_api.db.scan.call_args_list[0].kwargs == \
+            {"match": "cluster-serving_my-test:*", "count": 1000}
+        # each key is fetched and deleted once, in a transaction
+        for pipe in pipelines:
+            assert pipe.transaction
+            assert [command for command, _ in pipe.commands] == \
+                ["hgetall", "delete"] * (len(pipe.commands) // 2)
+            assert pipe.commands[::2] == [("hgetall", key) for _, key in pipe.commands[1::2]]
+        assert [key for pipe in pipelines for _, key in pipe.commands[::2]] == keys
+        assert not store
+        # a new pass over all the keys finds nothing
+        assert output_api.dequeue(batch_size=2) == {}
+        assert [c.args[0] for c in output_api.db.scan.call_args_list] == [0, 7, 0, 7]
+
+    def test_http_batches(self):
+        requests = [{"a": np.array([1, 2])}, '{"instances": [{"a": [3]}, {"a": [4]}]}']
+        batches, sizes = http_batches(requests, 2)
+        assert batches == [[{"a": [1, 2]}, {"a": [3]}], [{"a": [4]}]]
+        assert sizes == [1, 2]
+        assert group_results(batches, [["r1", "r3"], None], sizes) == ["r1", ["r3", "[]"]]
+
+    def test_input_queue_http_predict_batch(self):
+        import json
+        import httpx
+
+        def handler(request):
+            # the client asks for one prediction of each instance
+            assert request.url.params["batch"] == "true"
+            instances = json.loads(request.content)["instances"]
+            predictions = [json.dumps({"value": json.dumps(
+                {"data": instance["a"], "shape": [len(instance["a"])]})})
+                for instance in instances]
+            return httpx.Response(200, json={"predictions": predictions})
+
+        input_api = InputQueue(frontend_url="http://127.0.0.1:1")
+        input_api.cli = httpx.Client(transport=httpx.MockTransport(handler))
+        input_api.batch_size = 2
+        results = input_api.predict_batch(
+            [{"a": np.array([1, 2])}, '{"instances": [{"a": [3]}, {"a": [4]}]}'])
+        assert list(results[0]) == [1, 2]
+        assert [list(r) for r in results[1]] == [[3], [4]]
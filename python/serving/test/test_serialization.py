@@ -17,7 +17,12 @@
 
 import numpy as np
 import base64
-from bigdl.serving.client import InputQueue, OutputQueue, http_json_to_ndarray
+import json
+import struct
+import pyarrow as pa
+from bigdl.serving.client import InputQueue, OutputQueue, http_json_to_ndarray, \
+    http_binary_to_ndarrays, http_json_to_ndarrays
+from bigdl.serving.schema import encode_arrow, encode_b64, decode_result
 import os
 
 
@@ -31,6 +36,36 @@ class TestSerialization:
         b64 = input_api.data_to_b64(t1=np.array([1, 2]), t2=np.array([3, 4]))
         byte = base64.b64decode(b64)
 
+    def test_encode_arrow(self):
+        x = np.random.rand(2, 3)
+        raw = encode_arrow(t=x)
+        assert base64.b64decode(encode_b64(t=x)) == raw
+        t = pa.ipc.open_stream(raw).read_all().column(0)[0].as_py()
+        assert t["indiceData"] == []
+        row = pa.ipc.open_stream(raw).read_all().column(0).to_pylist()
+        np.testing.assert_allclose(row[2]["data"], x.astype("float32").flatten())
+        assert row[3]["shape"] == [2, 3]
+        # sparse tensor keeps int indices
+        indices = np.array([[0, 1], [2, 0]])
+        row = pa.ipc.open_stream(encode_arrow(
+            t=[indices, np.array([1., 2.]), np.array([3, 3])])).read_all().column(0).to_pylist()
+        assert row[0]["indiceData"] == [0, 1, 2, 0]
+        assert row[1]["indiceShape"] == [2, 2]
+
+    def test_decode_result(self):
+        batch = pa.RecordBatch.from_arrays(
+            [pa.array(np.arange(6, dtype="float32")),
+             pa.array([2, 3, None, None, None, None], type=pa.int32())], ["data", "shape"])
+        sink = pa.BufferOutputStream()
+        writer = pa.RecordBatchStreamWriter(sink, batch.schema)
+        writer.write_batch(batch)
+        writer.close()
+        raw = sink.getvalue().to_pybytes()
+        for value in [raw, base64.b64encode(raw), base64.b64encode(raw).decode("utf-8")]:
+            arr = decode_result(value)
+            assert arr.shape == (2, 3)
+            assert arr[1, 2] == 5
+
     def test_http_response_to_ndarray(self):
         with open(os.path.join(resource_path, "http_response")) as f:
             data = f.read()
@@ -38,3 +73,22 @@ class TestSerialization:
             assert isinstance(arr, np.ndarray)
             assert len(arr.shape) == 1
             assert arr.shape[0] == 128
+
+    def test_http_batch_response_to_ndarrays(self):
+        batch = pa.RecordBatch.from_arrays(
+            [pa.array(np.arange(6, dtype="float32")),
+             pa.array([2, 3, None, None, None, None], type=pa.int32())], ["data", "shape"])
+        sink = pa.BufferOutputStream()
+        writer = pa.RecordBatchStreamWriter(sink, batch.schema)
+        writer.write_batch(batch)
+        writer.close()
+        raw = sink.getvalue().to_pybytes()
+        content = struct.pack(">I", len(raw)) + raw + struct.pack(">I", 3) + b"NaN"
+        results = http_binary_to_ndarrays(content)
+        assert results[0].shape == (2, 3)
+        assert results[1] == "NaN"
+        predictions = [json.dumps({"value": base64.b64encode(raw).decode("utf-8")}),
+                       json.dumps(json.dumps({"data": [1, 2], "shape": [2]}))]
+        results = http_json_to_ndarrays(json.dumps({"predictions": predictions}))
+        assert results[0][1, 2] == 5
+        assert list(results[1]) == [1, 2]
@@ -33,7 +33,10 @@ import com.intel.analytics.bigdl.dllib.utils._
 import org.apache.spark.api.java.{JavaRDD, JavaSparkContext}
 import org.apache.spark.rdd.RDD
 import java.lang.{Boolean => JBoolean}
-import java.nio.ByteOrder
+import java.io.EOFException
+import java.nio.{Buffer, ByteBuffer, ByteOrder}
+import java.nio.channels.FileChannel
+import java.nio.file.{Paths, StandardOpenOption}
 
 import com.intel.analytics.bigdl.dllib.feature.dataset.image.{CropCenter, CropRandom, CropperMethod}
 import com.intel.analytics.bigdl.dllib.nn.Graph._
@@ -211,6 +214,63 @@ class PythonBigDL[T: ClassTag](implicit ev: TensorNumeric[T]) extends Serializab
     toJTensor(tensor)
   }
 
+  /**
+   * Read the tensors of shapes, which python writes one after another into the file at path
+   * as little-endian float32. The file is copied into the tensor storages in bulk, instead of
+   * pickling the tensors as JTensors through py4j.
+   */
+  def readTensorsFromFile(path: String, shapes: JList[JList[Int]]): Array[Tensor[T]] = {
+    val channel = FileChannel.open(Paths.get(path), StandardOpenOption.READ)
+    try {
+      var position = 0L
+      shapes.asScala.toArray.map { jShape =>
+        val shape = jShape.asScala.toArray
+        val storage = new Array[Float](shape.product)
+        PythonBigDLUtils.readFloats(channel, position, storage)
+        position += storage.length.toLong * 4
+        if (typeName == "float") {
+          Tensor[Float](storage, shape).asInstanceOf[Tensor[T]]
+        } else {
+          Tensor(storage.map(x => ev.fromType(x)), shape)
+        }
+      }
+    } finally {
+      channel.close()
+    }
+  }
+
+  /**
+   * Write the dense tensors one after another into the file at path as little-endian
+   * float32, which python reads in bulk.
+   *
+   * @return the shapes of the tensors
+   */
+  def writeTensorsToFile(tensors: Seq[Tensor[T]], path: String): JList[JList[Int]] = {
+    val channel = FileChannel.open(Paths.get(path), StandardOpenOption.READ,
+      StandardOpenOption.WRITE)
+    try {
+      var position = 0L
+      tensors.map { tensor =>
+        require(tensor.getTensorType == DenseType,
+          s"writeTensorsToFile: Unsupported tensor type ${tensor.getTensorType}")
+        val contiguous = tensor.contiguous()
+        val start = contiguous.storageOffset() - 1
+        if (typeName == "float") {
+          PythonBigDLUtils.writeFloats(channel, position,
+            contiguous.storage().array().asInstanceOf[Array[Float]], start, tensor.nElement())
+        } else {
+          val storage = contiguous.storage().array().slice(start, start + tensor.nElement())
+            .map(ev.toType[Float](_))
+          PythonBigDLUtils.writeFloats(channel, position, storage, 0, storage.length)
+        }
+        position += tensor.nElement().toLong * 4
+        tensor.size().toList.asJava
+      }.toList.asJava
+    } finally {
+      channel.close()
+    }
+  }
+
 
   def testSample(sample: Sample): Sample = {
     val jsample = toJSample(sample)
@@ -2004,7 +2064,30 @@ class PythonBigDL[T: ClassTag](implicit ev: TensorNumeric[T]) extends Serializab
 
   def predictLocal(model: AbstractModule[Activity, Activity, T],
                    features: JList[JTensor], batchSize: Int = -1): JList[JTensor] = {
-    val sampleArray = toSampleArray(features.asScala.toList.map{f => toTensor(f)})
+    val result = localPredict(model, features.asScala.toList.map{f => toTensor(f)}, batchSize)
+    result.map{a => toJTensor(a.asInstanceOf[Tensor[T]])}.toList.asJava
+  }
+
+  /**
+   * The bulk version of predictLocal, which reads the features from the file at inputPath
+   * and writes the outputs of all the samples as one contiguous batch to the file at
+   * outputPath.
+   *
+   * @return the shape of the batch of outputs
+   */
+  def predictLocalToFile(model: AbstractModule[Activity, Activity, T],
+                         inputPath: String, inputShapes: JList[JList[Int]],
+                         batchSize: Int, outputPath: String): JList[Int] = {
+    val features = readTensorsFromFile(inputPath, inputShapes).toList
+    val outputs = localPredict(model, features, batchSize).map(_.asInstanceOf[Tensor[T]])
+    require(outputs.nonEmpty, "predictLocalToFile: no samples to predict")
+    writeTensorsToFile(outputs, outputPath)
+    (outputs.length +: outputs.head.size()).toList.asJava
+  }
+
+  private def localPredict(model: AbstractModule[Activity, Activity, T],
+                           features: List[Tensor[T]], batchSize: Int): Array[Activity] = {
+    val sampleArray = toSampleArray(features)
     val localPredictor = if (batchSize > 0) {
       val batchPerCore = batchSize / Engine.coreNumber()
       if (batchPerCore < 1) {
@@ -2015,8 +2098,7 @@ class PythonBigDL[T: ClassTag](implicit ev: TensorNumeric[T]) extends Serializab
     } else {
       LocalPredictor(model)
     }
-    val result = localPredictor.predict(sampleArray)
-    result.map{a => toJTensor(a.asInstanceOf[Tensor[T]])}.toList.asJava
+    localPredictor.predict(sampleArray)
   }
 
   def predictLocalClass(model: AbstractModule[Activity, Activity, T],
@@ -2540,6 +2622,30 @@ class PythonBigDL[T: ClassTag](implicit ev: TensorNumeric[T]) extends Serializab
     }
   }
 
+  def setWeightsFromFile(model: AbstractModule[Activity, Activity, T], path: String,
+                         shapes: JList[JList[Int]]): Unit = {
+    model.setWeightsBias(readTensorsFromFile(path, shapes))
+  }
+
+  /**
+   * The bulk version of getWeights, which writes the weights to the file at path if they
+   * take at least minBytes as float32, so that the size is checked in the same call.
+   *
+   * @return the shapes of the weights if they are written to the file, the weights as
+   *         JTensors if they are smaller, or null if the model does not have weights
+   */
+  def getWeightsToFile(model: AbstractModule[Activity, Activity, T],
+                       path: String, minBytes: Long): JList[AnyRef] = {
+    val weights = model.getWeightsBias()
+    if (weights == null) {
+      null
+    } else if (weights.map(_.nElement().toLong).sum * 4 >= minBytes) {
+      writeTensorsToFile(weights, path).asScala.map(_.asInstanceOf[AnyRef]).asJava
+    } else {
+      weights.map(toJTensor(_).asInstanceOf[AnyRef]).toList.asJava
+    }
+  }
+
   def updateParameters(model: AbstractModule[Activity, Activity, T], lr: Double): Unit = {
     val (w, g) = model.getParameters()
     w.add(ev.negative(ev.fromType(lr)), g)
@@ -3246,6 +3352,62 @@ class PythonBigDL[T: ClassTag](implicit ev: TensorNumeric[T]) extends Serializab
 }
 
 object PythonBigDLUtils {
+  // The files are read and written through a heap buffer of this many floats. A mapped
+  // buffer would only be unmapped when it is garbage collected.
+  private val floatsPerChunk = 1 << 20
+
+  private def newBuffer(length: Int): ByteBuffer = {
+    ByteBuffer.allocate(math.min(length, floatsPerChunk) * 4).order(ByteOrder.LITTLE_ENDIAN)
+  }
+
+  /**
+   * Read storage.length little-endian floats from the file at position in chunks, which is
+   * a bulk copy instead of unpickling the values one by one.
+   */
+  def readFloats(channel: FileChannel, position: Long, storage: Array[Float]): Unit = {
+    val buffer = newBuffer(storage.length)
+    var offset = 0
+    while (offset < storage.length) {
+      val n = math.min(storage.length - offset, floatsPerChunk)
+      // called through Buffer, whose methods are overridden by ByteBuffer since Java 9
+      buffer.asInstanceOf[Buffer].clear()
+      buffer.asInstanceOf[Buffer].limit(n * 4)
+      var filePosition = position + offset.toLong * 4
+      while (buffer.hasRemaining) {
+        val read = channel.read(buffer, filePosition)
+        if (read < 0) {
+          throw new EOFException(s"readFloats: the file ends at $filePosition before " +
+            s"${storage.length} floats are read from $position")
+        }
+        filePosition += read
+      }
+      buffer.asInstanceOf[Buffer].flip()
+      buffer.asFloatBuffer().get(storage, offset, n)
+      offset += n
+    }
+  }
+
+  /**
+   * Write length floats of storage from storageOffset to the file at position as
+   * little-endian floats in chunks.
+   */
+  def writeFloats(channel: FileChannel, position: Long, storage: Array[Float],
+                  storageOffset: Int, length: Int): Unit = {
+    val buffer = newBuffer(length)
+    var offset = 0
+    while (offset < length) {
+      val n = math.min(length - offset, floatsPerChunk)
+      buffer.asInstanceOf[Buffer].clear()
+      buffer.asFloatBuffer().put(storage, storageOffset + offset, n)
+      buffer.asInstanceOf[Buffer].limit(n * 4)
+      var filePosition = position + offset.toLong * 4
+      while (buffer.hasRemaining) {
+        filePosition += channel.write(buffer, filePosition)
+      }
+      offset += n
+    }
+  }
+
   def toTensor[T: ClassTag](jTensor: JTensor, typeName: String)
     (implicit ev: TensorNumeric[T]): Tensor[T] = {
     if (jTensor == null) return null
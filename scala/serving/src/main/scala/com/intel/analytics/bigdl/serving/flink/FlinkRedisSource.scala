@@ -16,7 +16,7 @@
 
 package com.intel.analytics.bigdl.serving.flink
 
-import java.util.AbstractMap.SimpleEntry
+import java.nio.charset.StandardCharsets
 import java.util.UUID
 
 import com.intel.analytics.bigdl.serving.{ClusterServing, ClusterServingHelper}
@@ -48,19 +48,25 @@ class FlinkRedisSource()
     val consumerName = "consumer-" + UUID.randomUUID().toString
     val readNumPerTime = if (helper.modelType == "openvino") helper.threadPerModel else 1
 
+    // read the binary reply, so that the raw bytes of serde "arrow" are not decoded as UTF-8
     val response = jedis.xreadGroup(
-      groupName,
-      consumerName,
+      groupName.getBytes(StandardCharsets.UTF_8),
+      consumerName.getBytes(StandardCharsets.UTF_8),
       readNumPerTime,
       1,
       false,
-      new SimpleEntry(helper.jobName, StreamEntryID.UNRECEIVED_ENTRY))
+      Map(helper.jobName.getBytes(StandardCharsets.UTF_8) ->
+        StreamEntryID.UNRECEIVED_ENTRY.toString.getBytes(StandardCharsets.UTF_8)).asJava)
     if (response != null) {
-      for (streamMessages <- response.asScala) {
-        val key = streamMessages.getKey
-        val entries = streamMessages.getValue.asScala
+      // the reply is [[stream, [[id, [field, value, ...]], ...]], ...]
+      for (streamMessages <- response.asInstanceOf[java.util.List[AnyRef]].asScala) {
+        val entries = streamMessages.asInstanceOf[java.util.List[AnyRef]].get(1)
+          .asInstanceOf[java.util.List[AnyRef]].asScala
         val it = entries.map(e => {
-          (e.getFields.get("uri"), e.getFields.get("data"), e.getFields.get("serde"))
+          val fields = RedisUtils.parseBinaryFields(e.asInstanceOf[java.util.List[AnyRef]].get(1))
+          val serde = fields.get("serde").map(new String(_, StandardCharsets.UTF_8)).orNull
+          val data = fields.get("data").map(RedisUtils.decodeData(_, serde)).orNull
+          (fields.get("uri").map(new String(_, StandardCharsets.UTF_8)).orNull, data, serde)
         }).toList
         sourceContext.collect(it)
       }
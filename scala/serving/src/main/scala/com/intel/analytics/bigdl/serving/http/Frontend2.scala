@@ -17,6 +17,8 @@
 package com.intel.analytics.bigdl.serving.http
 
 import java.io.File
+import java.nio.ByteBuffer
+import java.nio.charset.StandardCharsets
 import java.security.{KeyStore, SecureRandom}
 import java.util
 import java.util.UUID
@@ -25,6 +27,7 @@ import java.util.concurrent.{LinkedBlockingQueue, TimeUnit}
 import javax.net.ssl.{KeyManagerFactory, SSLContext, TrustManagerFactory}
 import akka.actor.{ActorRef, ActorSystem, Props}
 import akka.http.scaladsl.{ConnectionContext, Http}
+import akka.http.scaladsl.model.{ContentTypes, HttpEntity, HttpResponse}
 import akka.http.scaladsl.server.Directives.{complete, path, _}
 import akka.pattern.ask
 import akka.stream.ActorMaterializer
@@ -38,6 +41,8 @@ import com.intel.analytics.bigdl.serving.ClusterServing
 import org.slf4j.LoggerFactory
 import redis.clients.jedis.JedisPool
 
+import scala.collection.JavaConverters._
+import scala.collection.mutable
 import scala.concurrent.Await
 
 object Frontend2 extends Supportive with EncryptSupportive {
@@ -71,21 +76,68 @@ object Frontend2 extends Supportive with EncryptSupportive {
       }
 
 
+      val objectMapper = new ObjectMapper()
+
+      // split a request into a request of each instance, which are predicted in parallel
+      def splitInstances(inputs: String): List[String] = {
+        val instances = objectMapper.readTree(inputs).get("instances")
+        if (instances == null || instances.size() <= 1) {
+          List(inputs)
+        } else {
+          instances.elements().asScala.map(instance => {
+            val node = objectMapper.createObjectNode()
+            node.putArray("instances").add(instance)
+            objectMapper.writeValueAsString(node)
+          }).toList
+        }
+      }
+
       def processPredictionInput(inputs: String):
-      Seq[PredictionOutput[String]] = {
-        val result = timing("response waiting")() {
-          val id = UUID.randomUUID().toString
-          val results = timing(s"query message wait for key $id")() {
-            Await.result(ioActor ? DataInputMessage(id, inputs), timeout.duration)
-              .asInstanceOf[ModelOutputMessage].valueMap
+      Seq[(String, mutable.Map[String, String])] = {
+        timing("response waiting")() {
+          val requests = splitInstances(inputs).map(input => {
+            val id = UUID.randomUUID().toString
+            (id, ioActor ? DataInputMessage(id, input))
+          })
+          requests.map { case (id, request) =>
+            timing(s"query message wait for key $id")() {
+              (id, Await.result(request, timeout.duration)
+                .asInstanceOf[ModelOutputMessage].valueMap)
+            }
           }
-          val objectMapper = new ObjectMapper()
-          results.map(r => {
-            val resultStr = objectMapper.writeValueAsString(r._2)
-            PredictionOutput(r._1, resultStr)
+        }
+      }
+
+      // one prediction of each field of the results by default, or one prediction of each
+      // instance with the json of all its fields if batch=true is requested
+      def toJsonResponse(results: Seq[(String, mutable.Map[String, String])],
+                         batch: Boolean): String = {
+        val outputs = if (batch) {
+          results.map { case (id, valueMap) =>
+            PredictionOutput(id, objectMapper.writeValueAsString(valueMap.asJava))
+          }
+        } else {
+          results.flatMap(_._2).map(r => {
+            PredictionOutput(r._1, objectMapper.writeValueAsString(r._2))
           })
         }
-        result.toSeq
+        Predictions(outputs).toString
+      }
+
+      // the results of the instances, each of which is a 4-byte big-endian length and
+      // the raw bytes of the result instead of its base64 string in json
+      def toBinaryResponse(results: Seq[(String, mutable.Map[String, String])]): Array[Byte] = {
+        val values = results.map { case (_, valueMap) =>
+          val value = valueMap.getOrElse("value", "NaN")
+          if (value == "NaN" || value.startsWith("{")) {
+            value.getBytes(StandardCharsets.UTF_8)
+          } else {
+            java.util.Base64.getDecoder.decode(value)
+          }
+        }
+        val buffer = ByteBuffer.allocate(values.map(_.length + 4).sum)
+        values.foreach(value => buffer.putInt(value.length).put(value))
+        buffer.array()
       }
 
       val route = timing("initialize http route")() {
@@ -102,9 +154,9 @@ object Frontend2 extends Supportive with EncryptSupportive {
             }).toList
             complete(jacksonJsonSerializer.serialize(servingMetrics))
           }
-        } ~ (post & path("predict") &
-          extract(_.request.entity.contentType) & entity(as[String])) {
-          (contentType, content) => {
+        } ~ (post & path("predict") & extract(_.request.entity.contentType) &
+          optionalHeaderValueByName("Accept") & parameter("batch".?) & entity(as[String])) {
+          (contentType, accept, batch, content) => {
             val rejected = arguments.tokenBucketEnabled match {
               case true =>
                 if (!rateLimiter.tryAcquire(
@@ -120,12 +172,15 @@ object Frontend2 extends Supportive with EncryptSupportive {
               complete(500, error.toString)
             } else {
               try {
-                val result = timing("predict")() {
-                  val outputs = processPredictionInput(content)
-                  Predictions(outputs)
+                val results = timing("predict")() {
+                  processPredictionInput(content)
+                }
+                if (accept.exists(_.contains(ContentTypes.`application/octet-stream`.value))) {
+                  complete(HttpResponse(200, entity = HttpEntity(
+                    ContentTypes.`application/octet-stream`, toBinaryResponse(results))))
+                } else {
+                  complete(200, toJsonResponse(results, batch.contains("true")))
                 }
-
-                complete(200, result.toString)
 
               } catch {
                 case e =>
@@ -16,6 +16,8 @@
 
 package com.intel.analytics.bigdl.serving.preprocessing
 
+import java.nio.charset.StandardCharsets
+
 import com.intel.analytics.bigdl.dllib.feature.image.OpenCVMethod
 import com.intel.analytics.bigdl.dllib.feature.transform.vision.image.opencv.OpenCVMat
 import com.intel.analytics.bigdl.dllib.nn.abstractnn.Activity
@@ -74,7 +76,12 @@ class PreProcessing()
         Seq(JsonInputDeserializer.deserialize(s, this))
 
       } else {
-        byteBuffer = java.util.Base64.getDecoder.decode(s)
+        byteBuffer = if (serde == Conventions.ARROW_SERDE) {
+          // raw arrow bytes, which the source keeps as one char per byte
+          s.getBytes(StandardCharsets.ISO_8859_1)
+        } else {
+          java.util.Base64.getDecoder.decode(s)
+        }
         val ins = Instances.fromArrow(byteBuffer)
         getInputFromInstance(ins)
       }
@@ -91,6 +98,7 @@ class PreProcessing()
           val hKey = Conventions.RESULT_PREFIX + ClusterServing.helper.jobName + ":" + key
           val hValue = Map[String, String]("value" -> "NaN").asJava
           tmpJedis.hset(hKey, hValue)
+          tmpJedis.publish(RedisUtils.resultChannel(ClusterServing.helper.jobName, key), key)
           tmpJedis.close()
         }
 
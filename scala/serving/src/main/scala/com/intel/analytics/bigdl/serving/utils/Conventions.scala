@@ -25,11 +25,16 @@ object Conventions {
   val SECURE_TMP_DIR = "secure"
   val SERVING_CONF_TMP_PATH = "cluster-serving-conf.yaml"
   val RESULT_PREFIX = "cluster-serving_"
+  // the channel of the result notifications of a client is NOTIFY_PREFIX, the job name and
+  // the client id, i.e. the prefix of the uri before "_"
+  val NOTIFY_PREFIX = "cluster-serving-notify_"
   val TMP_MANAGER_YAML = "/tmp/cluster-serving-jobs.yaml"
   val ARROW_INT = new ArrowType.Int(32, true)
   val ARROW_FLOAT = new ArrowType.FloatingPoint(FloatingPointPrecision.SINGLE)
   val ARROW_BINARY = new ArrowType.Binary()
   val ARROW_UTF8 = new ArrowType.Utf8
+  // the serde of the requests whose data is the raw bytes of arrow ipc stream
+  val ARROW_SERDE = "arrow"
 
   val RECORD_SECURED_KEY = "record_secured"
   val RECORD_SECURED_SECRET = "secret"
@@ -16,6 +16,8 @@
 
 package com.intel.analytics.bigdl.serving.utils
 
+import java.nio.charset.StandardCharsets
+
 import org.apache.logging.log4j.LogManager
 import redis.clients.jedis.exceptions.JedisConnectionException
 import redis.clients.jedis.{Jedis, JedisPool, Pipeline, StreamEntryID}
@@ -106,10 +108,47 @@ object RedisUtils {
     }
     jedis
   }
+  /**
+   * Parse the binary fields of a stream entry, which is a list of field, value, ...
+   */
+  def parseBinaryFields(fields: AnyRef): Map[String, Array[Byte]] = {
+    fields.asInstanceOf[java.util.List[Array[Byte]]].asScala.grouped(2).map(kv => {
+      (new String(kv(0), StandardCharsets.UTF_8), kv(1))
+    }).toMap
+  }
+
+  /**
+   * Decode the data field of a request to string. The raw arrow bytes of serde "arrow"
+   * are kept as one char per byte, which PreProcessing converts back without a copy of
+   * base64 decoding.
+   */
+  def decodeData(bytes: Array[Byte], serde: String): String = {
+    if (serde == Conventions.ARROW_SERDE) {
+      new String(bytes, StandardCharsets.ISO_8859_1)
+    } else {
+      new String(bytes, StandardCharsets.UTF_8)
+    }
+  }
+
   def writeHashMap(ppl: Pipeline, key: String, value: String, name: String): Unit = {
     val hKey = Conventions.RESULT_PREFIX + name + ":" + key
     val hValue = Map[String, String]("value" -> value).asJava
     ppl.hmset(hKey, hValue)
+    // notify the client waiting for the result
+    ppl.publish(resultChannel(name, key), key)
+  }
+
+  /**
+   * The channel of the client of the request key, which is the prefix of the key before "_".
+   * Each client subscribes its own channel, so a notification is not matched against the
+   * patterns of all the clients.
+   */
+  def resultChannel(name: String, key: String): String = {
+    val clientId = key.indexOf('_') match {
+      case -1 => key
+      case i => key.substring(0, i)
+    }
+    Conventions.NOTIFY_PREFIX + name + ":" + clientId
   }
   def writeXstream(ppl: Pipeline, key: String, value: String, name: String): Unit = {
     val streamKey = Conventions.RESULT_PREFIX + name + ":" + key